@@ -0,0 +1,146 @@
+# pages/Admin.py
+# Operator view of the sessions and caches shared by this server.
+import hmac
+
+import streamlit as st
+import pandas as pd
+from utils.categorical import summary_cache
+from utils.config import ADMIN_TOKEN, DISK_CACHE_DIR
+from utils.contingency import contingency_cache
+from utils.correlation import correlation_cache
+from utils.data_loader import dataset_cache
+from utils.disk_cache import disk_cache
+from utils.duplicates import duplicate_cache
+from utils.exports import export_cache
+from utils.figures import figure_cache
+from utils.memory import format_bytes
+from utils.report import report_cache
+from utils.sessions import session_manager
+
+# -------------------- PAGE CONFIG --------------------
+st.set_page_config(page_title="Admin - AutoClean AI", layout="wide")
+
+# -------------------- CUSTOM CSS --------------------
+st.markdown("""
+<style>
+.section-title { font-size:2rem; text-align:center; color:#ff6b6b; font-weight:700; margin:20px 0 10px 0; }
+.dataframe { width:100%; border:2px solid #000; border-collapse:collapse; margin:10px 0; font-size:1.1rem; }
+.dataframe th, .dataframe td { border:2px solid #000 !important; text-align:center; padding:8px; font-size:1.1rem; }
+.dataframe th { font-weight:700; background:#f0f0f0; }
+.stApp { background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%); }
+.stButton > button {
+    background-color: #ff6b6b !important;
+    color: white !important;
+    border-radius: 25px;
+    border: none;
+}
+</style>
+""", unsafe_allow_html=True)
+
+st.markdown('<h1 class="section-title">Admin</h1>', unsafe_allow_html=True)
+
+# ============================================================
+# OPERATOR SIGN-IN
+# ============================================================
+# Everything below acts on other visitors' sessions and on shared caches, so
+# the page is locked unless the deployment sets an operator token.
+if ADMIN_TOKEN is None:
+    st.info("The Admin page is disabled. Set ANALYTIX_ADMIN_TOKEN on the server to enable it.")
+    st.stop()
+
+token = st.text_input("Operator token", type="password", key="_admin_token")
+if not token or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+    if token:
+        st.error("Wrong operator token.")
+    st.stop()
+
+# ============================================================
+# SESSIONS
+# ============================================================
+st.markdown('<h2 class="section-title">Sessions</h2>', unsafe_allow_html=True)
+
+sessions = session_manager.summary()
+held = session_manager.nbytes()
+col1, col2, col3 = st.columns(3)
+col1.metric("Sessions", len(sessions))
+col2.metric("Memory Held", format_bytes(held))
+col3.metric("Server Quota", format_bytes(session_manager.global_quota))
+st.progress(min(held / max(session_manager.global_quota, 1), 1.0))
+st.caption(f"Each session may hold up to {format_bytes(session_manager.session_quota)}. At the server quota, "
+           f"sessions inactive for {session_manager.idle_seconds:,} s are released, least recent first; "
+           "their dataset and cleaning checkpoints spill to local disk and their upload leaves memory; "
+           "the data is reopened, at the same cleaning step, when they return.")
+
+if len(sessions):
+    table = sessions.assign(Memory=sessions["Memory"].map(format_bytes),
+                            **{"Last Active": sessions["Last Active"].dt.strftime("%Y-%m-%d %H:%M:%S")})
+    st.markdown(table.to_html(index=False, classes="dataframe"), unsafe_allow_html=True)
+
+    release = st.multiselect("Sessions to release", sessions["Session"].tolist(),
+                             help="Active sessions are released when they next rerun.")
+    if st.button("RELEASE SELECTED", disabled=not release):
+        for session_id in release:
+            session_manager.release(session_id)
+        st.rerun()
+
+# ============================================================
+# DISK CACHE
+# ============================================================
+st.markdown('<h2 class="section-title">Dataset Disk Cache</h2>', unsafe_allow_html=True)
+
+if disk_cache is None:
+    st.info(f"The disk cache is disabled or its directory ({DISK_CACHE_DIR}) is not writable.")
+else:
+    entries = disk_cache.entries()
+    used = int(entries["Size"].sum()) if len(entries) else 0
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Cached Datasets", len(entries))
+    col2.metric("Disk Used", format_bytes(used))
+    col3.metric("Capacity", format_bytes(disk_cache.max_bytes))
+    st.progress(min(used / max(disk_cache.max_bytes, 1), 1.0))
+    st.caption(f"Directory: {disk_cache.directory}. Least recently opened datasets are evicted first.")
+
+    if len(entries):
+        table = entries.assign(Size=entries["Size"].map(format_bytes),
+                               **{"Last Used": entries["Last Used"].dt.strftime("%Y-%m-%d %H:%M")})
+        st.markdown(table.to_html(index=False, classes="dataframe"), unsafe_allow_html=True)
+
+        remove = st.multiselect("Datasets to remove", entries["Key"].tolist())
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("REMOVE SELECTED", disabled=not remove):
+                for key in remove:
+                    disk_cache.discard(key)
+                st.rerun()
+        with col2:
+            if st.button("CLEAR DISK CACHE"):
+                disk_cache.clear()
+                st.rerun()
+
+# ============================================================
+# IN-MEMORY CACHES
+# ============================================================
+st.markdown('<h2 class="section-title">In-Memory Caches</h2>', unsafe_allow_html=True)
+
+caches = {
+    "Datasets": dataset_cache,
+    "Categorical Summaries": summary_cache,
+    "Contingency Tables": contingency_cache,
+    "Correlation Matrices": correlation_cache,
+    "Duplicate Indexes": duplicate_cache,
+    "Exports": export_cache,
+    "Figures": figure_cache,
+    "PDF Reports": report_cache,
+}
+rows = []
+for name, cache in caches.items():
+    stats = cache.stats()
+    rows.append({"Cache": name, "Entries": stats["entries"], "Used": format_bytes(stats["bytes"]),
+                 "Capacity": format_bytes(stats["max_bytes"]),
+                 "Fill": f"{stats['bytes'] / max(stats['max_bytes'], 1):.0%}"})
+st.markdown(pd.DataFrame(rows).to_html(index=False, classes="dataframe"), unsafe_allow_html=True)
+
+if st.button("CLEAR IN-MEMORY CACHES"):
+    for cache in caches.values():
+        cache.clear()
+    st.rerun()
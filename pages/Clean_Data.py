@@ -1,19 +1,38 @@
+import os
 import streamlit as st
 import pandas as  pd
-import numpy as np
-from scipy.stats import skew
-from sklearn.preprocessing import PowerTransformer
-from io import BytesIO
+from utils.config import OUT_OF_CORE_DOWNLOAD_MAX_BYTES, OUT_OF_CORE_FIT_ROWS, STREAMING_MIN_BYTES
+from utils.data_loader import (load_dataset, active_upload, compact_memory_toggle, dataset_meta, file_type_of,
+                               load_options, load_summary)
+from utils.duplicates import duplicate_index
+from utils.cleaning import (
+    CleaningPipeline,
+    bulk_fill,
+    bulk_power_transform,
+    describe_operation,
+    fill_operation,
+    power_transform_operation,
+)
+from utils.memory import format_bytes
+from utils.perf import performance_panel, start_run, timer
+from utils.sessions import SpilledUpload, current_session
+from utils.recipes import RECIPE_FORMATS, dump_recipe, make_recipe, parse_recipe
+from utils.out_of_core import ChunkSource, run_out_of_core
+from utils.exports import cached_export, export_formats, is_cached
+from utils.writers import WRITE_FORMATS, open_writer
 
 # -------------------- PAGE CONFIG --------------------
 st.set_page_config(page_title="Clean Data - AutoClean AI", layout="wide")
+start_run("Clean Data")
 
 # -------------------- SESSION STATE --------------------
-if "original_df" not in st.session_state:
-    st.session_state.original_df = None
+# The cleaned data is an operation log over the shared loaded frame rather
+# than a second full copy of it
+if "pipeline" not in st.session_state:
+    st.session_state.pipeline = None
 
-if "cleaned_df" not in st.session_state:
-    st.session_state.cleaned_df = None
+if "clean_dataset_key" not in st.session_state:
+    st.session_state.clean_dataset_key = None
 
 # Add a version counter to force UI updates
 if "update_counter" not in st.session_state:
@@ -82,31 +101,143 @@ uploaded_file = st.file_uploader(
     "Upload Dataset (CSV, Excel, Parquet)",
     type=["csv", "xlsx", "xls", "parquet"]
 )
-
-# VERY IMPORTANT FIX: Load only once
-if uploaded_file is not None and st.session_state.original_df is None:
-    file_type = uploaded_file.name.split(".")[-1]
-
-    if file_type == "csv":
-        df = pd.read_csv(uploaded_file)
-    elif file_type in ["xlsx", "xls"]:
-        df = pd.read_excel(uploaded_file)
-    elif file_type == "parquet":
-        df = pd.read_parquet(uploaded_file)
-    else:
-        st.error("Unsupported file type")
+compact_memory_toggle()
+
+# Fall back to the dataset already loaded on another page
+if uploaded_file is None:
+    uploaded_file = active_upload()
+
+# VERY IMPORTANT FIX: Load only once per dataset
+if uploaded_file is not None:
+    load_options(uploaded_file)
+    try:
+        with timer("load dataset"):
+            df = load_dataset(uploaded_file)
+    except Exception as e:
+        st.error(f"Error reading file: {str(e)}")
+        performance_panel()
         st.stop()
-
-    st.session_state.original_df = df.copy()
-    st.session_state.cleaned_df = df.copy()
-    st.session_state.update_counter += 1
+    load_summary()
+
+    if st.session_state.clean_dataset_key != st.session_state.dataset_key:
+        # The shared cached frame is the pipeline base and is never mutated
+        if st.session_state.pipeline is not None:
+            st.session_state.pipeline.close()
+        st.session_state.pipeline = CleaningPipeline(
+            df, duplicates=duplicate_index(df, st.session_state.dataset_key))
+        st.session_state.clean_dataset_key = st.session_state.dataset_key
+        st.session_state.update_counter += 1
+        # Counted against the session's memory quota
+        current_session().pipeline = st.session_state.pipeline
+    elif st.session_state.pipeline.suspended:
+        # Released while the session was idle: reattach the reopened dataset
+        # and replay from the spilled checkpoints
+        st.session_state.pipeline.resume(df, duplicates=duplicate_index(df, st.session_state.dataset_key))
 
 # ============================================================
 # MAIN WORKFLOW
 # ============================================================
-if st.session_state.cleaned_df is not None:
+def record(op):
+    """Apply a cleaning step to the pipeline and refresh the widgets."""
+    st.session_state.pipeline.apply(op)
+    st.session_state.update_counter += 1
+    st.rerun()
+
 
-    df = st.session_state.cleaned_df
+def reset_pipeline():
+    # Steps stay in the history, so a reset can be undone with Redo
+    st.session_state.pipeline.reset()
+    st.session_state.update_counter += 1
+    st.rerun()
+
+
+def apply_bulk(section, operations, report):
+    """Record a bulk step group and keep its report for the next run."""
+    try:
+        st.session_state.pipeline.extend(operations)
+    except Exception as e:
+        st.error(f"Bulk operation failed: {str(e)}")
+        return
+    st.session_state.update_counter += 1
+    st.session_state._bulk_report = (section, st.session_state.update_counter, report)
+    st.rerun()
+
+
+def show_bulk_report(section):
+    report = st.session_state.get("_bulk_report")
+    if report is not None and report[0] == section and report[1] == st.session_state.update_counter:
+        st.markdown(report[2].to_html(index=False, classes="custom-table", na_rep="-"), unsafe_allow_html=True)
+
+
+def move_history(position):
+    st.session_state.pipeline.goto(position)
+    st.session_state.update_counter += 1
+    st.rerun()
+
+
+# A suspended pipeline has no frames until its dataset is reopened
+if st.session_state.pipeline is not None and not st.session_state.pipeline.suspended:
+
+    pipeline = st.session_state.pipeline
+    df = pipeline.frame()
+
+    # ---------------- Cleaning History ----------------
+    st.markdown('<h2 class="section-title">Cleaning History</h2>', unsafe_allow_html=True)
+
+    h1, h2, _ = st.columns([1,1,6])
+    with h1:
+        if st.button("Undo", disabled=not pipeline.can_undo,
+                     key=f"undo_btn_{st.session_state.update_counter}"):
+            move_history(pipeline.position - 1)
+    with h2:
+        if st.button("Redo", disabled=not pipeline.can_redo,
+                     key=f"redo_btn_{st.session_state.update_counter}"):
+            move_history(pipeline.position + 1)
+
+    history = pipeline.checkpoint_stats()
+    st.caption(f"Step {pipeline.position} of {len(pipeline.operations)} · {history['checkpoints']} checkpoints "
+               f"({format_bytes(history['in_memory_bytes'])} in memory, {history['spilled']} spilled to disk)")
+
+    if pipeline.operations:
+        with st.expander("Steps"):
+            for step, op in enumerate(pipeline.operations, start=1):
+                s1, s2 = st.columns([6,1])
+                label = describe_operation(op)
+                s1.markdown(label if step <= pipeline.position else f"~~{label}~~")
+                if step != pipeline.position and s2.button("Go to", key=f"goto_{step}_{st.session_state.update_counter}"):
+                    move_history(step)
+
+    # ---------------- Recipes ----------------
+    # The applied steps, with their fitted values, replay on other files here
+    # or headless with ``python -m utils.batch``
+    r1, r2, r3, _ = st.columns([1,1,2,4])
+    with r1:
+        recipe_format = st.selectbox("Recipe Format", list(RECIPE_FORMATS), key="recipe_format")
+    with r2:
+        extension, recipe_mime = RECIPE_FORMATS[recipe_format]
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.download_button("EXPORT RECIPE",
+                           data=lambda: dump_recipe(make_recipe(pipeline.operations[:pipeline.position],
+                                                                source=getattr(uploaded_file, "name", None)),
+                                                    recipe_format),
+                           file_name=f"cleaning_recipe.{extension}",
+                           mime=recipe_mime,
+                           disabled=not pipeline.can_undo,
+                           on_click="ignore",
+                           key=f"recipe_export_btn_{st.session_state.update_counter}")
+    with r3:
+        recipe_types = ["json", "yaml", "yml"] if "YAML" in RECIPE_FORMATS else ["json"]
+        recipe_file = st.file_uploader("Apply Recipe", type=recipe_types,
+                                       key=f"recipe_upload_{st.session_state.update_counter}")
+    if recipe_file is not None and st.button("APPLY RECIPE", key=f"recipe_apply_btn_{st.session_state.update_counter}"):
+        try:
+            recipe = parse_recipe(recipe_file.getvalue().decode("utf-8"))
+            pipeline.extend(recipe["steps"])
+        except Exception as e:
+            st.error(f"Recipe could not be applied: {str(e)}")
+        else:
+            st.session_state.update_counter += 1
+            st.rerun()
 
     # ---------------- Columns & Dtypes ----------------
     st.markdown('<h2 class="section-title">Columns and Data Types</h2>', unsafe_allow_html=True)
@@ -122,28 +253,16 @@ if st.session_state.cleaned_df is not None:
     # ---------------- Missing & Skewness ----------------
     st.markdown('<h2 class="section-title">Missing Values and Skewness</h2>', unsafe_allow_html=True)
 
-    missing = df.isnull().sum()
-    numeric_cols = df.select_dtypes(include=np.number).columns
-
-    skewness = []
-    for col in df.columns:
-        if col in numeric_cols:
-            skewness.append(round(skew(df[col].dropna()), 3))
-        else:
-            skewness.append("N/A")
-
-    summary_df = pd.DataFrame({
-        "Column": df.columns,
-        "Missing Values": missing.values,
-        "Skewness": skewness
-    })
+    # Kept up to date step by step: only the columns a step touched are re-profiled
+    profile = pipeline.profile()
+    summary_df = profile.missing_and_skew()
 
     st.markdown(summary_df.to_html(index=False, classes="custom-table"),
                 unsafe_allow_html=True)
 
     # ---------------- Duplicates ----------------
     st.markdown('<h2 class="section-title">Duplicate Records</h2>', unsafe_allow_html=True)
-    duplicate_count = df.duplicated().sum()
+    duplicate_count = pipeline.duplicate_index().count(df)
     st.markdown(f"<h3 style='font-size: 24px; margin: 10px 0; font-weight: 600;'>Total Duplicate Rows: {duplicate_count}</h3>", unsafe_allow_html=True)
 
     # ============================================================
@@ -158,15 +277,10 @@ if st.session_state.cleaned_df is not None:
     c1, c2, _ = st.columns([1,1,6])
     with c1:
         if st.button("Drop", key=f"drop_column_btn_{st.session_state.update_counter}"):
-            df = df.drop(columns=[col_to_drop])
-            st.session_state.cleaned_df = df
-            st.session_state.update_counter += 1
-            st.rerun()
+            record({"op": "drop", "columns": [col_to_drop]})
     with c2:
         if st.button("Reset", key=f"reset_drop_column_btn_{st.session_state.update_counter}"):
-            st.session_state.cleaned_df = st.session_state.original_df.copy()
-            st.session_state.update_counter += 1
-            st.rerun()
+            reset_pipeline()
 
     # ---------------- Rename Column ----------------
     st.markdown('<h2 class="section-title">Rename Column</h2>', unsafe_allow_html=True)
@@ -179,15 +293,10 @@ if st.session_state.cleaned_df is not None:
     with c3:
         if st.button("Apply", key=f"rename_apply_btn_{st.session_state.update_counter}"):
             if new_name.strip():
-                df = df.rename(columns={col_to_rename: new_name})
-                st.session_state.cleaned_df = df
-                st.session_state.update_counter += 1
-                st.rerun()
+                record({"op": "rename", "columns": {col_to_rename: new_name}})
     with c4:
         if st.button("Reset", key=f"rename_reset_btn_{st.session_state.update_counter}"):
-            st.session_state.cleaned_df = st.session_state.original_df.copy()
-            st.session_state.update_counter += 1
-            st.rerun()
+            reset_pipeline()
 
     # ---------------- Change Data Type ----------------
     st.markdown('<h2 class="section-title">Change Data Type</h2>', unsafe_allow_html=True)
@@ -201,17 +310,15 @@ if st.session_state.cleaned_df is not None:
     with c5:
         if st.button("Apply", key=f"dtype_apply_btn_{st.session_state.update_counter}"):
             try:
-                df[col_dtype] = df[col_dtype].astype(dtype_option)
-                st.session_state.cleaned_df = df
-                st.session_state.update_counter += 1
-                st.rerun()
+                st.session_state.pipeline.apply({"op": "astype", "column": col_dtype, "dtype": dtype_option})
             except Exception as e:
                 st.error(f"Type conversion failed: {str(e)}")
+            else:
+                st.session_state.update_counter += 1
+                st.rerun()
     with c6:
         if st.button("Reset", key=f"dtype_reset_btn_{st.session_state.update_counter}"):
-            st.session_state.cleaned_df = st.session_state.original_df.copy()
-            st.session_state.update_counter += 1
-            st.rerun()
+            reset_pipeline()
 
     # ============================================================
     # HANDLE MISSING VALUES
@@ -221,7 +328,7 @@ if st.session_state.cleaned_df is not None:
     selected_col = st.selectbox("Select Column", df.columns, 
                                 key=f"missing_col_{st.session_state.update_counter}")
 
-    if df[selected_col].dtype in ["int64", "float64"]:
+    if pd.api.types.is_numeric_dtype(df[selected_col]) and not pd.api.types.is_bool_dtype(df[selected_col]):
         method = st.selectbox("Method",
                               ["Drop", "0", "Mean", "Median", "Custom Value"],
                               key=f"method_num_{st.session_state.update_counter}")
@@ -243,53 +350,66 @@ if st.session_state.cleaned_df is not None:
         if st.button("Apply", key=f"missing_apply_btn_{st.session_state.update_counter}"):
             try:
                 if method == "Drop":
-                    df = df.dropna(subset=[selected_col])
-                elif method == "Mean":
-                    df[selected_col] = df[selected_col].fillna(df[selected_col].mean())
-                elif method == "Median":
-                    df[selected_col] = df[selected_col].fillna(df[selected_col].median())
-                elif method == "Mode":
-                    df[selected_col] = df[selected_col].fillna(df[selected_col].mode()[0])
-                elif method == "0":
-                    df[selected_col] = df[selected_col].fillna(0)
-                elif method == "Custom Value":
-                    df[selected_col] = df[selected_col].fillna(custom_val)
-
-                st.session_state.cleaned_df = df
-                st.session_state.update_counter += 1
-                st.rerun()
+                    op = {"op": "dropna", "subset": [selected_col]}
+                else:
+                    # Means, medians and modes are resolved now so the step replays exactly
+                    fill_method = {"0": "zero", "Custom Value": "custom"}.get(method, method.lower())
+                    op = fill_operation(df, selected_col, fill_method, custom_val)
+                st.session_state.pipeline.apply(op)
             except Exception as e:
                 st.error(f"Error handling missing values: {str(e)}")
+            else:
+                st.session_state.update_counter += 1
+                st.rerun()
     with c8:
         if st.button("Reset", key=f"missing_reset_btn_{st.session_state.update_counter}"):
-            st.session_state.cleaned_df = st.session_state.original_df.copy()
-            st.session_state.update_counter += 1
-            st.rerun()
+            reset_pipeline()
+
+    # ---------------- Bulk Imputation ----------------
+    st.markdown("**Bulk Imputation**")
+    missing_cols = profile.missing.index[profile.missing > 0].tolist()
+    bulk_fill_cols = st.multiselect("Columns", df.columns, default=missing_cols,
+                                    key=f"bulk_fill_cols_{st.session_state.update_counter}")
+    bulk_fill_method = st.selectbox("Numeric Method", ["Mean", "Median", "0"],
+                                    help="Non-numeric columns are filled with their mode.",
+                                    key=f"bulk_fill_method_{st.session_state.update_counter}")
+    if st.button("Apply to All", key=f"bulk_fill_btn_{st.session_state.update_counter}"):
+        operations, report = bulk_fill(df, bulk_fill_cols, {"0": "zero"}.get(bulk_fill_method, bulk_fill_method.lower()))
+        apply_bulk("missing", operations, report)
+    show_bulk_report("missing")
 
     # ============================================================
     # HANDLE DUPLICATES
     # ============================================================
     st.markdown('<h2 class="section-title">Handle Duplicates</h2>', unsafe_allow_html=True)
 
+    # Rows count as duplicates when they match on every column, or only on
+    # the chosen key columns
+    dup_keys = st.multiselect("Key Columns (optional)", df.columns,
+                              key=f"dup_keys_{st.session_state.update_counter}")
+    dup_subset = dup_keys or None
+    duplicates = pipeline.duplicate_index()
+    if dup_subset is not None:
+        st.markdown(f"**Duplicate rows on {', '.join(map(str, dup_keys))}: {duplicates.count(df, dup_subset)}**")
+    dup_groups = duplicates.groups(df, dup_subset)
+    if not dup_groups.empty:
+        with st.expander("Duplicate Groups"):
+            st.markdown(dup_groups.to_html(index=False, classes="custom-table"), unsafe_allow_html=True)
+
     c9, c10, _ = st.columns([1,1,6])
     with c9:
         if st.button("Drop", key=f"duplicate_drop_btn_{st.session_state.update_counter}"):
-            df = df.drop_duplicates()
-            st.session_state.cleaned_df = df
-            st.session_state.update_counter += 1
-            st.rerun()
+            record({"op": "drop_duplicates", "subset": dup_subset})
     with c10:
         if st.button("Reset", key=f"duplicate_reset_btn_{st.session_state.update_counter}"):
-            st.session_state.cleaned_df = st.session_state.original_df.copy()
-            st.session_state.update_counter += 1
-            st.rerun()
+            reset_pipeline()
 
     # ============================================================
     # SKEWNESS TRANSFORMATION
     # ============================================================
     st.markdown('<h2 class="section-title">Skewness Transformation</h2>', unsafe_allow_html=True)
 
-    numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
+    numeric_cols = profile.numeric_cols
 
     if len(numeric_cols) > 0:
         skew_col = st.selectbox("Select Numeric Column", numeric_cols,
@@ -303,23 +423,39 @@ if st.session_state.cleaned_df is not None:
             if st.button("Apply", key=f"skew_apply_btn_{st.session_state.update_counter}"):
                 try:
                     method = "box-cox" if transform_method == "Box-Cox" else "yeo-johnson"
-                    pt = PowerTransformer(method=method)
-                    reshaped = df[[skew_col]].dropna()
-                    transformed = pt.fit_transform(reshaped)
-                    df.loc[reshaped.index, skew_col] = transformed
-                    st.session_state.cleaned_df = df
-                    st.session_state.update_counter += 1
-                    st.rerun()
+                    st.session_state.pipeline.apply(power_transform_operation(df, skew_col, method))
                 except Exception as e:
                     if transform_method == "Box-Cox":
                         st.error("Box-Cox requires positive values.")
                     else:
                         st.error(f"Transformation failed: {str(e)}")
+                else:
+                    st.session_state.update_counter += 1
+                    st.rerun()
         with c12:
             if st.button("Reset", key=f"skew_reset_btn_{st.session_state.update_counter}"):
-                st.session_state.cleaned_df = st.session_state.original_df.copy()
-                st.session_state.update_counter += 1
-                st.rerun()
+                reset_pipeline()
+
+        # ---------------- Bulk Transformation ----------------
+        st.markdown("**Bulk Transformation**")
+        bulk_rule = st.radio("Columns", ["Selected columns", "All columns with |skew| above threshold"],
+                             horizontal=True, key=f"bulk_rule_{st.session_state.update_counter}")
+        if bulk_rule == "Selected columns":
+            bulk_cols = st.multiselect("Select Numeric Columns", numeric_cols,
+                                       key=f"bulk_skew_cols_{st.session_state.update_counter}")
+        else:
+            threshold = st.number_input("Skewness Threshold", min_value=0.0, value=0.5, step=0.1,
+                                        key=f"bulk_threshold_{st.session_state.update_counter}")
+            skewness = profile.numeric["skew_biased"]
+            bulk_cols = [col for col in numeric_cols if col in skewness.index and abs(skewness[col]) > threshold]
+            st.caption(f"{len(bulk_cols)} columns selected: {', '.join(map(str, bulk_cols)) or 'none'}")
+        bulk_method = st.selectbox("Transformation Method", ["Box-Cox", "Yeo-Johnson"],
+                                   key=f"bulk_transform_{st.session_state.update_counter}")
+        if st.button("Apply to All", key=f"bulk_skew_btn_{st.session_state.update_counter}"):
+            method = "box-cox" if bulk_method == "Box-Cox" else "yeo-johnson"
+            operations, report = bulk_power_transform(df, bulk_cols, method)
+            apply_bulk("skew", operations, report)
+        show_bulk_report("skew")
     else:
         st.info("No numeric columns available for skewness transformation.")
 
@@ -328,7 +464,7 @@ if st.session_state.cleaned_df is not None:
     # ============================================================
     st.markdown('<h2 class="section-title">Cleaned Dataset Preview</h2>', unsafe_allow_html=True)
 
-    preview_df = st.session_state.cleaned_df.head()
+    preview_df = df.head()
     st.markdown(preview_df.to_html(index=False, classes="custom-table"),
                 unsafe_allow_html=True)
 
@@ -337,44 +473,91 @@ if st.session_state.cleaned_df is not None:
     # ============================================================
     st.markdown('<h2 class="section-title">Download Cleaned Dataset</h2>', unsafe_allow_html=True)
 
+    # Serialization runs only when DOWNLOAD is clicked, chunk by chunk, and
+    # the bytes are cached per (dataset version, format)
     download_format = st.selectbox("Select Format",
-                                   ["CSV", "Excel", "Parquet"],
+                                   export_formats(df),
                                    key=f"download_{st.session_state.update_counter}")
-
-    df_download = st.session_state.cleaned_df
-
-    def convert_csv(df):
-        return df.to_csv(index=False).encode("utf-8")
-
-    def convert_excel(df):
-        buffer = BytesIO()
-        with pd.ExcelWriter(buffer, engine="xlsxwriter") as writer:
-            df.to_excel(writer, index=False, sheet_name="Cleaned_Data")
-        return buffer.getvalue()
-
-    def convert_parquet(df):
-        buffer = BytesIO()
-        df.to_parquet(buffer, index=False)
-        return buffer.getvalue()
-
-    if download_format == "CSV":
-        data = convert_csv(df_download)
-        file_name = "cleaned_data.csv"
-        mime = "text/csv"
-    elif download_format == "Excel":
-        data = convert_excel(df_download)
-        file_name = "cleaned_data.xlsx"
-        mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    extension, mime = WRITE_FORMATS[download_format][:2]
+    file_name = f"cleaned_data.{extension}"
+    export_version = (st.session_state.dataset_key, pipeline.version)
+
+    # ---------------- Out-of-core ----------------
+    # A sampled or large source can be cleaned in full: every row streams
+    # through the recorded steps straight into the output file, with fills
+    # and transforms refitted on all rows. It needs the source file, which is
+    # gone once the dataset was closed on another page or spilled by a release.
+    meta = dataset_meta() or {}
+    sampled = meta.get("sample_rate", 1.0) < 1.0
+    out_of_core = False
+    if (uploaded_file is not None and not isinstance(uploaded_file, SpilledUpload)
+            and file_type_of(uploaded_file) in ("csv", "parquet")
+            and (sampled or uploaded_file.size >= STREAMING_MIN_BYTES)):
+        out_of_core = st.checkbox("Clean the full file out-of-core", value=sampled,
+                                  help="Streams every row of the uploaded file through the applied steps "
+                                       "instead of exporting the in-memory frame. Median fills and power "
+                                       f"transforms are refitted on a uniform sample of up to "
+                                       f"{OUT_OF_CORE_FIT_ROWS:,} values per column.",
+                                  key=f"out_of_core_{st.session_state.update_counter}")
+
+    if out_of_core:
+        steps = pipeline.operations[:pipeline.position]
+        export_key = (export_version, download_format)
+        prepared = st.session_state.get("_out_of_core_export")
+        # Outputs are deleted when the session is released; prepare again then
+        if prepared is None or prepared[0] != export_key or not os.path.exists(prepared[1]):
+            data = None
+            if st.button("PREPARE FULL FILE", key=f"out_of_core_btn_{st.session_state.update_counter}"):
+                bar = st.progress(0.0, text="Cleaning full file...")
+                path = pipeline.output_path(extension)
+                try:
+                    source = ChunkSource(uploaded_file, file_type_of(uploaded_file),
+                                         columns=meta.get("load_options", {}).get("columns"))
+                    with timer("out-of-core clean", format=download_format):
+                        result = run_out_of_core(source, steps,
+                                                 open_writer(path, download_format),
+                                                 on_progress=lambda stage, fraction: bar.progress(fraction, text=stage))
+                except Exception as e:
+                    pipeline.discard_output(path)
+                    st.error(f"Out-of-core cleaning failed: {str(e)}")
+                else:
+                    if prepared is not None:
+                        pipeline.discard_output(prepared[1])
+                    st.session_state._out_of_core_export = (export_key, path, result.rows_in, result.rows_out)
+                    st.rerun()
+                finally:
+                    bar.empty()
+        else:
+            _, path, rows_in, rows_out = prepared
+            size = os.path.getsize(path)
+            st.caption(f"Full file cleaned: {rows_in:,} → {rows_out:,} rows, "
+                       f"{format_bytes(size)} {download_format}")
+            if size <= OUT_OF_CORE_DOWNLOAD_MAX_BYTES:
+                def data():
+                    with open(path, "rb") as output:
+                        return output.read()
+            else:
+                # Streamlit serves downloads from memory; keep large outputs on disk
+                data = None
+                st.info(f"The cleaned file is larger than the {format_bytes(OUT_OF_CORE_DOWNLOAD_MAX_BYTES)} "
+                        f"that can be downloaded through the browser. It is kept at `{path}` on the server "
+                        f"until this session ends; `python -m utils.batch` writes full-file outputs "
+                        f"straight to a chosen path.")
     else:
-        data = convert_parquet(df_download)
-        file_name = "cleaned_data.parquet"
-        mime = "application/octet-stream"
+        data = lambda: cached_export(export_version, df, download_format)
+        if is_cached(export_version, download_format):
+            st.caption(f"{download_format} export ready: "
+                       f"{format_bytes(len(cached_export(export_version, df, download_format)))}")
 
     colA, colB, colC = st.columns([3,2,3])
     with colB:
-        st.download_button("DOWNLOAD FILE",
-                           data=data,
-                           file_name=file_name,
-                           mime=mime,
-                           use_container_width=True,
-                           key=f"download_btn_{st.session_state.update_counter}")
\ No newline at end of file
+        if data is not None:
+            st.download_button("DOWNLOAD FILE",
+                               data=data,
+                               file_name=file_name,
+                               mime=mime,
+                               use_container_width=True,
+                               on_click="ignore",
+                               key=f"download_btn_{st.session_state.update_counter}")
+
+performance_panel()
@@ -1,27 +1,27 @@
 # pages/Quick_Insights.py
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
-import tempfile
 import matplotlib
 matplotlib.use('Agg')
+from utils.config import CORRELATION_HEATMAP_MAX_COLUMNS
+from utils.correlation import top_pairs
+from utils.data_loader import (load_dataset, active_upload, dataset_meta, file_type_of, clear_active_dataset,
+                               compact_memory_toggle, load_options, load_summary)
+from utils.duplicates import duplicate_index
+from utils.figures import correlation_png, distribution_png
+from utils.memory import format_bytes
+from utils.perf import performance_panel, start_run, timer
+from utils.profiling import profile_frame
+from utils.report import cached_report, discard_job, report_job, start_report
 
 # -------------------- PAGE CONFIG --------------------
 st.set_page_config(page_title="Quick Insights - AutoClean AI", layout="wide")
+start_run("Quick Insights")
 
 # -------------------- SESSION STATE --------------------
-if "uploaded_file" not in st.session_state:
-    st.session_state.uploaded_file = None
-if "df" not in st.session_state:
-    st.session_state.df = None
+# The upload and the loaded frame are held by the session manager
+# (utils.sessions), which may release them while the session is idle
+df = None
 
 # -------------------- CUSTOM CSS --------------------
 st.markdown("""
@@ -39,8 +39,7 @@ col1, col2, col3 = st.columns([8,1,1])
 
 with col3:  # Move to extreme right
     if st.button("HOME", use_container_width=True):
-        st.session_state.uploaded_file = None
-        st.session_state.df = None
+        clear_active_dataset()
         st.switch_page("app.py")
 
 # Red background with white text for HOME button
@@ -70,31 +69,33 @@ st.markdown('<h1 class="section-title">Quick Insights</h1>', unsafe_allow_html=T
 # -------------------- FILE UPLOAD --------------------
 uploaded_file = st.file_uploader("Upload your dataset (CSV, Excel, Parquet)", 
                                  type=["csv","xlsx","xls","parquet"])
+compact_memory_toggle()
 
-if uploaded_file:
-    st.session_state.uploaded_file = uploaded_file
+# Fall back to the dataset already loaded on another page
+if uploaded_file is None:
+    uploaded_file = active_upload()
 
-if st.session_state.uploaded_file:
-    uploaded_file = st.session_state.uploaded_file
-    file_type = uploaded_file.name.split('.')[-1]
+if uploaded_file is not None:
+    file_type = file_type_of(uploaded_file)
+    load_options(uploaded_file)
     try:
-        if file_type in ["xlsx","xls"]:
-            df = pd.read_excel(uploaded_file)
-        elif file_type=="csv":
-            df = pd.read_csv(uploaded_file)
-        elif file_type=="parquet":
-            df = pd.read_parquet(uploaded_file)
-        else:
-            st.error("Unsupported file type")
-            st.stop()
-        st.session_state.df = df
+        with timer("load dataset"):
+            df = load_dataset(uploaded_file)
+        load_summary()
     except Exception as e:
         st.error(f"Error reading file: {str(e)}")
+        performance_panel()
         st.stop()
 
 # -------------------- DISPLAY DATA & ANALYSIS --------------------
-if st.session_state.df is not None:
-    df = st.session_state.df
+if df is not None:
+    # Streamed CSVs carry exact per-column statistics over every row, which
+    # stay correct even when the memory ceiling forced a sampled frame
+    meta = dataset_meta() or {"rows": len(df), "sample_rate": 1.0, "stats": None}
+    stream_stats = meta["stats"]
+    if meta["sample_rate"] < 1.0:
+        st.warning(f"File exceeds the memory ceiling: analysing a random sample of {len(df):,} "
+                   f"of {meta['rows']:,} rows. Counts, missing values, min/max and means cover all rows.")
 
     # --- File Overview ---
     st.markdown('<h2 class="section-title">File Overview</h2>', unsafe_allow_html=True)
@@ -107,13 +108,23 @@ if st.session_state.df is not None:
     else:
         file_size_display = f"{round(file_size_bytes / (1024 * 1024), 2)} MB"
 
+    if "memory_before" in meta:
+        saved = meta["memory_before"] / max(meta["memory_bytes"], 1)
+        memory_display = (f"{format_bytes(meta['memory_before'])} → "
+                          f"{format_bytes(meta['memory_bytes'])} ({saved:.1f}x smaller)")
+    elif "memory_bytes" in meta:
+        memory_display = format_bytes(meta["memory_bytes"])
+    else:
+        memory_display = format_bytes(int(df.memory_usage(deep=True).sum()))
+
     file_info = pd.DataFrame({
-        "Attribute": ["File Name", "File Type", "File Size", "Rows", "Columns"],
+        "Attribute": ["File Name", "File Type", "File Size", "Memory Usage", "Rows", "Columns"],
         "Value": [
             uploaded_file.name,
             file_type.upper(),
             file_size_display,
-            df.shape[0],
+            memory_display,
+            meta["rows"],
             df.shape[1]
         ]
     })
@@ -133,197 +144,117 @@ if st.session_state.df is not None:
 
     # --- Summary Statistics ---
     st.markdown('<h2 class="section-title">Summary Statistics</h2>', unsafe_allow_html=True)
-    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-    categorical_cols = df.select_dtypes(include=['object','category']).columns.tolist()
+    # One batched profiling pass feeds these tables and the PDF report; it is
+    # kept per dataset so reruns do not profile the same frame again
+    cached_profile = st.session_state.get("_profile")
+    if cached_profile is None or cached_profile[0] != st.session_state.dataset_key:
+        with timer("profile", rows=len(df), columns=df.shape[1]):
+            cached_profile = (st.session_state.dataset_key,
+                              profile_frame(df, exact_stats=stream_stats, total_rows=meta["rows"],
+                                            frequencies=meta.get("frequencies")))
+        st.session_state._profile = cached_profile
+    profile = cached_profile[1]
+    numeric_cols = profile.numeric_cols
+    categorical_cols = profile.categorical_cols
 
     if numeric_cols:
         st.markdown("**Numeric Columns:**")
-        num_summary = df[numeric_cols].describe().T
-        num_summary['median'] = df[numeric_cols].median()
-        num_summary['skew'] = df[numeric_cols].skew().round(3)
+        num_summary = profile.numeric_summary()
         st.markdown(num_summary.to_html(classes="dataframe"), unsafe_allow_html=True)
 
     if categorical_cols:
         st.markdown("**Categorical Columns:**")
-        cat_summary = pd.DataFrame({
-            "Column": categorical_cols,
-            "Unique Values":[df[c].nunique() for c in categorical_cols],
-            "Most Frequent":[df[c].mode()[0] if not df[c].mode().empty else None for c in categorical_cols],
-            "Frequency":[df[c].value_counts().iloc[0] if not df[c].value_counts().empty else None for c in categorical_cols]
-        })
+        cat_summary = profile.categorical_summary()
         st.markdown(cat_summary.to_html(index=False, classes="dataframe"), unsafe_allow_html=True)
+        if profile.categorical_estimated:
+            st.caption(f"Unique values and most frequent values are estimated over all {meta['rows']:,} rows "
+                       "with HyperLogLog and Count-Min sketches.")
 
     # --- Data Issues Overview ---
     st.markdown('<h2 class="section-title">Data Issues Overview</h2>', unsafe_allow_html=True)
-    data_issues = pd.DataFrame({
-        "Column":df.columns,
-        "Missing Values":df.isnull().sum(),
-        "Missing %":(df.isnull().sum()/len(df)*100).round(2),
-        "Skewness":[df[c].skew() if np.issubdtype(df[c].dtype,np.number) else "N/A" for c in df.columns]
-    })
+    data_issues = profile.data_issues()
     st.markdown(data_issues.to_html(index=False, classes="dataframe"), unsafe_allow_html=True)
 
     # --- Duplicates ---
-    total_duplicates = df.duplicated().sum()
+    # Row hashes are computed once per dataset and shared with Clean Data
+    with timer("duplicates"):
+        duplicates = duplicate_index(df, st.session_state.dataset_key)
+        total_duplicates = duplicates.count(df)
     st.markdown(f"<h3 style='font-size: 24px; margin: 10px 0; font-weight: 600;'>Total Duplicate Rows: {total_duplicates}</h3>", unsafe_allow_html=True)
+    if total_duplicates:
+        with st.expander("Duplicate Groups"):
+            st.markdown(duplicates.groups(df).to_html(index=False, classes="dataframe"), unsafe_allow_html=True)
 
     # --- Numeric Column Distributions (SMALLER SIZE) ---
+    # Charts are rendered once to in-memory PNGs and reused by the PDF report
     st.markdown('<h2 class="section-title">Numeric Column Distributions</h2>', unsafe_allow_html=True)
     if numeric_cols:
         cols_per_row = 3
         for i in range(0, min(len(numeric_cols), 6), cols_per_row):
             row_cols = st.columns(cols_per_row)
             for j, col in enumerate(numeric_cols[i:i+cols_per_row]):
-                with row_cols[j]:
-                    fig, ax = plt.subplots(figsize=(2.5, 2.5))
-                    sns.histplot(df[col].dropna(), kde=True, color='#ff6b6b', ax=ax)
-                    ax.set_xlabel(col, fontsize=8)
-                    ax.set_ylabel('')
-                    ax.tick_params(labelsize=6)
-                    st.pyplot(fig)
-                    plt.close(fig)
+                with row_cols[j], timer("distribution chart", column=col):
+                    st.image(distribution_png(df, col, st.session_state.dataset_key))
 
     # --- Correlation Analysis (SMALLER SIZE IN STREAMLIT) ---
+    strongest = None
     if len(numeric_cols) > 1:
         st.markdown('<h2 class="section-title">Correlation Analysis</h2>', unsafe_allow_html=True)
-        fig, ax = plt.subplots(figsize=(4, 3))
-        sns.heatmap(df[numeric_cols].corr(), annot=True, cmap='coolwarm', center=0, 
-                    linewidths=1, ax=ax, annot_kws={'size':8}, fmt='.2f')
-        ax.tick_params(labelsize=8)
-        plt.tight_layout()
-        st.pyplot(fig)
-        plt.close(fig)
-
-    # -------------------- PDF REPORT FUNCTION --------------------
-    def generate_pdf():
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        styles = getSampleStyleSheet()
-        story = []
-
-        # Title
-        title_style = ParagraphStyle('title', parent=styles['Heading1'], alignment=TA_CENTER, fontSize=22, textColor=colors.HexColor('#ff6b6b'))
-        story.append(Paragraph("Quick Insights Report", title_style))
-        story.append(Spacer(1,20))
-
-        # Helper function to convert DataFrame to ReportLab Table
-        def df_to_table(df):
-            # Convert DataFrame to list of lists
-            data = [df.columns.tolist()] + df.values.tolist()
-            table = Table(data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            return table
-
-        # 1. File Overview
-        story.append(Paragraph("1. File Overview", styles['Heading2']))
-        story.append(Spacer(1,8))
-        file_info_table = df_to_table(file_info)
-        story.append(file_info_table)
-        story.append(Spacer(1,15))
-
-        # 2. Columns Overview
-        story.append(Paragraph("2. Columns Overview", styles['Heading2']))
-        story.append(Spacer(1,8))
-        col_info_table = df_to_table(col_info)
-        story.append(col_info_table)
-        story.append(Spacer(1,15))
-
-        # 3. Dataset Sample
-        story.append(Paragraph("3. Dataset Sample", styles['Heading2']))
-        story.append(Spacer(1,8))
-        story.append(Paragraph("First 3 Rows:", styles['Heading4']))
-        first_rows = df.head(3)
-        first_rows_table = df_to_table(first_rows.reset_index(drop=True))
-        story.append(first_rows_table)
-        story.append(Spacer(1,8))
-        story.append(Paragraph("Last 3 Rows:", styles['Heading4']))
-        last_rows = df.tail(3)
-        last_rows_table = df_to_table(last_rows.reset_index(drop=True))
-        story.append(last_rows_table)
-        story.append(Spacer(1,15))
+        _, heatmap_col, _ = st.columns([1, 2, 1])
+        with heatmap_col, timer("correlation heatmap", columns=len(numeric_cols)):
+            st.image(correlation_png(df, numeric_cols, st.session_state.dataset_key))
+        if len(numeric_cols) > CORRELATION_HEATMAP_MAX_COLUMNS:
+            st.caption(f"The heatmap shows the {CORRELATION_HEATMAP_MAX_COLUMNS} columns in the strongest "
+                       f"pairs of {len(numeric_cols)} numeric columns.")
+            st.markdown("**Strongest Correlations:**")
+            with timer("strongest correlations"):
+                strongest = top_pairs(df, numeric_cols, st.session_state.dataset_key)
+            st.markdown(strongest.to_html(index=False, classes="dataframe"), unsafe_allow_html=True)
+
+    # -------------------- PDF REPORT --------------------
+    # The report is built only on request, in a worker thread, and cached per
+    # dataset so later downloads and reruns reuse the finished bytes
+    report_key = st.session_state.dataset_key
+    report_sections = {
+        "file_info": file_info, "col_info": col_info,
+        "num_summary": num_summary if numeric_cols else None,
+        "cat_summary": cat_summary if categorical_cols else None,
+        "data_issues": data_issues, "total_duplicates": total_duplicates,
+        "numeric_cols": numeric_cols, "categorical_cols": categorical_cols,
+        "top_pairs": strongest,
+    }
+    job = report_job(report_key)
+    polling = job is not None and job.running
+
+    @st.fragment(run_every=1.0 if polling else None)
+    def pdf_report_section():
+        pdf = cached_report(report_key)
+        job = report_job(report_key)
+        if pdf is not None:
+            if polling:
+                # A full rerun redefines the fragment without polling
+                st.rerun()
+            st.download_button(
+                label="DOWNLOAD PDF REPORT",
+                data=pdf.pdf,
+                file_name="Report.pdf",
+                mime="application/pdf",
+                on_click="ignore"
+            )
+            st.caption(f"Report size {format_bytes(len(pdf.pdf))} · {pdf.images} charts rendered in memory "
+                       f"({format_bytes(pdf.image_bytes)}) · {pdf.temp_files} temporary files")
+        elif job is not None and job.error is not None:
+            st.error(f"Report generation failed: {job.error}")
+            if st.button("RETRY PDF REPORT"):
+                discard_job(report_key)
+                st.rerun()
+        elif job is not None:
+            st.progress(job.fraction, text=f"Building PDF report: {job.stage}")
+        elif st.button("GENERATE PDF REPORT"):
+            start_report(report_key, df, report_sections)
+            st.rerun()
 
-        # 4. Summary Statistics
-        story.append(Paragraph("4. Summary Statistics", styles['Heading2']))
-        story.append(Spacer(1,8))
-        
-        if numeric_cols:
-            story.append(Paragraph("Numeric Columns:", styles['Heading4']))
-            num_summary_reset = num_summary.reset_index()
-            num_summary_reset.columns = ['Statistic'] + list(num_summary_reset.columns[1:])
-            num_summary_table = df_to_table(num_summary_reset)
-            story.append(num_summary_table)
-            story.append(Spacer(1,8))
-
-        if categorical_cols:
-            story.append(Paragraph("Categorical Columns:", styles['Heading4']))
-            cat_summary_table = df_to_table(cat_summary)
-            story.append(cat_summary_table)
-            story.append(Spacer(1,15))
-
-        # 5. Data Issues Overview
-        story.append(Paragraph("5. Data Issues Overview", styles['Heading2']))
-        story.append(Spacer(1,8))
-        data_issues_table = df_to_table(data_issues)
-        story.append(data_issues_table)
-        story.append(Spacer(1,8))
-
-        # 6. Duplicates
-        story.append(Paragraph(f"6. Total Duplicate Rows: {total_duplicates}", styles['Heading2']))
-        story.append(Spacer(1,15))
-
-        # 7. Numeric Column Distributions - LARGER IMAGES IN PDF
-        if numeric_cols:
-            story.append(Paragraph("7. Numeric Column Distributions", styles['Heading2']))
-            story.append(Spacer(1,8))
-            for col in numeric_cols[:6]:
-                # Create larger figure for PDF with higher DPI
-                fig, ax = plt.subplots(figsize=(6, 4))  # Larger figure size
-                sns.histplot(df[col].dropna(), kde=True, ax=ax, color="#ff6b6b")
-                ax.set_xlabel(col, fontsize=12)
-                ax.set_ylabel('Frequency', fontsize=12)
-                ax.tick_params(labelsize=10)
-                img_path = tempfile.NamedTemporaryFile(delete=False, suffix=".png").name
-                fig.savefig(img_path, bbox_inches="tight", dpi=150)  # Higher DPI for quality
-                plt.close(fig)
-                story.append(Paragraph(f"{col} Distribution", styles['Heading4']))
-                story.append(Image(img_path, width=400, height=300))  # Much larger image in PDF
-                story.append(Spacer(1,15))
-            story.append(Spacer(1,8))
-
-        # 8. Correlation Analysis - LARGER IMAGE IN PDF
-        if len(numeric_cols) > 1:
-            story.append(Paragraph("8. Correlation Analysis", styles['Heading2']))
-            story.append(Spacer(1,8))
-            # Create larger figure for PDF with higher DPI
-            fig, ax = plt.subplots(figsize=(7, 6))  # Larger figure size
-            sns.heatmap(df[numeric_cols].corr(), annot=True, cmap="coolwarm", center=0,
-                        linewidths=1, ax=ax, annot_kws={'size':10}, fmt='.2f')
-            ax.tick_params(labelsize=10)
-            plt.tight_layout()
-            img_path = tempfile.NamedTemporaryFile(delete=False, suffix=".png").name
-            fig.savefig(img_path, bbox_inches="tight", dpi=150)  # Higher DPI for quality
-            plt.close(fig)
-            story.append(Image(img_path, width=450, height=400))  # Much larger image in PDF
-
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-        return buffer.getvalue()
-
-    # -------------------- PDF DOWNLOAD BUTTON --------------------
     st.markdown("<br><br>", unsafe_allow_html=True)
-    st.download_button(
-        label="DOWNLOAD PDF REPORT",
-        data=generate_pdf(),
-        file_name="Report.pdf",
-        mime="application/pdf"
-    )
\ No newline at end of file
+    pdf_report_section()
+
+performance_panel()
@@ -1,16 +1,25 @@
 # pages/Visual_Explorer.py
 
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
 import seaborn as sns
 import numpy as np
-from io import BytesIO
 import plotly.graph_objects as go
 from matplotlib.patches import Circle
 import squarify
+from utils.aggregation import aggregation_note, draw_binned_line, draw_bubbles, draw_density, is_large
+from utils.categorical import categorical_summary
+from utils.config import CORRELATION_HEATMAP_MAX_COLUMNS, KENDALL_MAX_ROWS, SWARM_SAMPLE_ROWS
+from utils.contingency import contingency
+from utils.correlation import METHODS, correlation, heatmap_columns, top_pairs
+from utils.data_loader import (
+    load_dataset, active_upload, compact_memory_toggle, dataset_meta, load_options, load_summary,
+)
+from utils.figures import EXPORT_DPI, EXPORT_DPIS, EXPORT_FORMATS, axes_chart, cached_chart, export_chart
+from utils.perf import performance_panel, start_run, timer
+from utils.sampling import sample_for_plot
 
 st.set_page_config(page_title="Visual Explorer", layout="wide")
+start_run("Visual Explorer")
 
 # =========================
 # CUSTOM CSS (Same as Clean Data)
@@ -107,8 +116,12 @@ def treemap(data, ax):
 
 
 def density_2d(x, y, ax):
-    h = ax.hist2d(x, y, bins=40)
-    plt.colorbar(h[3], ax=ax)
+    if is_large(x):
+        draw_density(ax, x, y)
+        return
+    valid = x.notna() & y.notna()
+    h = ax.hist2d(x[valid], y[valid], bins=40)
+    ax.figure.colorbar(h[3], ax=ax)
 
 
 def bubble_plot(x, y, df, ax):
@@ -119,31 +132,23 @@ def bubble_plot(x, y, df, ax):
             size_col = col
             break
 
-    if size_col:
-        sizes = (df[size_col] - df[size_col].min())
-        sizes = sizes / (sizes.max() + 1e-9) * 300 + 30
+    if is_large(df):
+        draw_bubbles(ax, df[x], df[y], df[size_col] if size_col else None)
     else:
-        sizes = 80
+        if size_col:
+            sizes = (df[size_col] - df[size_col].min())
+            sizes = sizes / (sizes.max() + 1e-9) * 300 + 30
+        else:
+            sizes = 80
 
-    ax.scatter(df[x], df[y], s=sizes, alpha=0.6)
+        ax.scatter(df[x], df[y], s=sizes, alpha=0.6)
     ax.set_xlabel(x)
     ax.set_ylabel(y)
 
 
-def sankey_diagram(df, col1, col2):
-    ct = pd.crosstab(df[col1], df[col2])
-
-    labels = list(ct.index) + list(ct.columns)
-    source = []
-    target = []
-    value = []
-
-    for i, idx in enumerate(ct.index):
-        for j, col in enumerate(ct.columns):
-            if ct.loc[idx, col] > 0:
-                source.append(i)
-                target.append(len(ct.index) + j)
-                value.append(ct.loc[idx, col])
+def sankey_diagram(table):
+    # One link per non-zero cell of the (folded) contingency table
+    labels, source, target, value = table.links()
 
     fig = go.Figure(data=[go.Sankey(
         node=dict(label=labels),
@@ -161,23 +166,26 @@ uploaded_file = st.file_uploader(
     "Upload Dataset",
     type=["csv", "xlsx", "xls", "parquet"]
 )
+compact_memory_toggle()
 
-if uploaded_file is not None:
+# Fall back to the dataset already loaded on another page
+if uploaded_file is None:
+    uploaded_file = active_upload()
 
-    file_type = uploaded_file.name.split(".")[-1].lower()
+if uploaded_file is not None:
 
-    if file_type == "csv":
-        df = pd.read_csv(uploaded_file)
-    elif file_type in ["xlsx", "xls"]:
-        df = pd.read_excel(uploaded_file)
-    elif file_type == "parquet":
-        df = pd.read_parquet(uploaded_file)
-    else:
-        st.error("Unsupported file format")
+    load_options(uploaded_file)
+    try:
+        with timer("load dataset"):
+            df = load_dataset(uploaded_file)
+    except Exception as e:
+        st.error(f"Error reading file: {str(e)}")
+        performance_panel()
         st.stop()
+    load_summary()
 
     numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
-    categorical_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
+    categorical_cols = df.select_dtypes(include=["object", "category", "string"]).columns.tolist()
     datetime_cols = df.select_dtypes(include=["datetime64"]).columns.tolist()
 
     all_cols = df.columns.tolist()
@@ -190,6 +198,37 @@ if uploaded_file is not None:
         horizontal=True
     )
 
+    # Rendered charts are cached per (dataset, viz type, columns, plot type),
+    # so revisiting a chart skips drawing and PNG encoding entirely
+    dataset_key = st.session_state.dataset_key
+
+    def show_chart(key, build, file_name, note=None):
+        with timer("chart", chart=file_name):
+            chart = cached_chart(key, build)
+        st.image(chart.screen, width="stretch")
+        for caption in (note, chart.note):
+            if caption:
+                st.caption(caption)
+
+        # ================= DOWNLOAD BUTTON (Bottom Left) =================
+        # Export is encoded only when the download is requested, in the
+        # chosen format and resolution, so it never delays the chart above
+        col_left, col_format, col_dpi, col_right = st.columns([1, 1, 1, 3])
+        with col_format:
+            export_format = st.selectbox("Format", list(EXPORT_FORMATS), key="export_format")
+        with col_dpi:
+            export_dpi = st.selectbox("Resolution (DPI)", EXPORT_DPIS, index=EXPORT_DPIS.index(EXPORT_DPI),
+                                      key="export_dpi", disabled=export_format != "PNG")
+        _, mime, extension = EXPORT_FORMATS[export_format]
+        with col_left:
+            st.download_button(
+                label="DOWNLOAD",
+                data=lambda: export_chart(key, build, export_format, export_dpi),
+                file_name=f"{file_name}.{extension}",
+                mime=mime,
+                use_container_width=True
+            )
+
     # =====================================================
     # UNIVARIATE
     # =====================================================
@@ -197,9 +236,6 @@ if uploaded_file is not None:
     if viz_type == "Univariate":
 
         column = st.selectbox("Select Column", all_cols)
-        
-        # Smaller figure size
-        fig, ax = plt.subplots(figsize=(8, 4))
 
         if column in numeric_cols:
 
@@ -208,16 +244,24 @@ if uploaded_file is not None:
                 ["Histogram", "Box Plot", "KDE Plot", "Violin Plot", "Scatter Plot"]
             )
 
-            if plot_type == "Histogram":
-                sns.histplot(df[column], kde=True, ax=ax)
-            elif plot_type == "Box Plot":
-                sns.boxplot(y=df[column], ax=ax)
-            elif plot_type == "KDE Plot":
-                sns.kdeplot(df[column], fill=True, ax=ax)
-            elif plot_type == "Violin Plot":
-                sns.violinplot(y=df[column], ax=ax)
-            elif plot_type == "Scatter Plot":
-                ax.scatter(df.index, df[column])
+            def draw(ax):
+                if plot_type == "Histogram":
+                    sns.histplot(df[column], kde=True, ax=ax)
+                elif plot_type == "Box Plot":
+                    sns.boxplot(y=df[column], ax=ax)
+                elif plot_type == "KDE Plot":
+                    rows, note = sample_for_plot(df[[column]])
+                    sns.kdeplot(rows[column], fill=True, ax=ax)
+                    return note
+                elif plot_type == "Violin Plot":
+                    rows, note = sample_for_plot(df[[column]])
+                    sns.violinplot(y=rows[column], ax=ax)
+                    return note
+                elif plot_type == "Scatter Plot":
+                    if is_large(df):
+                        draw_density(ax, df.index.to_series(name="Row"), df[column])
+                    else:
+                        ax.scatter(df.index, df[column])
 
         elif column in categorical_cols:
 
@@ -227,39 +271,37 @@ if uploaded_file is not None:
                  "Donut Chart", "Pareto Chart", "Treemap"]
             )
 
-            counts = df[column].value_counts()
-
-            if plot_type in ["Bar Plot (Count)", "Count Plot"]:
-                sns.countplot(x=df[column], ax=ax)
-                ax.tick_params(axis='x', rotation=45)
-            elif plot_type == "Pie Chart":
-                counts.plot.pie(autopct='%1.1f%%', ax=ax)
-                ax.set_ylabel("")
-            elif plot_type == "Donut Chart":
-                donut_chart(counts, ax)
-            elif plot_type == "Pareto Chart":
-                pareto_chart(counts, ax)
-            elif plot_type == "Treemap":
-                treemap(counts, ax)
-
-        plt.tight_layout()
-        st.pyplot(fig)
-        
-        # ================= DOWNLOAD BUTTON (Bottom Left) =================
-        col_left, col_right = st.columns([1, 3])
-        with col_left:
-            # Save plot to buffer
-            buf = BytesIO()
-            fig.savefig(buf, format="png", dpi=300, bbox_inches="tight")
-            buf.seek(0)
-            
-            st.download_button(
-                label="DOWNLOAD",
-                data=buf,
-                file_name=f"{plot_type.replace(' ', '_')}.png",
-                mime="image/png",
-                use_container_width=True
-            )
+            # Exact top levels with the tail grouped as Other; sampled huge
+            # files use the sketched counts over every row instead
+            with timer("categorical summary", column=column):
+                summary = categorical_summary(df, column, dataset_key, meta=dataset_meta())
+
+            def draw(ax):
+                counts = summary.counts()
+
+                if plot_type in ["Bar Plot (Count)", "Count Plot"]:
+                    sns.barplot(x=counts.index.map(str), y=counts.values, ax=ax)
+                    ax.set_xlabel(column)
+                    ax.set_ylabel("count")
+                    ax.tick_params(axis='x', rotation=45)
+                elif plot_type == "Pie Chart":
+                    counts.plot.pie(autopct='%1.1f%%', ax=ax)
+                    ax.set_ylabel("")
+                elif plot_type == "Donut Chart":
+                    donut_chart(counts, ax)
+                elif plot_type == "Pareto Chart":
+                    pareto_chart(counts, ax)
+                elif plot_type == "Treemap":
+                    treemap(counts, ax)
+
+        else:
+            st.info("No plot types are available for this column's data type.")
+            performance_panel()
+            st.stop()
+
+        show_chart((dataset_key, viz_type, (column,), plot_type), axes_chart(draw),
+                   plot_type.replace(' ', '_'),
+                   note=aggregation_note(plot_type, len(df)) if column in numeric_cols else summary.note())
 
     # =====================================================
     # BIVARIATE
@@ -270,9 +312,6 @@ if uploaded_file is not None:
         col1 = st.selectbox("Select First Column", all_cols)
         col2 = st.selectbox("Select Second Column", all_cols)
 
-        # Smaller figure size
-        fig, ax = plt.subplots(figsize=(8, 4))
-
         if col1 in numeric_cols and col2 in numeric_cols:
 
             plot_type = st.selectbox(
@@ -281,18 +320,31 @@ if uploaded_file is not None:
                  "2D Density Plot", "Bubble Plot", "Area Plot"]
             )
 
-            if plot_type == "Scatter Plot":
-                sns.scatterplot(x=df[col1], y=df[col2], ax=ax)
-            elif plot_type == "Line Plot":
-                sns.lineplot(x=df[col1], y=df[col2], ax=ax)
-            elif plot_type == "2D Density Plot":
-                density_2d(df[col1], df[col2], ax)
-            elif plot_type == "Bubble Plot":
-                bubble_plot(col1, col2, df, ax)
-            elif plot_type == "Area Plot":
-                df.sort_values(col1).plot.area(
-                    x=col1, y=col2, ax=ax
-                )
+            # Above LARGE_DATA_ROWS these draw pre-aggregated bins instead of every row
+            large_data = is_large(df)
+
+            def draw(ax):
+                if plot_type == "Scatter Plot":
+                    if large_data:
+                        draw_density(ax, df[col1], df[col2])
+                    else:
+                        sns.scatterplot(x=df[col1], y=df[col2], ax=ax)
+                elif plot_type == "Line Plot":
+                    if large_data:
+                        draw_binned_line(ax, df[col1], df[col2])
+                    else:
+                        sns.lineplot(x=df[col1], y=df[col2], ax=ax)
+                elif plot_type == "2D Density Plot":
+                    density_2d(df[col1], df[col2], ax)
+                elif plot_type == "Bubble Plot":
+                    bubble_plot(col1, col2, df, ax)
+                elif plot_type == "Area Plot":
+                    if large_data:
+                        draw_binned_line(ax, df[col1], df[col2], area=True)
+                    else:
+                        df.sort_values(col1).plot.area(
+                            x=col1, y=col2, ax=ax
+                        )
 
         elif col1 in categorical_cols and col2 in categorical_cols:
 
@@ -302,23 +354,32 @@ if uploaded_file is not None:
                  "100% Stacked Bar Chart", "Heatmap", "Sankey Diagram"]
             )
 
+            # Every chart of this pair reads the same cached sparse table
+            with timer("contingency table", columns=f"{col1} x {col2}"):
+                table = contingency(df, col1, col2, dataset_key)
+
             if plot_type == "Sankey Diagram":
-                fig_plotly = sankey_diagram(df, col1, col2)
-                st.plotly_chart(fig_plotly, use_container_width=True)
+                with timer("chart", chart="Sankey_Diagram"):
+                    fig_plotly = sankey_diagram(table)
+                    st.plotly_chart(fig_plotly, use_container_width=True)
+                if table.note():
+                    st.caption(table.note())
+                performance_panel()
                 st.stop()
 
-            ct = pd.crosstab(df[col1], df[col2])
+            def draw(ax):
+                ct = table.dense()
 
-            if plot_type == "Bar Plot (Grouped)":
-                ct.plot(kind='bar', ax=ax)
-            elif plot_type == "Stacked Bar Chart":
-                ct.plot(kind='bar', stacked=True, ax=ax)
-            elif plot_type == "100% Stacked Bar Chart":
-                ct.div(ct.sum(axis=1), axis=0).plot(
-                    kind='bar', stacked=True, ax=ax
-                )
-            elif plot_type == "Heatmap":
-                sns.heatmap(ct, annot=True, fmt='d', ax=ax)
+                if plot_type == "Bar Plot (Grouped)":
+                    ct.plot(kind='bar', ax=ax)
+                elif plot_type == "Stacked Bar Chart":
+                    ct.plot(kind='bar', stacked=True, ax=ax)
+                elif plot_type == "100% Stacked Bar Chart":
+                    ct.div(ct.sum(axis=1), axis=0).plot(
+                        kind='bar', stacked=True, ax=ax
+                    )
+                elif plot_type == "Heatmap":
+                    sns.heatmap(ct, annot=True, fmt='d', ax=ax)
 
         else:
 
@@ -336,43 +397,43 @@ if uploaded_file is not None:
                  "KDE Plot with Hue", "Boxen Plot"]
             )
 
-            if plot_type == "Box Plot":
-                sns.boxplot(x=df[cat_col], y=df[num_col], ax=ax)
-            elif plot_type == "Violin Plot":
-                sns.violinplot(x=df[cat_col], y=df[num_col], ax=ax)
-            elif plot_type == "Bar Plot (Mean)":
-                df.groupby(cat_col)[num_col].mean().plot(kind='bar', ax=ax)
-            elif plot_type == "Strip Plot":
-                sns.stripplot(x=df[cat_col], y=df[num_col], ax=ax)
-            elif plot_type == "Swarm Plot":
-                sns.swarmplot(x=df[cat_col], y=df[num_col], ax=ax)
-            elif plot_type == "Point Plot":
-                sns.pointplot(x=df[cat_col], y=df[num_col], ax=ax)
-            elif plot_type == "Histogram with Hue":
-                sns.histplot(data=df, x=num_col, hue=cat_col, ax=ax)
-            elif plot_type == "KDE Plot with Hue":
-                sns.kdeplot(data=df, x=num_col, hue=cat_col, ax=ax)
-            elif plot_type == "Boxen Plot":
-                sns.boxenplot(x=df[cat_col], y=df[num_col], ax=ax)
-
-        plt.tight_layout()
-        st.pyplot(fig)
-        
-        # ================= DOWNLOAD BUTTON (Bottom Left) =================
-        col_left, col_right = st.columns([1, 3])
-        with col_left:
-            # Save plot to buffer
-            buf = BytesIO()
-            fig.savefig(buf, format="png", dpi=300, bbox_inches="tight")
-            buf.seek(0)
-            
-            st.download_button(
-                label="DOWNLOAD",
-                data=buf,
-                file_name=f"{plot_type.replace(' ', '_')}.png",
-                mime="image/png",
-                use_container_width=True
-            )
+            def draw(ax):
+                if plot_type == "Box Plot":
+                    sns.boxplot(x=df[cat_col], y=df[num_col], ax=ax)
+                elif plot_type == "Violin Plot":
+                    rows, note = sample_for_plot(df[[cat_col, num_col]], by=cat_col)
+                    sns.violinplot(x=rows[cat_col], y=rows[num_col], ax=ax)
+                    return note
+                elif plot_type == "Bar Plot (Mean)":
+                    df.groupby(cat_col)[num_col].mean().plot(kind='bar', ax=ax)
+                elif plot_type == "Strip Plot":
+                    rows, note = sample_for_plot(df[[cat_col, num_col]], by=cat_col)
+                    sns.stripplot(x=rows[cat_col], y=rows[num_col], ax=ax)
+                    return note
+                elif plot_type == "Swarm Plot":
+                    # Swarm layout is roughly quadratic in points, so it gets a lower cap
+                    rows, note = sample_for_plot(df[[cat_col, num_col]], cap=SWARM_SAMPLE_ROWS, by=cat_col)
+                    sns.swarmplot(x=rows[cat_col], y=rows[num_col], ax=ax)
+                    return note
+                elif plot_type == "Point Plot":
+                    sns.pointplot(x=df[cat_col], y=df[num_col], ax=ax)
+                elif plot_type == "Histogram with Hue":
+                    sns.histplot(data=df, x=num_col, hue=cat_col, ax=ax)
+                elif plot_type == "KDE Plot with Hue":
+                    rows, note = sample_for_plot(df[[cat_col, num_col]], by=cat_col)
+                    sns.kdeplot(data=rows, x=num_col, hue=cat_col, ax=ax)
+                    return note
+                elif plot_type == "Boxen Plot":
+                    sns.boxenplot(x=df[cat_col], y=df[num_col], ax=ax)
+
+        numeric_pair = col1 in numeric_cols and col2 in numeric_cols
+        categorical_pair = col1 in categorical_cols and col2 in categorical_cols
+        if numeric_pair:
+            note = aggregation_note(plot_type, len(df))
+        else:
+            note = table.note() if categorical_pair else None
+        show_chart((dataset_key, viz_type, (col1, col2), plot_type), axes_chart(draw),
+                   plot_type.replace(' ', '_'), note=note)
 
     # =====================================================
     # MULTIVARIATE
@@ -399,58 +460,48 @@ if uploaded_file is not None:
             if plot_type == "Pairplot":
 
                 if len(numeric_selected) >= 2:
-                    pairplot_fig = sns.pairplot(df[numeric_selected], height=2.5)
-                    st.pyplot(pairplot_fig)
-                    
-                    # ================= DOWNLOAD BUTTON (Bottom Left) =================
-                    col_left, col_right = st.columns([1, 3])
-                    with col_left:
-                        # Save plot to buffer
-                        buf = BytesIO()
-                        pairplot_fig.savefig(buf, format="png", dpi=300, bbox_inches="tight")
-                        buf.seek(0)
-                        
-                        st.download_button(
-                            label="DOWNLOAD",
-                            data=buf,
-                            file_name="Pairplot.png",
-                            mime="image/png",
-                            use_container_width=True
-                        )
+                    def build():
+                        rows, note = sample_for_plot(df[numeric_selected])
+                        return sns.pairplot(rows, height=2.5).figure, note
+
+                    show_chart((dataset_key, viz_type, tuple(numeric_selected), plot_type), build,
+                               "Pairplot")
                 else:
                     st.warning("Select at least 2 numeric columns")
 
             elif plot_type == "Correlation Heatmap":
 
                 if len(numeric_selected) >= 2:
-                    # Smaller figure size for heatmap
-                    fig, ax = plt.subplots(figsize=(8, 6))
-                    sns.heatmap(
-                        df[numeric_selected].corr(),
-                        annot=True,
-                        fmt=".2f",
-                        ax=ax
-                    )
-                    plt.tight_layout()
-                    st.pyplot(fig)
-                    
-                    # ================= DOWNLOAD BUTTON (Bottom Left) =================
-                    col_left, col_right = st.columns([1, 3])
-                    with col_left:
-                        # Save plot to buffer
-                        buf = BytesIO()
-                        fig.savefig(buf, format="png", dpi=300, bbox_inches="tight")
-                        buf.seek(0)
-                        
-                        st.download_button(
-                            label="DOWNLOAD",
-                            data=buf,
-                            file_name="Correlation_Heatmap.png",
-                            mime="image/png",
-                            use_container_width=True
+                    method = METHODS[st.radio("Method", list(METHODS), horizontal=True)]
+                    # The matrix is served from the shared per-dataset cache
+                    heatmap_cols = heatmap_columns(df, numeric_selected, dataset_key, method)
+
+                    def draw(ax):
+                        sns.heatmap(
+                            correlation(df, heatmap_cols, dataset_key, method),
+                            annot=True,
+                            fmt=".2f",
+                            ax=ax
                         )
+
+                    note = None
+                    if len(numeric_selected) > CORRELATION_HEATMAP_MAX_COLUMNS:
+                        note = (f"Showing the {len(heatmap_cols)} columns in the strongest pairs "
+                                f"of {len(numeric_selected)} selected columns.")
+                    if method == "kendall" and len(df) > KENDALL_MAX_ROWS:
+                        note = " ".join(filter(None, [note, f"Kendall's tau is computed on a uniform "
+                                                            f"sample of {KENDALL_MAX_ROWS:,} rows."]))
+                    # Smaller figure size for heatmap
+                    show_chart((dataset_key, viz_type, tuple(numeric_selected), plot_type, method),
+                               axes_chart(draw, figsize=(8, 6)), "Correlation_Heatmap", note)
+                    if len(numeric_selected) > CORRELATION_HEATMAP_MAX_COLUMNS:
+                        st.markdown("**Strongest Correlations:**")
+                        st.markdown(top_pairs(df, numeric_selected, dataset_key, method)
+                                    .to_html(index=False, classes="custom-table"), unsafe_allow_html=True)
                 else:
                     st.warning("Select at least 2 numeric columns")
 
         else:
-            st.warning("Select at least 3 columns")
\ No newline at end of file
+            st.warning("Select at least 3 columns")
+
+performance_panel()
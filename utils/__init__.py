@@ -0,0 +1,8 @@
+# utils/__init__.py
+# Shared building blocks used by the Streamlit pages.
+import pandas as pd
+
+# Copy-on-Write lets frames derived from the shared cached datasets (column
+# drops, renames, single-column replacements) reuse the unchanged column
+# buffers instead of copying the whole table.
+pd.set_option("mode.copy_on_write", True)
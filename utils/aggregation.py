@@ -0,0 +1,126 @@
+# utils/aggregation.py
+# Large-data rendering. Point-per-row charts are reduced to fixed-size bins
+# with vectorized numpy reductions before drawing, so render time and image
+# size no longer grow with the row count.
+import numpy as np
+from matplotlib.colors import LogNorm
+
+from utils.config import LARGE_DATA_ROWS
+
+DENSITY_BINS = 200
+BUBBLE_BINS = 40
+LINE_BINS = 500
+
+# Plot types that switch to aggregated drawing in large-data mode, with the
+# note shown under the chart
+AGGREGATED_PLOTS = {
+    "Scatter Plot": f"rasterized {DENSITY_BINS}x{DENSITY_BINS} density grid",
+    "2D Density Plot": f"{DENSITY_BINS}x{DENSITY_BINS} density grid",
+    "Bubble Plot": f"{BUBBLE_BINS}x{BUBBLE_BINS} bins (bubble size = mean of size column, colour = rows)",
+    "Line Plot": f"{LINE_BINS} x-bins (line = mean, band = min/max)",
+    "Area Plot": f"{LINE_BINS} x-bins (mean per bin)",
+}
+
+
+def is_large(df):
+    return len(df) > LARGE_DATA_ROWS
+
+
+def aggregation_note(plot_type, rows):
+    """Caption describing the reduction applied to ``plot_type``, or None."""
+    if rows <= LARGE_DATA_ROWS or plot_type not in AGGREGATED_PLOTS:
+        return None
+    return f"Large-data mode: {rows:,} rows drawn as {AGGREGATED_PLOTS[plot_type]}."
+
+
+# -------------------- REDUCTIONS --------------------
+def _as_float(values):
+    if hasattr(values, "to_numpy"):
+        return values.to_numpy(dtype="float64", na_value=np.nan)
+    return np.asarray(values, dtype="float64")
+
+
+def finite_columns(*columns):
+    """Return the columns as float arrays restricted to rows finite in all of them."""
+    arrays = [_as_float(c) for c in columns]
+    mask = np.logical_and.reduce([np.isfinite(a) for a in arrays])
+    return [a[mask] for a in arrays]
+
+
+def density_grid(x, y, bins=DENSITY_BINS):
+    """Row counts on a ``bins`` x ``bins`` grid, ignoring rows with missing values."""
+    x, y = finite_columns(x, y)
+    return np.histogram2d(x, y, bins=bins)
+
+
+def binned_by_x(x, y, bins=LINE_BINS):
+    """Mean, min and max of ``y`` within equal-width bins of ``x``; empty bins dropped."""
+    x, y = finite_columns(x, y)
+    if len(x) == 0:
+        empty = np.array([])
+        return empty, empty, empty, empty
+    edges = np.linspace(x.min(), x.max(), bins + 1)
+    idx = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, bins - 1)
+    order = np.argsort(idx, kind="stable")
+    idx, y = idx[order], y[order]
+    starts = np.flatnonzero(np.r_[True, idx[1:] != idx[:-1]])
+    counts = np.diff(np.r_[starts, len(idx)])
+    centres = (edges[:-1] + edges[1:])[idx[starts]] / 2
+    return (centres, np.add.reduceat(y, starts) / counts,
+            np.minimum.reduceat(y, starts), np.maximum.reduceat(y, starts))
+
+
+# -------------------- DRAWING --------------------
+def _label_axes(ax, x, y):
+    ax.set_xlabel(getattr(x, "name", None) or "")
+    ax.set_ylabel(getattr(y, "name", None) or "")
+
+
+def _no_rows(ax, x, y):
+    # No row has both values: an empty chart, as the per-point plots draw
+    ax.text(0.5, 0.5, "No rows with values in both columns", ha="center", va="center",
+            transform=ax.transAxes)
+    _label_axes(ax, x, y)
+
+
+def draw_density(ax, x, y, bins=DENSITY_BINS, cmap="viridis"):
+    if not len(finite_columns(x, y)[0]):
+        return _no_rows(ax, x, y)
+    counts, xedges, yedges = density_grid(x, y, bins)
+    image = ax.imshow(np.ma.masked_equal(counts.T, 0), origin="lower", aspect="auto",
+                      extent=[xedges[0], xedges[-1], yedges[0], yedges[-1]],
+                      cmap=cmap, norm=LogNorm(), interpolation="nearest")
+    ax.figure.colorbar(image, ax=ax, label="Rows per bin")
+    _label_axes(ax, x, y)
+
+
+def draw_bubbles(ax, x, y, sizes=None, bins=BUBBLE_BINS):
+    xs, ys = finite_columns(x, y)
+    if not len(xs):
+        return _no_rows(ax, x, y)
+    counts, xedges, yedges = np.histogram2d(xs, ys, bins=bins)
+    if sizes is not None:
+        xs, ys, ss = finite_columns(x, y, sizes)
+        totals, _, _ = np.histogram2d(xs, ys, bins=[xedges, yedges], weights=ss)
+        size_rows, _, _ = np.histogram2d(xs, ys, bins=[xedges, yedges])
+        with np.errstate(invalid="ignore"):
+            mean_size = totals / size_rows
+    else:
+        mean_size = counts
+    filled = counts > 0
+    xc = ((xedges[:-1] + xedges[1:]) / 2)[:, None].repeat(bins, axis=1)[filled]
+    yc = ((yedges[:-1] + yedges[1:]) / 2)[None, :].repeat(bins, axis=0)[filled]
+    s = np.nan_to_num(mean_size[filled])
+    s = (s - s.min()) / (s.max() - s.min() + 1e-9) * 300 + 30
+    points = ax.scatter(xc, yc, s=s, c=counts[filled], cmap="viridis", norm=LogNorm(), alpha=0.7)
+    ax.figure.colorbar(points, ax=ax, label="Rows per bin")
+
+
+def draw_binned_line(ax, x, y, area=False, bins=LINE_BINS):
+    centres, mean, low, high = binned_by_x(x, y, bins)
+    if area:
+        ax.fill_between(centres, mean, alpha=0.6)
+    else:
+        ax.fill_between(centres, low, high, alpha=0.2)
+    ax.plot(centres, mean)
+    _label_axes(ax, x, y)
@@ -0,0 +1,110 @@
+# utils/batch.py
+# Headless recipe runner for batch cleaning:
+#
+#   python -m utils.batch recipe.json data/*.csv --output cleaned/ --jobs 8
+#
+# Files are processed in parallel worker processes; a failing file is
+# reported and skipped without stopping the rest of the batch. With
+# ``--chunk-rows`` CSV and Parquet inputs are streamed out-of-core, so files
+# larger than memory are cleaned with the recipe's fitted values.
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from utils import loaders
+from utils.out_of_core import ChunkSource, run_out_of_core
+from utils.recipes import apply_recipe, load_recipe
+from utils.writers import open_writer
+
+OUTPUT_FORMATS = {"csv": ".csv", "parquet": ".parquet", "xlsx": ".xlsx"}
+WRITER_FORMATS = {"csv": "CSV", "parquet": "Parquet", "xlsx": "Excel"}
+
+
+def read_table(path):
+    file_type = os.path.splitext(path)[1].lstrip(".").lower()
+    return loaders.read_table(path, file_type)[0]
+
+
+def write_table(df, path, fmt):
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_excel(path, index=False, sheet_name="Cleaned_Data")
+
+
+def clean_file(path, recipe, output_dir, fmt=None, chunk_rows=None):
+    """Apply ``recipe`` to one file; returns a summary dict for the report."""
+    started = time.perf_counter()
+    stem, ext = os.path.splitext(os.path.basename(path))
+    ext = ext.lstrip(".").lower()
+    # Legacy .xls inputs are written back as .xlsx
+    fmt = fmt or {"xls": "xlsx"}.get(ext, ext)
+    target = os.path.join(output_dir, stem + OUTPUT_FORMATS[fmt])
+    if chunk_rows:
+        # The recipe's fitted values are reused as-is; nothing is refitted
+        result = run_out_of_core(ChunkSource(path, ext, chunk_rows), recipe["steps"],
+                                 open_writer(target, WRITER_FORMATS[fmt]), refit=False)
+        return {"file": path, "output": target, "rows_in": result.rows_in, "rows_out": result.rows_out,
+                "seconds": time.perf_counter() - started}
+    df = read_table(path)
+    cleaned = apply_recipe(df, recipe)
+    write_table(cleaned, target, fmt)
+    return {"file": path, "output": target, "rows_in": len(df), "rows_out": len(cleaned),
+            "seconds": time.perf_counter() - started}
+
+
+def _run(args):
+    path, recipe, output_dir, fmt, chunk_rows = args
+    try:
+        return clean_file(path, recipe, output_dir, fmt, chunk_rows)
+    except Exception as e:
+        return {"file": path, "error": f"{type(e).__name__}: {e}"}
+
+
+def run_batch(recipe, paths, output_dir, fmt=None, jobs=None, chunk_rows=None):
+    """Clean ``paths`` with ``recipe``, yielding one summary per file as it finishes."""
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(path, recipe, output_dir, fmt, chunk_rows) for path in paths]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(tasks) == 1:
+        yield from map(_run, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+        futures = [pool.submit(_run, task) for task in tasks]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m utils.batch",
+                                     description="Apply a Clean Data recipe to many files.")
+    parser.add_argument("recipe", help="recipe exported from Clean Data (.json, .yaml)")
+    parser.add_argument("files", nargs="+", help="CSV, Excel or Parquet files to clean")
+    parser.add_argument("-o", "--output", default="cleaned", help="output directory (default: cleaned)")
+    parser.add_argument("-f", "--format", choices=sorted(OUTPUT_FORMATS),
+                        help="output format (default: same as the input)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="parallel worker processes (default: CPU count)")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="stream CSV/Parquet inputs out-of-core in chunks of this many rows")
+    args = parser.parse_args(argv)
+
+    recipe = load_recipe(args.recipe)
+    failures = 0
+    for result in run_batch(recipe, args.files, args.output, args.format, args.jobs, args.chunk_rows):
+        if "error" in result:
+            failures += 1
+            print(f"FAILED {result['file']}: {result['error']}", file=sys.stderr)
+        else:
+            print(f"{result['file']} -> {result['output']} "
+                  f"({result['rows_in']:,} -> {result['rows_out']:,} rows, {result['seconds']:.2f}s)")
+    print(f"{len(args.files) - failures} cleaned, {failures} failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
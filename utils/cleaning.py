@@ -0,0 +1,515 @@
+# utils/cleaning.py
+# Clean Data as an operation log. Each cleaning step is a plain dict recorded
+# against an immutable base frame; results are materialized lazily and,
+# thanks to pandas Copy-on-Write, share every column the step did not touch.
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.special import boxcox
+from scipy.stats import skew
+from sklearn.preprocessing import PowerTransformer
+
+from utils.categorical import mode_value
+from utils.config import CHECKPOINT_DIR, CHECKPOINT_MEMORY_BYTES, CHECKPOINT_STEPS, CLEANING_WORKERS
+from utils.duplicates import DuplicateIndex
+from utils.profiling import profile_frame
+from utils.memory import frame_nbytes
+from utils.perf import timer
+
+# Operations are JSON-friendly dicts:
+#   {"op": "drop", "columns": [...]}
+#   {"op": "rename", "columns": {old: new}}
+#   {"op": "astype", "column": c, "dtype": "int" | "float" | "str"}
+#   {"op": "fillna", "column": c, "value": v, "method": "mean" | "median" | "mode" | "zero" | "custom"}
+#   {"op": "dropna", "subset": [...]}
+#   {"op": "drop_duplicates", "subset": None | [...]}
+#   {"op": "power_transform", "column": c, "method": "box-cox" | "yeo-johnson",
+#    "lambda": l, "mean": m, "scale": s}
+# Statistics such as means, modes and fitted transform parameters are
+# resolved when a step is recorded, so replaying a step is a pure function.
+
+
+# -------------------- OPERATIONS --------------------
+def _with_column(df, column, values):
+    out = df.copy(deep=False)
+    out[column] = values
+    return out
+
+
+def _yeo_johnson(x, lmbda):
+    out = np.empty_like(x)
+    pos = x >= 0
+    if abs(lmbda) < np.spacing(1.0):
+        out[pos] = np.log1p(x[pos])
+    else:
+        out[pos] = (np.power(x[pos] + 1, lmbda) - 1) / lmbda
+    if abs(lmbda - 2) > np.spacing(1.0):
+        out[~pos] = -(np.power(-x[~pos] + 1, 2 - lmbda) - 1) / (2 - lmbda)
+    else:
+        out[~pos] = -np.log1p(-x[~pos])
+    return out
+
+
+def _power(values, method, lmbda):
+    if method == "box-cox":
+        return boxcox(values, lmbda)
+    return _yeo_johnson(values, lmbda)
+
+
+def _fill_value(series, value):
+    # Category columns (compact memory mode) only accept known values
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+
+def apply_operation(df, op):
+    """Return a new frame with ``op`` applied; ``df`` is never modified."""
+    kind = op["op"]
+    if kind == "drop":
+        return df.drop(columns=op["columns"])
+    if kind == "rename":
+        return df.rename(columns=op["columns"])
+    if kind == "astype":
+        return _with_column(df, op["column"], df[op["column"]].astype(op["dtype"]))
+    if kind == "fillna":
+        return _with_column(df, op["column"], _fill_value(df[op["column"]], op["value"]))
+    if kind == "dropna":
+        return df.dropna(subset=op["subset"])
+    if kind == "drop_duplicates":
+        return df.drop_duplicates(subset=op.get("subset"))
+    if kind == "power_transform":
+        column = df[op["column"]].astype("float64")
+        mask = column.notna().to_numpy()
+        values = column.to_numpy(copy=True)
+        transformed = _power(values[mask], op["method"], op["lambda"])
+        values[mask] = (transformed - op["mean"]) / op["scale"]
+        return _with_column(df, op["column"], pd.Series(values, index=df.index, name=op["column"]))
+    raise ValueError(f"Unknown cleaning operation: {kind}")
+
+
+# -------------------- FITTED STEPS --------------------
+def fill_operation(df, column, method, custom_value=None):
+    """Build a fillna step, resolving mean/median/mode against ``df`` now."""
+    series = df[column]
+    if method == "mean":
+        value = series.mean()
+    elif method == "median":
+        value = series.median()
+    elif method == "mode":
+        value = mode_value(series)
+    elif method == "zero":
+        value = 0
+    else:
+        value = custom_value
+    if isinstance(value, np.generic):
+        value = value.item()
+    return {"op": "fillna", "column": column, "value": value, "method": method}
+
+
+def power_transform_operation(df, column, method):
+    """Fit a Box-Cox/Yeo-Johnson transform on ``column`` and return the step.
+
+    Matches ``PowerTransformer(method).fit_transform`` (standardized output)
+    while keeping only public, serializable parameters.
+    """
+    values = df[[column]].dropna().astype("float64")
+    pt = PowerTransformer(method=method, standardize=False).fit(values)
+    lmbda = float(pt.lambdas_[0])
+    transformed = _power(values[column].to_numpy(), method, lmbda)
+    scale = float(transformed.std())
+    return {"op": "power_transform", "column": column, "method": method, "lambda": lmbda,
+            "mean": float(transformed.mean()), "scale": scale if scale > 0 else 1.0}
+
+
+# -------------------- BULK FITTING --------------------
+def _skew(values):
+    values = values[~np.isnan(values)]
+    return float(skew(values)) if len(values) > 2 else np.nan
+
+
+def _fit_all(fit, columns, workers):
+    # Fits only read the shared frame; numpy and scipy release the GIL in the
+    # heavy loops, so columns are fitted side by side on a thread pool
+    def attempt(col):
+        try:
+            return fit(col), None
+        except Exception as e:
+            return None, e
+
+    if workers <= 1 or len(columns) <= 1:
+        return [attempt(col) for col in columns]
+    with ThreadPoolExecutor(max_workers=min(workers, len(columns))) as pool:
+        return list(pool.map(attempt, columns))
+
+
+def bulk_power_transform(df, columns, method, workers=CLEANING_WORKERS):
+    """Fit ``method`` on every column in parallel.
+
+    Returns the steps for the columns that fitted and a per-column report with
+    the skewness before and after (columns that failed keep their reason).
+    """
+    def fit(col):
+        op = power_transform_operation(df, col, method)
+        after = apply_operation(df[[col]], op)[col].to_numpy(dtype="float64")
+        return op, _skew(after)
+
+    operations, rows = [], []
+    for col, (fitted, error) in zip(columns, _fit_all(fit, columns, workers)):
+        before = _skew(df[col].to_numpy(dtype="float64"))
+        if error is not None:
+            status = ("Skipped: requires positive values" if method == "box-cox" and isinstance(error, ValueError)
+                      else f"Failed: {error}")
+            rows.append([col, round(before, 3), None, status])
+            continue
+        op, after = fitted
+        operations.append(op)
+        rows.append([col, round(before, 3), round(after, 3), f"λ = {op['lambda']:.3f}"])
+    return operations, pd.DataFrame(rows, columns=["Column", "Skew Before", "Skew After", "Status"])
+
+
+def bulk_fill(df, columns, numeric_method, other_method="mode", custom_value=None, workers=CLEANING_WORKERS):
+    """Fill missing values of many columns, numeric ones with ``numeric_method``."""
+    def fit(col):
+        numeric = pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col])
+        return fill_operation(df, col, numeric_method if numeric else other_method, custom_value)
+
+    operations, rows = [], []
+    for col, (op, error) in zip(columns, _fit_all(fit, columns, workers)):
+        missing = int(df[col].isna().sum())
+        if error is not None:
+            rows.append([col, missing, None, f"Failed: {error}"])
+            continue
+        operations.append(op)
+        rows.append([col, missing, op["value"], op["method"].title()])
+    return operations, pd.DataFrame(rows, columns=["Column", "Missing Before", "Fill Value", "Method"])
+
+
+# -------------------- PIPELINE --------------------
+def describe_operation(op):
+    """Short human-readable label for a recorded step."""
+    kind = op["op"]
+    if kind == "drop":
+        return f"Drop column {', '.join(map(str, op['columns']))}"
+    if kind == "rename":
+        return ", ".join(f"Rename {old} → {new}" for old, new in op["columns"].items())
+    if kind == "astype":
+        return f"Convert {op['column']} to {op['dtype']}"
+    if kind == "fillna":
+        return f"Fill missing {op['column']} with {op['method']} ({op['value']})"
+    if kind == "dropna":
+        return f"Drop rows missing {', '.join(map(str, op['subset']))}"
+    if kind == "drop_duplicates":
+        return "Drop duplicate rows"
+    if kind == "power_transform":
+        return f"{op['method'].title()} transform {op['column']} (λ={op['lambda']:.3f})"
+    return kind
+
+
+def _missing_sentinels(frame):
+    """Positions of NaN/NA/NaT in object columns; Parquet reads them all back as None."""
+    sentinels = {}
+    for position, dtype in enumerate(frame.dtypes):
+        if dtype != object:
+            continue
+        values = frame.iloc[:, position].to_numpy()
+        missing = np.flatnonzero(pd.isna(values))
+        kinds = {}
+        for row in missing:
+            value = values[row]
+            if value is not None:
+                # np.nan != np.nan, so group by the type of sentinel
+                kinds.setdefault(type(value), (value, []))[1].append(row)
+        if kinds:
+            sentinels[position] = [(value, np.array(rows)) for value, rows in kinds.values()]
+    return sentinels
+
+
+def _restore_sentinels(frame, sentinels):
+    for position, kinds in sentinels.items():
+        values = frame.iloc[:, position].to_numpy(copy=True)
+        for value, rows in kinds:
+            values[rows] = value
+        frame.isetitem(position, values)
+    return frame
+
+
+def spill_frame(frame, path):
+    """Write ``frame`` to Parquet; returns what :func:`load_spilled` needs to restore it exactly."""
+    frame.to_parquet(path)
+    return _missing_sentinels(frame)
+
+
+def load_spilled(path, sentinels):
+    return _restore_sentinels(pd.read_parquet(path), sentinels)
+
+
+class CleaningPipeline:
+    """An immutable base frame plus an undoable log of operations.
+
+    ``position`` is the number of steps currently applied; undo and redo move
+    it without discarding the log, and recording a new step drops the redo
+    tail. A materialized checkpoint is kept every ``checkpoint_steps`` steps so
+    moving to any step replays at most that many operations. Checkpoints past
+    ``memory_budget`` are spilled to Parquet files, oldest first.
+
+    Derived state of the current frame (the duplicate index and the column
+    profile) is carried forward step by step: each step only recomputes what
+    it touched. ``duplicates`` may pass in an already built index of ``base``.
+    """
+
+    # name -> builder; built objects provide ``updated(op, before, after)``
+    TRACKED = {"duplicates": DuplicateIndex, "profile": profile_frame}
+
+    def __init__(self, base, checkpoint_steps=CHECKPOINT_STEPS,
+                 memory_budget=CHECKPOINT_MEMORY_BYTES, spill_dir=CHECKPOINT_DIR, duplicates=None):
+        self.base = base
+        self.operations = []
+        self.position = 0
+        self.checkpoint_steps = max(1, checkpoint_steps)
+        self.memory_budget = memory_budget
+        self._spill_root = spill_dir
+        self._spill_dir = None
+        self._finalizer = None
+        # step -> in-memory frame or spilled Parquet path; step 0 is the base
+        self._checkpoints = {0: base}
+        # step -> missing-value sentinels of a spilled checkpoint
+        self._sentinels = {}
+        # Full-file outputs written next to the spilled checkpoints
+        self._outputs = []
+        self._frame = base
+        self._base_tracked = {} if duplicates is None else {"duplicates": duplicates}
+        self._tracked = dict(self._base_tracked)
+
+    # ---- navigation ----
+    def frame(self):
+        """Result of the applied steps; cached until the position changes."""
+        return self._frame
+
+    @property
+    def version(self):
+        """Content id of the current frame relative to the base: a hash of the applied steps."""
+        steps = json.dumps(self.operations[:self.position], sort_keys=True, default=str)
+        return hashlib.blake2b(steps.encode("utf-8"), digest_size=12).hexdigest()
+
+    @property
+    def can_undo(self):
+        return self.position > 0
+
+    @property
+    def can_redo(self):
+        return self.position < len(self.operations)
+
+    def tracked(self, name):
+        """Derived state of the current frame, built on first use after a jump."""
+        state = self._tracked.get(name)
+        if state is None:
+            with timer(name, rows=len(self._frame)):
+                state = self.TRACKED[name](self._frame)
+            self._tracked[name] = state
+            if self.position == 0:
+                self._base_tracked[name] = state
+        return state
+
+    def duplicate_index(self):
+        return self.tracked("duplicates")
+
+    def profile(self):
+        return self.tracked("profile")
+
+    def apply(self, op):
+        """Apply and record ``op``; on error nothing is recorded and the error propagates."""
+        before = self._frame
+        with timer(f"apply {op['op']}", column=op.get("column")):
+            if op["op"] == "drop_duplicates":
+                # The row hashes are already known; no need to hash every row again
+                frame = before[~self.duplicate_index().duplicated(before, op.get("subset"))]
+            else:
+                frame = apply_operation(before, op)
+        with timer("update tracked state"):
+            tracked = {name: state.updated(op, before, frame) for name, state in self._tracked.items()}
+        self._truncate(self.position)
+        self.operations.append(op)
+        self.position += 1
+        self._frame = frame
+        self._tracked = tracked
+        if self.position % self.checkpoint_steps == 0:
+            self._checkpoint(self.position, frame)
+        return frame
+
+    def extend(self, operations):
+        """Apply several steps atomically; nothing is recorded if any fails."""
+        start = self.position
+        try:
+            for op in operations:
+                self.apply(op)
+        except Exception:
+            self.goto(start)
+            self._truncate(start)
+            raise
+        return self._frame
+
+    def undo(self, steps=1):
+        return self.goto(self.position - steps)
+
+    def redo(self, steps=1):
+        return self.goto(self.position + steps)
+
+    def reset(self):
+        """Return to the base frame; the steps stay available to redo."""
+        return self.goto(0)
+
+    def goto(self, position):
+        position = min(max(position, 0), len(self.operations))
+        if position != self.position:
+            with timer("rebuild step", position=position):
+                self._frame = self._materialize(position)
+            self.position = position
+            self._tracked = dict(self._base_tracked) if position == 0 else {}
+        return self._frame
+
+    def replay(self, operations):
+        frame = self.base
+        for op in operations:
+            frame = apply_operation(frame, op)
+        return frame
+
+    # ---- checkpoints ----
+    def _materialize(self, position):
+        # Moving forward from the current frame is cheaper than reloading
+        start = max(step for step in self._checkpoints if step <= position)
+        if self._frame is not None and self.position <= position and self.position >= start:
+            start, frame = self.position, self._frame
+        else:
+            frame = self._load(start)
+        for op in self.operations[start:position]:
+            frame = apply_operation(frame, op)
+        return frame
+
+    def _load(self, step):
+        checkpoint = self._checkpoints[step]
+        if isinstance(checkpoint, str):
+            return load_spilled(checkpoint, self._sentinels.get(step, {}))
+        return checkpoint
+
+    def _checkpoint(self, step, frame):
+        self._checkpoints[step] = frame
+        self._enforce_budget()
+
+    def _in_memory_bytes(self):
+        # The base belongs to the shared dataset cache and is not counted
+        return sum(frame_nbytes(frame) for step, frame in self._checkpoints.items()
+                   if step and not isinstance(frame, str))
+
+    def _enforce_budget(self):
+        while self._in_memory_bytes() > self.memory_budget:
+            oldest = min(step for step, frame in self._checkpoints.items()
+                         if step and not isinstance(frame, str))
+            self._spill(oldest)
+
+    def _scratch_dir(self):
+        # Removed with the pipeline: on close, or when the session's state is collected
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="analytix-checkpoints-", dir=self._spill_root)
+            self._finalizer = weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        return self._spill_dir
+
+    def _spill(self, step):
+        frame = self._checkpoints[step]
+        path = os.path.join(self._scratch_dir(), f"step-{step}.parquet")
+        try:
+            sentinels = spill_frame(frame, path)
+        except Exception:
+            # Frames Parquet cannot hold (mixed object columns, non-string
+            # labels) are rebuilt from an earlier checkpoint instead
+            del self._checkpoints[step]
+        else:
+            self._checkpoints[step] = path
+            self._sentinels[step] = sentinels
+
+    def _truncate(self, position):
+        del self.operations[position:]
+        for step in [step for step in self._checkpoints if step > position]:
+            checkpoint = self._checkpoints.pop(step)
+            self._sentinels.pop(step, None)
+            if isinstance(checkpoint, str) and os.path.exists(checkpoint):
+                os.remove(checkpoint)
+
+    # ---- outputs ----
+    def output_path(self, extension):
+        """A new file for a full-file export, deleted along with the pipeline."""
+        fd, path = tempfile.mkstemp(suffix=f".{extension}", dir=self._scratch_dir())
+        os.close(fd)
+        self._outputs.append(path)
+        return path
+
+    def discard_output(self, path):
+        if path in self._outputs:
+            self._outputs.remove(path)
+        if os.path.exists(path):
+            os.remove(path)
+
+    # ---- memory ----
+    def frames(self):
+        """Frames held in memory: the base, in-memory checkpoints and the current frame."""
+        frames = [c for c in self._checkpoints.values() if c is not None and not isinstance(c, str)]
+        if self._frame is not None:
+            frames.append(self._frame)
+        return frames
+
+    def spill_checkpoints(self):
+        """Move every in-memory checkpoint except the base to disk."""
+        for step in [step for step, c in self._checkpoints.items() if step and not isinstance(c, str)]:
+            self._spill(step)
+
+    @property
+    def suspended(self):
+        return self.base is None
+
+    def suspend(self):
+        """Release every frame: checkpoints spill to disk and the base is dropped.
+
+        The base belongs to the dataset cache and can be reloaded; :meth:`resume`
+        with that frame returns to the current step.
+        """
+        self.spill_checkpoints()
+        # Full-file outputs can be prepared again; do not keep them on disk
+        for path in list(self._outputs):
+            self.discard_output(path)
+        self.base = None
+        self._checkpoints[0] = None
+        self._frame = None
+        self._base_tracked = {}
+        self._tracked = {}
+
+    def resume(self, base, duplicates=None):
+        """Reattach the reloaded ``base`` after :meth:`suspend` and rebuild the current frame."""
+        if not self.suspended:
+            return
+        self.base = base
+        self._checkpoints[0] = base
+        self._base_tracked = {} if duplicates is None else {"duplicates": duplicates}
+        self._frame = self._materialize(self.position)
+        self._tracked = dict(self._base_tracked) if self.position == 0 else {}
+
+    def checkpoint_stats(self):
+        spilled = [c for c in self._checkpoints.values() if isinstance(c, str)]
+        return {
+            "checkpoints": len(self._checkpoints) - 1,
+            "in_memory_bytes": self._in_memory_bytes(),
+            "spilled": len(spilled),
+            "spilled_bytes": sum(os.path.getsize(path) for path in spilled if os.path.exists(path)),
+        }
+
+    def close(self):
+        """Delete spilled checkpoints; also runs when the pipeline is collected."""
+        if self._finalizer is not None:
+            self._finalizer()
+        self._checkpoints = {step: c for step, c in self._checkpoints.items() if not isinstance(c, str)}
@@ -0,0 +1,127 @@
+# utils/config.py
+# Tunable limits shared by the pages. Every value can be overridden with an
+# environment variable so a deployment can size them to the host.
+import os
+
+
+def _env_mb(name, default_mb):
+    return int(float(os.environ.get(name, default_mb)) * 1024 * 1024)
+
+
+# -------------------- DATASET CACHE --------------------
+# Upper bound for parsed DataFrames kept in memory across sessions.
+DATASET_CACHE_MAX_BYTES = _env_mb("ANALYTIX_DATASET_CACHE_MB", 4096)
+
+# -------------------- SESSION QUOTAS --------------------
+# Memory one browser session may pin (its dataset plus Clean Data's working
+# frames and checkpoints) and the total across sessions. Past the total,
+# sessions inactive for the idle time are released: their checkpoints spill
+# to disk and their data is reopened when they return.
+SESSION_MEMORY_BYTES = _env_mb("ANALYTIX_SESSION_MEMORY_MB", 4096)
+SESSIONS_MEMORY_BYTES = _env_mb("ANALYTIX_SESSIONS_MEMORY_MB", 16384)
+SESSION_IDLE_SECONDS = int(os.environ.get("ANALYTIX_SESSION_IDLE_SECONDS", 300))
+
+# -------------------- DISK CACHE --------------------
+# Parsed uploads are kept as Arrow files keyed by content hash and
+# memory-mapped by later sessions. A cap of 0 turns the disk cache off.
+DISK_CACHE_DIR = os.environ.get("ANALYTIX_DISK_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "analytix")
+DISK_CACHE_MAX_BYTES = _env_mb("ANALYTIX_DISK_CACHE_MB", 10240)
+# Smaller uploads parse quickly enough that caching them is not worth the disk.
+DISK_CACHE_MIN_BYTES = _env_mb("ANALYTIX_DISK_CACHE_MIN_MB", 1)
+
+# -------------------- STREAMING INGESTION --------------------
+# CSV uploads at least this large are parsed in chunks with a live preview.
+STREAMING_MIN_BYTES = _env_mb("ANALYTIX_STREAMING_MIN_MB", 100)
+INGEST_CHUNK_ROWS = int(os.environ.get("ANALYTIX_INGEST_CHUNK_ROWS", 200_000))
+# Hard ceiling for the rows kept in memory while streaming. Past it the
+# loader keeps a uniform random sample instead of the full file.
+INGEST_MEMORY_LIMIT_BYTES = _env_mb("ANALYTIX_INGEST_MEMORY_MB", 2048)
+
+# -------------------- COMPACT MEMORY MODE --------------------
+# Object columns whose distinct/non-null ratio is at or below this become
+# ``category`` when compact memory mode is on.
+CATEGORY_MAX_RATIO = float(os.environ.get("ANALYTIX_CATEGORY_MAX_RATIO", 0.5))
+
+# -------------------- PDF REPORTS --------------------
+REPORT_WORKERS = int(os.environ.get("ANALYTIX_REPORT_WORKERS", 2))
+# Finished report bytes kept per dataset so repeated downloads are free.
+REPORT_CACHE_MAX_BYTES = _env_mb("ANALYTIX_REPORT_CACHE_MB", 256)
+
+# -------------------- DUPLICATE INDEX --------------------
+# Per-row hashes of loaded datasets (8 bytes per row) reused across reruns.
+DUPLICATE_CACHE_MAX_BYTES = _env_mb("ANALYTIX_DUPLICATE_CACHE_MB", 256)
+
+# -------------------- FIGURE CACHE --------------------
+# Rendered chart images shared by the on-screen views and the PDF report.
+FIGURE_CACHE_MAX_BYTES = _env_mb("ANALYTIX_FIGURE_CACHE_MB", 256)
+
+# -------------------- CORRELATIONS --------------------
+# Correlation matrices per (dataset, method), grown as columns are requested.
+CORRELATION_CACHE_MAX_BYTES = _env_mb("ANALYTIX_CORRELATION_CACHE_MB", 256)
+# Wider selections draw only the columns in the strongest pairs.
+CORRELATION_HEATMAP_MAX_COLUMNS = int(os.environ.get("ANALYTIX_CORRELATION_HEATMAP_COLUMNS", 20))
+# Kendall's tau is fitted on a uniform sample of at most this many rows.
+KENDALL_MAX_ROWS = int(os.environ.get("ANALYTIX_KENDALL_MAX_ROWS", 10_000))
+
+# -------------------- CONTINGENCY TABLES --------------------
+# Categorical-vs-categorical charts keep this many most frequent levels per
+# column and fold the rest into "Other".
+CONTINGENCY_TOP_LEVELS = int(os.environ.get("ANALYTIX_CONTINGENCY_TOP_LEVELS", 20))
+CONTINGENCY_CACHE_MAX_BYTES = _env_mb("ANALYTIX_CONTINGENCY_CACHE_MB", 64)
+
+# -------------------- CATEGORICAL SUMMARIES --------------------
+# One-column text charts show this many most frequent levels and group the
+# rest as "Other"; streamed files track as many heavy hitters per column.
+CATEGORICAL_TOP_LEVELS = int(os.environ.get("ANALYTIX_CATEGORICAL_TOP_LEVELS", 20))
+CATEGORICAL_CACHE_MAX_BYTES = _env_mb("ANALYTIX_CATEGORICAL_CACHE_MB", 64)
+
+# -------------------- LARGE-DATA RENDERING --------------------
+# Above this many rows, point-per-row charts draw pre-aggregated bins.
+LARGE_DATA_ROWS = int(os.environ.get("ANALYTIX_LARGE_DATA_ROWS", 100_000))
+
+# -------------------- PLOT SAMPLING --------------------
+# Row caps for plot types whose cost grows faster than the row count.
+PLOT_SAMPLE_ROWS = int(os.environ.get("ANALYTIX_PLOT_SAMPLE_ROWS", 5000))
+SWARM_SAMPLE_ROWS = int(os.environ.get("ANALYTIX_SWARM_SAMPLE_ROWS", 1000))
+SAMPLE_SEED = int(os.environ.get("ANALYTIX_SAMPLE_SEED", 0))
+
+# -------------------- BULK CLEANING --------------------
+# Threads fitting per-column transforms and fills in Clean Data's bulk mode.
+CLEANING_WORKERS = int(os.environ.get("ANALYTIX_CLEANING_WORKERS", os.cpu_count() or 1))
+
+# -------------------- CLEANING HISTORY --------------------
+# Clean Data keeps a materialized checkpoint every this many steps, so undo
+# and redo replay at most that many operations.
+CHECKPOINT_STEPS = int(os.environ.get("ANALYTIX_CHECKPOINT_STEPS", 5))
+# In-memory budget for checkpoints; older ones spill to Parquet on disk.
+CHECKPOINT_MEMORY_BYTES = _env_mb("ANALYTIX_CHECKPOINT_MB", 512)
+# Spill location; defaults to the system temporary directory.
+CHECKPOINT_DIR = os.environ.get("ANALYTIX_CHECKPOINT_DIR") or None
+
+# -------------------- OUT-OF-CORE CLEANING --------------------
+# Median fills and power transforms are refitted on a uniform sample of at
+# most this many values per column (exactly, on smaller columns).
+OUT_OF_CORE_FIT_ROWS = int(os.environ.get("ANALYTIX_OUT_OF_CORE_FIT_ROWS", 1_000_000))
+# Largest full-file output offered as a browser download. Streamlit holds a
+# download in memory, so larger outputs stay on the server.
+OUT_OF_CORE_DOWNLOAD_MAX_BYTES = _env_mb("ANALYTIX_OUT_OF_CORE_DOWNLOAD_MB", 1024)
+
+# -------------------- PERFORMANCE PANEL --------------------
+# Reruns kept per session for the Performance panel.
+PERF_HISTORY_RUNS = int(os.environ.get("ANALYTIX_PERF_HISTORY_RUNS", 20))
+# Every timed stage is appended to this JSON-lines file when it is set.
+PERF_LOG_PATH = os.environ.get("ANALYTIX_PERF_LOG") or None
+
+# -------------------- ADMIN PAGE --------------------
+# Operator token for the Admin page, which can release sessions and clear the
+# shared caches. The page stays locked unless this is set.
+ADMIN_TOKEN = os.environ.get("ANALYTIX_ADMIN_TOKEN") or None
+
+# -------------------- EXPORTS --------------------
+# Cleaned downloads are serialized on request, this many rows at a time, and
+# the finished bytes are kept per (dataset version, format).
+EXPORT_CHUNK_ROWS = int(os.environ.get("ANALYTIX_EXPORT_CHUNK_ROWS", 100_000))
+EXPORT_CACHE_MAX_BYTES = _env_mb("ANALYTIX_EXPORT_CACHE_MB", 512)
+# In-memory size from which compressed CSV/Parquet variants are offered.
+COMPRESSION_MIN_BYTES = _env_mb("ANALYTIX_COMPRESSION_MIN_MB", 50)
@@ -0,0 +1,122 @@
+# utils/contingency.py
+# Sparse contingency tables for categorical-vs-categorical charts. Both
+# columns are reduced to integer codes, the long tail of each is folded into
+# one "Other" level, and only the non-zero (row, column) pairs are counted
+# with numpy. The grouped/stacked bar charts, the heatmap and the Sankey
+# diagram of a column pair all share one cached result.
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.config import CONTINGENCY_CACHE_MAX_BYTES, CONTINGENCY_TOP_LEVELS
+from utils.lru import ByteLRU
+
+# Above this many cells the pair counts are found by sorting instead of a
+# dense bincount
+_DENSE_CELLS = 4_000_000
+
+
+@dataclass
+class Contingency:
+    index: pd.Index    # row levels (first column), "Other" last when folded
+    columns: pd.Index  # column levels (second column)
+    rows: np.ndarray   # row position of each non-zero cell
+    cols: np.ndarray   # column position of each non-zero cell
+    counts: np.ndarray
+    row_levels: int    # distinct levels before folding
+    col_levels: int
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes + self.cols.nbytes + self.counts.nbytes
+
+    def dense(self):
+        """The table as a DataFrame shaped like ``pd.crosstab``."""
+        values = np.zeros((len(self.index), len(self.columns)), dtype="int64")
+        values[self.rows, self.cols] = self.counts
+        return pd.DataFrame(values, index=self.index, columns=self.columns)
+
+    def links(self):
+        """Sankey ``(labels, source, target, value)`` built from the non-zero cells."""
+        labels = [str(v) for v in self.index] + [str(v) for v in self.columns]
+        return labels, self.rows, self.cols + len(self.index), self.counts
+
+    def note(self):
+        """Caption describing the folding, or None when every level is shown."""
+        folded = [f"{name} ({levels:,} levels)"
+                  for name, levels, shown in ((self.index.name, self.row_levels, len(self.index)),
+                                              (self.columns.name, self.col_levels, len(self.columns)))
+                  if levels > shown]
+        if not folded:
+            return None
+        return f"Showing the most frequent levels of {' and '.join(folded)}; the rest are grouped as Other."
+
+
+# -------------------- CODES --------------------
+def _codes(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype("int64"), series.cat.categories
+    try:
+        codes, labels = pd.factorize(series, sort=True)
+    except TypeError:
+        # Mixed types that cannot be ordered keep their first-seen order
+        codes, labels = pd.factorize(series)
+    return codes.astype("int64"), labels
+
+
+def _fold(codes, labels, top_n):
+    """Keep the ``top_n`` most frequent observed levels and map the rest to one extra code."""
+    totals = np.bincount(codes, minlength=len(labels))
+    observed = np.flatnonzero(totals)
+    if top_n is None or len(observed) <= top_n:
+        kept, other = observed, None
+    else:
+        # Most frequent first, ties in label order; then back to label order
+        kept = np.sort(observed[np.argsort(-totals[observed], kind="stable")[:top_n]])
+        other = f"Other ({len(observed) - top_n:,} levels)"
+    mapping = np.full(len(labels), len(kept), dtype="int64")
+    mapping[kept] = np.arange(len(kept))
+    index = pd.Index(labels[kept])
+    if other is not None:
+        index = pd.Index(list(index) + [other], dtype=object)
+    return mapping[codes], index, len(observed)
+
+
+# -------------------- BUILD --------------------
+def build_contingency(df, col1, col2, top_n=CONTINGENCY_TOP_LEVELS):
+    """Count co-occurrences of ``col1`` and ``col2`` levels (missing values excluded)."""
+    row_codes, row_labels = _codes(df[col1])
+    col_codes, col_labels = _codes(df[col2])
+    present = (row_codes >= 0) & (col_codes >= 0)
+    row_codes, col_codes = row_codes[present], col_codes[present]
+
+    row_codes, index, row_levels = _fold(row_codes, row_labels, top_n)
+    col_codes, columns, col_levels = _fold(col_codes, col_labels, top_n)
+    index.name, columns.name = col1, col2
+
+    width = max(len(columns), 1)
+    cells = row_codes * width + col_codes
+    if len(index) * width <= _DENSE_CELLS:
+        counts = np.bincount(cells, minlength=len(index) * width)
+        cells = np.flatnonzero(counts)
+        counts = counts[cells]
+    else:
+        cells, counts = np.unique(cells, return_counts=True)
+    return Contingency(index, columns, cells // width, cells % width, counts.astype("int64"),
+                       row_levels, col_levels)
+
+
+# -------------------- SHARED CACHE --------------------
+contingency_cache = ByteLRU(CONTINGENCY_CACHE_MAX_BYTES)
+
+
+def contingency(df, col1, col2, dataset_key, top_n=CONTINGENCY_TOP_LEVELS):
+    """Cached :func:`build_contingency` for a loaded dataset."""
+    key = (dataset_key, col1, col2, top_n)
+    table = contingency_cache.get(key) if dataset_key is not None else None
+    if table is None:
+        table = build_contingency(df, col1, col2, top_n)
+        if dataset_key is not None:
+            contingency_cache.put(key, table, table.nbytes)
+    return table
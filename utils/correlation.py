@@ -0,0 +1,204 @@
+# utils/correlation.py
+# Correlation service shared by the Quick Insights heatmap, the PDF report and
+# Visual Explorer. Matrices are cached per (dataset, method) and grow on
+# demand: asking for new columns computes only their rows of the matrix, and
+# any selection is served as a slice of what is already known.
+#
+# Pearson (and Spearman, which is Pearson on ranks) uses pairwise-complete
+# observations like DataFrame.corr(), computed for whole column blocks with
+# a handful of matrix products over the present-value masks. Spearman ranks
+# each column once over its own non-missing values; pandas re-ranks every
+# pair's complete rows, so pairs with missing values may differ slightly.
+import threading
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.stats import kendalltau
+
+from utils.config import (
+    CORRELATION_CACHE_MAX_BYTES,
+    CORRELATION_HEATMAP_MAX_COLUMNS,
+    KENDALL_MAX_ROWS,
+)
+from utils.lru import ByteLRU
+from utils.sampling import reservoir_sample
+
+METHODS = {"Pearson": "pearson", "Spearman": "spearman", "Kendall": "kendall"}
+
+# Rows per product so the (rows x columns) temporaries stay bounded
+_BLOCK_CELLS = 4_000_000
+
+
+# -------------------- KERNELS --------------------
+def _prepare(df, columns, method):
+    if method == "spearman":
+        # Average ranks over each column's non-missing values
+        df = df[columns].rank()
+    values = df[columns].to_numpy(dtype="float64", na_value=np.nan)
+    # Centring first keeps the sums of squares from cancelling
+    with np.errstate(all="ignore"):
+        means = np.nanmean(values, axis=0)
+    return values - np.where(np.isnan(means), 0.0, means)
+
+
+def _pearson(a, b):
+    """Pairwise-complete Pearson correlation between the columns of ``a`` and ``b``."""
+    a_mask, b_mask = ~np.isnan(a), ~np.isnan(b)
+    if a_mask.all() and b_mask.all():
+        with np.errstate(all="ignore"):
+            a_scaled = a / np.sqrt((a * a).sum(axis=0))
+            b_scaled = b / np.sqrt((b * b).sum(axis=0))
+            return np.clip(a_scaled.T @ b_scaled, -1.0, 1.0)
+
+    shape = (a.shape[1], b.shape[1])
+    n, sa, sb, saa, sbb, sab = (np.zeros(shape) for _ in range(6))
+    step = max(1024, _BLOCK_CELLS // max(a.shape[1] + b.shape[1], 1))
+    for start in range(0, len(a), step):
+        am = a_mask[start:start + step].astype("float64")
+        bm = b_mask[start:start + step].astype("float64")
+        a0 = np.nan_to_num(a[start:start + step])
+        b0 = np.nan_to_num(b[start:start + step])
+        # Each sum runs over the rows where both columns of the pair are present
+        n += am.T @ bm
+        sa += a0.T @ bm
+        sb += am.T @ b0
+        saa += (a0 * a0).T @ bm
+        sbb += am.T @ (b0 * b0)
+        sab += a0.T @ b0
+    with np.errstate(all="ignore"):
+        cov = sab - sa * sb / n
+        var_a = saa - sa * sa / n
+        var_b = sbb - sb * sb / n
+        divisor = np.sqrt(var_a * var_b)
+        r = np.where(divisor > 0, cov / divisor, np.nan)
+    return np.clip(r, -1.0, 1.0)
+
+
+def _kendall(a, b, known):
+    # Tau-b per pair on its complete rows, the same statistic as DataFrame.corr.
+    # ``b`` ends with the columns of ``a``: that square part is DataFrame.corr
+    # itself (1.0 on the diagonal, also for constant columns), so only the
+    # pairs with the ``known`` columns are computed here.
+    r = np.full((a.shape[1], b.shape[1]), np.nan)
+    with warnings.catch_warnings():
+        # Constant columns give NaN off the diagonal, as with pandas
+        warnings.simplefilter("ignore")
+        r[:, known:] = pd.DataFrame(a).corr("kendall").to_numpy()
+        a_present, b_present = ~np.isnan(a), ~np.isnan(b[:, :known])
+        for i in range(a.shape[1]):
+            for j in range(known):
+                present = a_present[:, i] & b_present[:, j]
+                if present.all():
+                    r[i, j] = kendalltau(a[:, i], b[:, j])[0]
+                elif present.sum() > 1:
+                    r[i, j] = kendalltau(a[present, i], b[present, j])[0]
+    return r
+
+
+# -------------------- INCREMENTAL MATRIX --------------------
+class CorrelationMatrix:
+    """Correlations among the columns requested so far for one dataset and method."""
+
+    def __init__(self, method):
+        self.method = method
+        self.columns = []
+        self.values = np.empty((0, 0))
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def _source(self, df, columns):
+        if self.method == "kendall" and len(df) > KENDALL_MAX_ROWS:
+            # Kendall's tau costs O(n log n) per pair; fit it on a sample.
+            # The sample keys depend only on the row count, so every growth
+            # draws the same rows.
+            return reservoir_sample(df[columns], KENDALL_MAX_ROWS)
+        return df
+
+    def _grow(self, df, new):
+        everything = self.columns + new
+        source = self._source(df, everything)
+        a = _prepare(source, new, self.method)
+        b = _prepare(source, everything, self.method)
+        known = len(self.columns)
+        block = _kendall(a, b, known) if self.method == "kendall" else _pearson(a, b)
+        values = np.empty((len(everything), len(everything)))
+        values[:known, :known] = self.values
+        values[known:, :] = block
+        values[:known, known:] = block[:, :known].T
+        self.columns = everything
+        self.values = values
+
+    def frame(self, df, columns):
+        """The matrix for ``columns`` as a DataFrame, computing unseen columns first."""
+        with self._lock:
+            known = set(self.columns)
+            new = [c for c in dict.fromkeys(columns) if c not in known]
+            if new:
+                self._grow(df, new)
+            positions = {c: i for i, c in enumerate(self.columns)}
+            take = [positions[c] for c in columns]
+            return pd.DataFrame(self.values[np.ix_(take, take)], index=columns, columns=columns)
+
+
+# -------------------- SHARED CACHE --------------------
+correlation_cache = ByteLRU(CORRELATION_CACHE_MAX_BYTES)
+
+
+def _matrix(dataset_key, method):
+    if dataset_key is None:
+        return CorrelationMatrix(method)
+    key = (dataset_key, method)
+    matrix = correlation_cache.get(key)
+    if matrix is None:
+        matrix = CorrelationMatrix(method)
+    return matrix
+
+
+def correlation(df, columns, dataset_key, method="pearson"):
+    """Correlation matrix of ``columns`` (like ``df[columns].corr(method)``), cached per dataset."""
+    matrix = _matrix(dataset_key, method)
+    result = matrix.frame(df, list(columns))
+    if dataset_key is not None:
+        # Re-weigh the entry: the matrix may have grown
+        correlation_cache.put((dataset_key, method), matrix, matrix.nbytes)
+    return result
+
+
+def top_pairs(df, columns, dataset_key, method="pearson", k=20):
+    """The ``k`` column pairs with the largest absolute correlation."""
+    matrix = correlation(df, columns, dataset_key, method).to_numpy()
+    upper_i, upper_j = np.triu_indices(len(columns), k=1)
+    strength = np.abs(matrix[upper_i, upper_j])
+    strength = np.where(np.isnan(strength), -1.0, strength)
+    k = min(k, len(strength))
+    best = np.argpartition(-strength, k - 1)[:k] if k else np.array([], dtype=int)
+    best = best[np.argsort(-strength[best], kind="stable")]
+    best = best[strength[best] >= 0]
+    names = np.asarray(columns, dtype=object)
+    return pd.DataFrame({
+        "Column A": names[upper_i[best]],
+        "Column B": names[upper_j[best]],
+        "Correlation": matrix[upper_i[best], upper_j[best]].round(3),
+    })
+
+
+def heatmap_columns(df, columns, dataset_key, method="pearson", limit=CORRELATION_HEATMAP_MAX_COLUMNS):
+    """Columns to draw in an annotated heatmap.
+
+    Up to ``limit`` columns are drawn as they are; wider selections are cut
+    down to the columns taking part in the strongest pairs.
+    """
+    if len(columns) <= limit:
+        return list(columns)
+    chosen = []
+    for a, b in top_pairs(df, columns, dataset_key, method, k=limit * limit)[["Column A", "Column B"]].to_numpy():
+        for col in (a, b):
+            if col not in chosen and len(chosen) < limit:
+                chosen.append(col)
+        if len(chosen) >= limit:
+            break
+    return chosen
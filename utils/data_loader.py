@@ -0,0 +1,316 @@
+# utils/data_loader.py
+# One loading layer for every page: uploads are keyed by a hash of their
+# content and parsed at most once per process while they stay in the cache.
+import hashlib
+import json
+import time
+
+import streamlit as st
+
+from utils.config import (
+    DATASET_CACHE_MAX_BYTES,
+    INGEST_CHUNK_ROWS,
+    INGEST_MEMORY_LIMIT_BYTES,
+    STREAMING_MIN_BYTES,
+)
+from utils.disk_cache import cacheable, disk_cache
+from utils.ingest import stream_csv
+from utils.loaders import excel_sheets, parquet_layout, read_table
+from utils.lru import ByteLRU
+from utils.memory import compact_frame, format_bytes, frame_nbytes
+from utils.perf import tag, timer
+from utils.sessions import QuotaExceeded, SpilledUpload, current_session, session_manager
+
+SUPPORTED_TYPES = ["csv", "xlsx", "xls", "parquet"]
+
+
+# -------------------- CONTENT HASH --------------------
+def file_type_of(uploaded_file):
+    return uploaded_file.name.split(".")[-1].lower()
+
+
+def content_hash(uploaded_file):
+    """Hash the raw bytes of an upload without copying them."""
+    digest = hashlib.blake2b(digest_size=16)
+    view = uploaded_file.getbuffer()
+    try:
+        digest.update(view)
+    finally:
+        view.release()
+    return f"{digest.hexdigest()}-{file_type_of(uploaded_file)}"
+
+
+def upload_key(uploaded_file):
+    # Hashing a multi-GB upload on every rerun would defeat the cache, so the
+    # hash is remembered per Streamlit file id for the life of the session.
+    known = st.session_state.setdefault("_upload_keys", {})
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id is None or file_id not in known:
+        key = content_hash(uploaded_file)
+        if file_id is None:
+            return key
+        known[file_id] = key
+    return known[file_id]
+
+
+# -------------------- PARSING --------------------
+def _streaming_progress():
+    bar = st.progress(0.0, text="Parsing file...")
+    preview = st.empty()
+
+    def on_chunk(progress):
+        text = f"Parsed {progress.rows:,} rows x {progress.columns} columns"
+        if progress.sampled:
+            text += " (memory ceiling reached, sampling rows)"
+        bar.progress(progress.fraction, text=text)
+        preview.dataframe(progress.preview)
+
+    def done():
+        bar.empty()
+        preview.empty()
+
+    return on_chunk, done
+
+
+def parse_upload(uploaded_file, progress=True, options=None):
+    """Parse an upload and return ``(df, meta)``.
+
+    ``meta`` describes the ingestion: the true row count, the sample rate when
+    the memory ceiling forced sampling, streamed per-column statistics
+    covering every row (``None`` for files parsed in one go), and a ``load``
+    report with the engine, parse time and bytes read. ``options`` picks the
+    Excel sheet or the Parquet columns and row limit (see :func:`load_options`).
+    """
+    options = options or {}
+    file_type = file_type_of(uploaded_file)
+    uploaded_file.seek(0)
+    if file_type == "csv" and uploaded_file.size >= STREAMING_MIN_BYTES:
+        on_chunk, done = _streaming_progress() if progress else (None, lambda: None)
+        started = time.perf_counter()
+        try:
+            result = stream_csv(uploaded_file, INGEST_CHUNK_ROWS,
+                                INGEST_MEMORY_LIMIT_BYTES, on_chunk=on_chunk)
+        finally:
+            done()
+        meta = {"rows": result.total_rows, "sample_rate": result.sample_rate,
+                "stats": result.stats.to_frame(), "frequencies": result.stats.frequencies(),
+                "load": {"engine": result.engine, "seconds": time.perf_counter() - started,
+                         "bytes_read": uploaded_file.size}}
+        return result.df, meta
+
+    df, report = read_table(uploaded_file, file_type, sheet=options.get("sheet"),
+                            columns=options.get("columns"), max_rows=options.get("max_rows"))
+    meta = {"rows": len(df), "sample_rate": 1.0, "stats": None, "load": report.as_dict()}
+    if options:
+        meta["load_options"] = options
+    return df, meta
+
+
+# -------------------- LRU CACHE --------------------
+# Values are (df, meta) pairs weighed by the frame's in-memory size
+dataset_cache = ByteLRU(DATASET_CACHE_MAX_BYTES)
+# A released session's dataset is reopened from its spill file, so it does not
+# stay in memory once no session holds it
+session_manager.evict = dataset_cache.discard
+
+
+def _from_disk(key, uploaded_file, options):
+    """Open a previously parsed upload from the disk cache, or return None."""
+    started = time.perf_counter()
+    entry = disk_cache.get(key)
+    if entry is None:
+        return None
+    df, meta = entry
+    meta.pop("written", None)
+    meta["memory_bytes"] = frame_nbytes(df)
+    parsed = meta.get("load") or {}
+    meta["load"] = {"engine": "disk cache", "seconds": time.perf_counter() - started,
+                    "bytes_read": disk_cache.nbytes(key), "parse_seconds": parsed.get("seconds")}
+    if options:
+        meta["load_options"] = options
+    return df, meta
+
+
+# -------------------- PUBLIC API --------------------
+def load_dataset(uploaded_file):
+    """Return the parsed DataFrame for an upload and make it the session's active dataset.
+
+    The returned frame is shared between pages and sessions, so callers must
+    treat it as read-only and ``copy()`` before mutating it.
+    """
+    spilled = isinstance(uploaded_file, SpilledUpload)
+    if spilled:
+        # The session was released while idle; its dataset was spilled to disk
+        key = uploaded_file.key
+    else:
+        options = st.session_state.get("_load_options", {}).get(upload_key(uploaded_file), {})
+        # A different sheet or column selection is a different dataset
+        content_key = upload_key(uploaded_file) + _options_suffix(options)
+        compact = st.session_state.get("compact_memory", False)
+        key = f"{content_key}:compact" if compact else content_key
+    # The session keeps its own reference so a frame too large for the shared
+    # cache is still parsed only once per session. The session manager may
+    # release it while the session is idle; it is then reopened from here.
+    session = current_session()
+    tag(session=session.id, file=uploaded_file.name, dataset=key)
+    entry = None
+    held = session.frame(key)
+    if held is not None and st.session_state.get("_dataset_meta") is not None:
+        entry = held, st.session_state._dataset_meta
+    if entry is None:
+        entry = dataset_cache.get(key)
+    if entry is None and spilled:
+        with timer("reopen spilled dataset"):
+            entry = uploaded_file.read(), uploaded_file.meta
+        dataset_cache.put(key, entry, entry[1]["memory_bytes"])
+    if entry is None:
+        # A compact frame can be derived from an already cached full frame;
+        # otherwise only the compact result is cached, not the full parse.
+        entry = dataset_cache.get(content_key) if compact else None
+        # Uploads parsed by an earlier session or process are memory-mapped
+        # from the disk cache instead of being parsed again
+        if entry is None and cacheable(uploaded_file):
+            with timer("disk cache read"):
+                entry = _from_disk(content_key, uploaded_file, options)
+            st.session_state._parsed_key = key
+        if entry is None:
+            with timer("parse", file_type=file_type_of(uploaded_file), bytes=uploaded_file.size):
+                df, meta = parse_upload(uploaded_file, options=options)
+                meta["memory_bytes"] = frame_nbytes(df)
+            st.session_state._parsed_key = key
+            if cacheable(uploaded_file):
+                with timer("disk cache write"):
+                    disk_cache.put(content_key, df, meta, nan_text=file_type_of(uploaded_file) != "parquet")
+        else:
+            df, meta = entry
+        if compact:
+            with timer("compact memory"):
+                df = compact_frame(df)
+            meta = dict(meta, memory_before=meta["memory_bytes"], memory_bytes=frame_nbytes(df))
+        dataset_cache.put(key, (df, meta), meta["memory_bytes"])
+        entry = df, meta
+    session.hold(key, entry[0], uploaded_file, entry[1])
+    try:
+        session_manager.enforce(session, loading=held is None)
+    except QuotaExceeded:
+        clear_active_dataset()
+        raise
+    if session.released:
+        session.released = False
+        st.toast("Your data was moved out of memory while you were away and has been reopened.")
+    st.session_state.dataset_key = key
+    st.session_state._dataset_meta = entry[1]
+    return entry[0]
+
+
+def _options_suffix(options):
+    if not options:
+        return ""
+    digest = hashlib.blake2b(json.dumps(options, sort_keys=True).encode(), digest_size=6)
+    return f"@{digest.hexdigest()}"
+
+
+def dataset_meta():
+    """Return the ingestion metadata of the session's active dataset, or None."""
+    return st.session_state.get("_dataset_meta")
+
+
+def active_upload():
+    """Return the upload last loaded on any page in this session, or None."""
+    return current_session().upload
+
+
+def compact_memory_toggle():
+    """Render the session-wide compact memory switch shown next to each uploader."""
+    # Widget state is dropped when a page stops rendering the widget, so the
+    # choice is mirrored into a plain session key shared by all pages.
+    st.session_state.setdefault("compact_memory", False)
+
+    def _sync():
+        st.session_state.compact_memory = st.session_state._compact_memory_widget
+
+    st.toggle("Compact memory mode", value=st.session_state.compact_memory,
+              key="_compact_memory_widget", on_change=_sync,
+              help="Downcast numeric columns, store repeated text as categories "
+                   "and other text as Arrow strings. Uses far less memory per session.")
+
+
+def clear_active_dataset():
+    st.session_state.dataset_key = None
+    st.session_state._dataset_meta = None
+    current_session().clear()
+
+
+# -------------------- LOAD OPTIONS --------------------
+def _layout(uploaded_file, file_type):
+    # Sheet names and Parquet footers are read once per upload
+    layouts = st.session_state.setdefault("_load_layouts", {})
+    key = upload_key(uploaded_file)
+    if key not in layouts:
+        layouts[key] = excel_sheets(uploaded_file) if file_type != "parquet" else parquet_layout(uploaded_file)
+        uploaded_file.seek(0)
+    return layouts[key]
+
+
+def load_options(uploaded_file):
+    """Render the per-file load options shown under the uploader.
+
+    Workbooks with several sheets get a sheet picker; Parquet files can be
+    limited to some columns and leading rows, which are then the only column
+    chunks and row groups read from the file. Choices are kept per upload in a
+    plain session key so every page loads the same selection.
+    """
+    # A spilled dataset keeps the selection it was loaded with
+    if uploaded_file is None or isinstance(uploaded_file, SpilledUpload):
+        return
+    file_type = file_type_of(uploaded_file)
+    if file_type not in ["xlsx", "xls", "parquet"]:
+        return
+    try:
+        layout = _layout(uploaded_file, file_type)
+    except Exception:
+        # Unreadable files are reported by load_dataset
+        return
+    key = upload_key(uploaded_file)
+    all_options = st.session_state.setdefault("_load_options", {})
+    current = all_options.get(key, {})
+    options = {}
+
+    if file_type in ["xlsx", "xls"]:
+        if len(layout) < 2:
+            return
+        sheet = st.selectbox("Sheet", layout, index=layout.index(current.get("sheet", layout[0])),
+                             key=f"_load_sheet_{key}")
+        if sheet != layout[0]:
+            options["sheet"] = sheet
+    else:
+        with st.expander("Load Options"):
+            columns = st.multiselect("Columns to load (all if empty)", layout.columns,
+                                     default=current.get("columns", []), key=f"_load_columns_{key}")
+            max_rows = st.number_input(f"Rows to load (0 = all {layout.rows:,})", min_value=0,
+                                       max_value=layout.rows, value=current.get("max_rows", 0),
+                                       step=max(layout.row_groups[:1] or [1]), key=f"_load_rows_{key}")
+            st.caption(f"{len(layout.columns)} columns in {len(layout.row_groups)} row groups")
+        if columns:
+            options["columns"] = list(columns)
+        if max_rows:
+            options["max_rows"] = int(max_rows)
+    all_options[key] = options
+
+
+def load_summary():
+    """Caption describing how the active dataset was parsed."""
+    meta = dataset_meta() or {}
+    load = meta.get("load")
+    if not load:
+        return
+    if load["engine"] == "disk cache":
+        text = f"Memory-mapped from the disk cache in {load['seconds']:.2f} s"
+        if load.get("parse_seconds") is not None:
+            text += f" (parsing took {load['parse_seconds']:.2f} s)"
+        st.caption(text)
+        return
+    text = f"Parsed with {load['engine']} in {load['seconds']:.2f} s · read {format_bytes(load['bytes_read'])}"
+    if st.session_state.get("_parsed_key") != st.session_state.get("dataset_key"):
+        text += " (served from cache)"
+    st.caption(text)
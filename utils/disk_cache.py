@@ -0,0 +1,201 @@
+# utils/disk_cache.py
+# Persistent dataset cache on local disk. A parsed upload is written once as
+# an uncompressed Arrow IPC file named after its content hash; later sessions
+# (and restarts) memory-map that file instead of parsing the text again.
+# The directory is capped in bytes and evicts the least recently opened files.
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+
+from utils.config import DISK_CACHE_DIR, DISK_CACHE_MAX_BYTES, DISK_CACHE_MIN_BYTES
+from utils.loaders import nulls_as_nan
+
+_META_KEY = b"analytix"
+_SUFFIX = ".arrow"
+# Frame-valued meta entries (streamed statistics and sketches), each kept in
+# its own Arrow file beside the dataset
+_FRAMES = ("stats", "frequencies")
+_FRAME_SUFFIXES = tuple(f".{name}{_SUFFIX}" for name in _FRAMES)
+
+
+class DiskCache:
+    """Directory of Arrow IPC files keyed by dataset key, bounded by ``max_bytes``."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._pending = set()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, suffix=_SUFFIX):
+        # Keys are content hashes plus option digests; keep them filename-safe
+        return os.path.join(self.directory, key.replace(os.sep, "_").replace(":", "_") + suffix)
+
+    # ---------------- reads ----------------
+    def get(self, key):
+        """Return ``(df, meta)`` memory-mapped from disk, or None on a miss."""
+        path = self._path(key)
+        try:
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (FileNotFoundError, pa.ArrowException):
+            return None
+        meta = json.loads(table.schema.metadata[_META_KEY])
+        # Numeric columns without nulls stay views of the mapped pages
+        df = table.to_pandas(split_blocks=True)
+        if meta.pop("nan_text", False):
+            df = nulls_as_nan(df, table)
+        frames = meta.pop("frames", ["stats"] if meta.pop("has_stats", False) else [])
+        for name in _FRAMES:
+            meta[name] = self._read_frame(key, name) if name in frames else None
+        # Opening a file counts as a use for LRU eviction
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return df, meta
+
+    def _read_frame(self, key, name):
+        with pa.memory_map(self._path(key, f".{name}{_SUFFIX}")) as source:
+            return pa.ipc.open_file(source).read_all().to_pandas()
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def nbytes(self, key):
+        try:
+            return os.path.getsize(self._path(key))
+        except FileNotFoundError:
+            return 0
+
+    # ---------------- writes ----------------
+    def put(self, key, df, meta, nan_text=True):
+        """Write ``df`` in the background; returns False if it is not cached.
+
+        ``nan_text`` records that missing text was NaN in the parsed frame
+        (CSV and Excel) rather than None (Parquet), so reads restore it.
+        """
+        with self._lock:
+            if key in self._pending or key in self:
+                return False
+            self._pending.add(key)
+        self._writer.submit(self._write, key, df, meta, nan_text)
+        return True
+
+    def _write(self, key, df, meta, nan_text):
+        try:
+            frames = {name: meta[name] for name in _FRAMES if meta.get(name) is not None}
+            scalars = {k: v for k, v in meta.items() if k not in _FRAMES and k != "load_options"}
+            scalars.update(nan_text=nan_text, frames=list(frames), written=time.time())
+            table = pa.Table.from_pandas(df)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                                   _META_KEY: json.dumps(scalars, default=float)})
+            for name, frame in frames.items():
+                self._write_table(self._path(key, f".{name}{_SUFFIX}"), pa.Table.from_pandas(frame))
+            self._write_table(self._path(key), table)
+        except (pa.ArrowException, TypeError, ValueError, OSError):
+            # Mixed-type object columns have no Arrow type; such frames are
+            # simply parsed again next time
+            self._remove(key)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+        self._evict()
+
+    def _write_table(self, path, table):
+        # Write beside the target and rename, so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def flush(self):
+        """Wait for queued writes to finish."""
+        self._writer.submit(lambda: None).result()
+
+    # ---------------- eviction ----------------
+    def _remove(self, key):
+        for suffix in (_SUFFIX,) + _FRAME_SUFFIXES:
+            try:
+                os.remove(self._path(key, suffix))
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        with self._lock:
+            entries = self.entries()
+            used = int(entries["Size"].sum()) if len(entries) else 0
+            for key, size in zip(entries["Key"][::-1], entries["Size"][::-1]):
+                if used <= self.max_bytes:
+                    break
+                self._remove(key)
+                used -= size
+
+    def discard(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            for key in self.entries()["Key"]:
+                self._remove(key)
+
+    # ---------------- admin ----------------
+    def entries(self):
+        """One row per cached dataset, most recently used first."""
+        rows = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(_SUFFIX) or name.endswith(_FRAME_SUFFIXES):
+                continue
+            key = name[:-len(_SUFFIX)]
+            path = os.path.join(self.directory, name)
+            try:
+                info = os.stat(path)
+                frames = [self._path(key, suffix) for suffix in _FRAME_SUFFIXES]
+                size = info.st_size + sum(os.path.getsize(p) for p in frames if os.path.exists(p))
+                with pa.memory_map(path) as source:
+                    schema = pa.ipc.open_file(source).schema
+            except (FileNotFoundError, pa.ArrowException):
+                continue
+            meta = json.loads((schema.metadata or {}).get(_META_KEY, b"{}"))
+            index_cols = [c for c in (schema.pandas_metadata or {}).get("index_columns", []) if isinstance(c, str)]
+            rows.append({"Key": key, "Rows": meta.get("rows"), "Columns": len(schema.names) - len(index_cols),
+                         "Size": size, "Last Used": pd.Timestamp(info.st_mtime, unit="s")})
+        frame = pd.DataFrame(rows, columns=["Key", "Rows", "Columns", "Size", "Last Used"])
+        return frame.sort_values("Last Used", ascending=False, ignore_index=True)
+
+    def stats(self):
+        entries = self.entries()
+        return {"entries": len(entries), "bytes": int(entries["Size"].sum()) if len(entries) else 0,
+                "max_bytes": self.max_bytes}
+
+
+# -------------------- SHARED CACHE --------------------
+def _open_cache():
+    if DISK_CACHE_MAX_BYTES <= 0:
+        return None
+    try:
+        return DiskCache(DISK_CACHE_DIR, DISK_CACHE_MAX_BYTES)
+    except OSError:
+        # Read-only or missing home directory: run with the in-memory cache only
+        return None
+
+
+disk_cache = _open_cache()
+
+
+def cacheable(uploaded_file):
+    return disk_cache is not None and uploaded_file.size >= DISK_CACHE_MIN_BYTES
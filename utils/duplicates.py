@@ -0,0 +1,181 @@
+# utils/duplicates.py
+# Duplicate index: one 64-bit hash per row, built once per frame and carried
+# through cleaning steps instead of re-hashing every row on each rerun.
+#
+# A row hash is the wrapping sum of per-column terms, each term being the
+# column's value hash mixed with a stable column id. Dropping or replacing a
+# column therefore only subtracts/adds that column's term, row filters only
+# select hashes, and renames only relabel ids. Equal hashes are treated as
+# candidates and confirmed against the actual values, so results are exact.
+import numpy as np
+import pandas as pd
+
+from utils.config import DUPLICATE_CACHE_MAX_BYTES
+from utils.lru import ByteLRU
+from utils.perf import timer
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+# Subset masks and column terms memoized per index (8 and 1 bytes per row)
+_MEMO_ENTRIES = 8
+
+
+def _mix(hashes, column_id):
+    # splitmix64 finaliser over (hash + id * golden ratio): distinct per column,
+    # so equal values in different columns do not cancel out
+    with np.errstate(over="ignore"):
+        z = hashes + np.uint64(column_id + 1) * _GOLDEN
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def _remember(memo, key, value):
+    memo[key] = value
+    while len(memo) > _MEMO_ENTRIES:
+        del memo[next(iter(memo))]
+
+
+def _value_hashes(series):
+    if pd.api.types.is_float_dtype(series.dtype) and isinstance(series.dtype, np.dtype):
+        # -0.0 == 0.0 for duplicated(), but their bit patterns differ
+        series = series + 0.0
+    return pd.util.hash_pandas_object(series, index=False).to_numpy()
+
+
+class DuplicateIndex:
+    """Row hashes for one frame; derive new indexes with :meth:`updated`."""
+
+    def __init__(self, df=None):
+        if df is None:
+            return
+        self.ids = {col: i for i, col in enumerate(df.columns)}
+        self._terms = {}
+        self._masks = {}
+        self.row_hash = np.zeros(len(df), dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for col in df.columns:
+                self.row_hash += self._term(df, col)
+        # Only subset lookups keep individual column terms
+        self._terms = {}
+
+    @property
+    def nbytes(self):
+        return (self.row_hash.nbytes + sum(term.nbytes for term in self._terms.values())
+                + sum(mask.nbytes for mask in self._masks.values()))
+
+    def _term(self, df, col, keep=True):
+        column_id = self.ids[col]
+        term = self._terms.get(column_id)
+        if term is None:
+            term = _mix(_value_hashes(df[col]), column_id)
+            if keep:
+                _remember(self._terms, column_id, term)
+        return term
+
+    def _derive(self, row_hash, ids, terms):
+        index = DuplicateIndex()
+        index.row_hash = row_hash
+        index.ids = ids
+        index._terms = terms
+        index._masks = {}
+        return index
+
+    # ---------------- queries ----------------
+    def hashes(self, df, subset=None):
+        """Per-row hashes over all columns, or over the ``subset`` key columns."""
+        if subset is None or set(subset) == set(self.ids):
+            return self.row_hash
+        combined = np.zeros(len(self.row_hash), dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for col in subset:
+                combined += self._term(df, col)
+        return combined
+
+    def duplicated(self, df, subset=None):
+        """Boolean mask like ``df.duplicated(subset)`` (keep="first"), memoized per subset."""
+        key = None if subset is None else tuple(subset)
+        if key in self._masks:
+            return self._masks[key]
+        hashes = self.hashes(df, subset)
+        candidates = pd.Series(hashes).duplicated(keep=False).to_numpy()
+        mask = np.zeros(len(hashes), dtype=bool)
+        if candidates.any():
+            # Confirm hash matches against the values of the candidate rows only
+            rows = np.flatnonzero(candidates)
+            mask[rows] = df.iloc[rows].duplicated(subset=subset).to_numpy()
+        _remember(self._masks, key, mask)
+        return mask
+
+    def count(self, df, subset=None):
+        return int(self.duplicated(df, subset).sum())
+
+    def groups(self, df, subset=None, limit=20):
+        """The largest duplicate groups: key values, occurrence count and row labels."""
+        hashes = self.hashes(df, subset)
+        repeated = self.duplicated(df, subset)
+        if not repeated.any():
+            return pd.DataFrame()
+        dup_hashes = np.unique(hashes[repeated])
+        rows = np.flatnonzero(np.isin(hashes, dup_hashes))
+        keys = hashes[rows]
+        order = np.argsort(keys, kind="stable")
+        rows, keys = rows[order], keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        sizes = np.diff(np.r_[starts, len(keys)])
+        top = np.argsort(-sizes, kind="stable")[:limit]
+        columns = list(df.columns) if subset is None else list(subset)
+        first = rows[starts[top]]
+        table = df.iloc[first][columns].reset_index(drop=True)
+        table.insert(0, "Occurrences", sizes[top])
+        labels = df.index.to_numpy()
+        table["Rows"] = [", ".join(map(str, labels[rows[s:s + n]][:10])) + (" ..." if n > 10 else "")
+                         for s, n in zip(starts[top], sizes[top])]
+        return table
+
+    # ---------------- incremental updates ----------------
+    def updated(self, op, before, after):
+        """Index for ``after``, the result of applying ``op`` to ``before``."""
+        kind = op["op"]
+        if kind == "drop":
+            row_hash = self.row_hash.copy()
+            ids = dict(self.ids)
+            with np.errstate(over="ignore"):
+                for col in op["columns"]:
+                    row_hash -= self._term(before, col, keep=False)
+                    del ids[col]
+            terms = {i: t for i, t in self._terms.items() if i in ids.values()}
+            return self._derive(row_hash, ids, terms)
+        if kind == "rename":
+            ids = {op["columns"].get(col, col): i for col, i in self.ids.items()}
+            return self._derive(self.row_hash, ids, dict(self._terms))
+        if kind in ("astype", "fillna", "power_transform"):
+            col = op["column"]
+            old = self._term(before, col, keep=False)
+            terms = {i: t for i, t in self._terms.items() if i != self.ids[col]}
+            index = self._derive(None, dict(self.ids), terms)
+            with np.errstate(over="ignore"):
+                index.row_hash = self.row_hash - old + index._term(after, col, keep=False)
+            return index
+        if kind in ("dropna", "drop_duplicates"):
+            # Row filters keep a subset of labels in order
+            if before.index.is_unique:
+                rows = before.index.get_indexer(after.index)
+                terms = {i: t[rows] for i, t in self._terms.items()}
+                return self._derive(self.row_hash[rows], dict(self.ids), terms)
+        return DuplicateIndex(after)
+
+
+# -------------------- SHARED CACHE --------------------
+# Indexes for loaded datasets, shared by Quick Insights and Clean Data
+duplicate_cache = ByteLRU(DUPLICATE_CACHE_MAX_BYTES)
+
+
+def duplicate_index(df, dataset_key):
+    """Return the (cached) duplicate index of a loaded dataset."""
+    index = duplicate_cache.get(dataset_key)
+    if index is None or len(index.row_hash) != len(df):
+        with timer("hash rows", rows=len(df)):
+            index = DuplicateIndex(df)
+    # Re-weigh the entry: subset queries since the last call may have grown it
+    duplicate_cache.put(dataset_key, index, index.nbytes)
+    return index
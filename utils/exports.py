@@ -0,0 +1,57 @@
+# utils/exports.py
+# On-demand export of cleaned frames. Nothing is serialized until a download
+# is requested; the frame is then written chunk by chunk through the same
+# writers as the out-of-core engine, and the bytes are cached per
+# (dataset version, format) so repeated downloads are free.
+import io
+
+import pyarrow as pa
+
+from utils.config import COMPRESSION_MIN_BYTES, EXPORT_CACHE_MAX_BYTES, EXPORT_CHUNK_ROWS
+from utils.lru import ByteLRU
+from utils.memory import frame_nbytes
+from utils.perf import timer
+from utils.writers import BASE_FORMATS, COMPRESSED_FORMATS, EXCEL_MAX_ROWS, WRITE_FORMATS, open_writer
+
+export_cache = ByteLRU(EXPORT_CACHE_MAX_BYTES)
+
+
+def export_formats(df):
+    """Formats to offer for ``df``; compressed variants only for large frames."""
+    formats = list(BASE_FORMATS)
+    if len(df) >= EXCEL_MAX_ROWS:
+        formats.remove("Excel")
+    if frame_nbytes(df) >= COMPRESSION_MIN_BYTES:
+        formats += COMPRESSED_FORMATS
+    return formats
+
+
+def write_frame(df, fmt, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Serialize ``df`` in ``fmt`` one chunk of rows at a time and return the bytes."""
+    # Excel needs a seekable file for its zip container; the others write to
+    # an Arrow buffer that survives the compressed stream being closed
+    sink = io.BytesIO() if WRITE_FORMATS[fmt][2] == "excel" else pa.BufferOutputStream()
+    writer = open_writer(sink, fmt)
+    try:
+        for start in range(0, max(len(df), 1), chunk_rows):
+            writer.write(df.iloc[start:start + chunk_rows])
+    finally:
+        writer.close()
+    if isinstance(sink, io.BytesIO):
+        return sink.getvalue()
+    return sink.getvalue().to_pybytes()
+
+
+def cached_export(version, df, fmt):
+    """Bytes of ``df`` in ``fmt``; ``version`` identifies the frame's contents."""
+    key = (version, fmt)
+    data = export_cache.get(key)
+    if data is None:
+        with timer("export", format=fmt, rows=len(df)):
+            data = write_frame(df, fmt)
+        export_cache.put(key, data, len(data))
+    return data
+
+
+def is_cached(version, fmt):
+    return (version, fmt) in export_cache
@@ -0,0 +1,175 @@
+# utils/figures.py
+# In-memory chart rendering. Charts are drawn with matplotlib's Figure API
+# (thread-safe, unlike pyplot), encoded to PNG in memory and cached by their
+# parameters so the page and the PDF report share one render.
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from io import BytesIO
+
+import matplotlib.pyplot as plt
+import seaborn as sns
+from matplotlib.figure import Figure
+
+from utils.config import FIGURE_CACHE_MAX_BYTES
+from utils.correlation import correlation, heatmap_columns
+from utils.lru import ByteLRU
+from utils.perf import timer
+
+REPORT_DPI = 150
+# st.pyplot renders at 200 dpi; cached screen images keep the same look
+SCREEN_DPI = 200
+EXPORT_DPI = 300
+
+figure_cache = ByteLRU(FIGURE_CACHE_MAX_BYTES)
+
+
+def figure_to_bytes(fig, fmt="png", dpi=REPORT_DPI):
+    buf = BytesIO()
+    with timer("savefig", format=fmt, dpi=dpi):
+        fig.savefig(buf, format=fmt, dpi=dpi, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def cached_png(key, draw, figsize, dpi=REPORT_DPI):
+    """Return PNG bytes for ``key``, calling ``draw(ax)`` on a fresh figure on a miss."""
+    png = figure_cache.get(key)
+    if png is None:
+        fig = Figure(figsize=figsize)
+        with timer("draw", chart=key[0]):
+            draw(fig.subplots())
+        png = figure_to_bytes(fig, dpi=dpi)
+        figure_cache.put(key, png, len(png))
+    return png
+
+
+# -------------------- VISUAL EXPLORER CHARTS --------------------
+# format label -> (savefig format, mime type, file extension)
+EXPORT_FORMATS = {
+    "PNG": ("png", "image/png", "png"),
+    "SVG": ("svg", "image/svg+xml", "svg"),
+    "PDF": ("pdf", "application/pdf", "pdf"),
+}
+EXPORT_DPIS = [100, 150, 300, 600]
+# Recently drawn figures stay alive so an export re-saves instead of redrawing
+LIVE_FIGURES = 8
+
+
+@dataclass
+class ChartImages:
+    screen: bytes
+    note: str = None
+    exports: dict = field(default_factory=dict)
+
+    @property
+    def nbytes(self):
+        return len(self.screen) + sum(len(data) for data in self.exports.values())
+
+
+# key -> (figure, lock serializing savefig calls on that figure)
+_live_figures = OrderedDict()
+_live_lock = threading.Lock()
+
+
+def _keep_figure(key, fig):
+    live = fig, threading.Lock()
+    with _live_lock:
+        _live_figures[key] = live
+        _live_figures.move_to_end(key)
+        while len(_live_figures) > LIVE_FIGURES:
+            _live_figures.popitem(last=False)
+    return live
+
+
+def _live_figure(key):
+    with _live_lock:
+        return _live_figures.get(key)
+
+
+def _render(build, key=None):
+    with timer("draw", chart=str(key[1:]) if key else None):
+        result = build()
+    fig, note = result if isinstance(result, tuple) else (result, None)
+    # seaborn figure-level plots (pairplot) register with pyplot; closing
+    # only unregisters them, the figure can still be saved
+    plt.close(fig)
+    return fig, note
+
+
+def axes_chart(draw, figsize=(8, 4)):
+    """Wrap ``draw(ax)`` into a figure builder for cached_chart.
+
+    ``draw`` may return a caption (e.g. a sampling note) kept with the chart.
+    """
+    def build():
+        fig = Figure(figsize=figsize)
+        note = draw(fig.subplots())
+        fig.tight_layout()
+        return fig, note
+    return build
+
+
+def cached_chart(key, build):
+    """Return the cached ChartImages for ``key``, drawing only the screen image.
+
+    ``key`` should identify the chart completely, e.g. (dataset key, viz
+    type, columns, plot type). ``build()`` returns a matplotlib Figure and is
+    only called on a cache miss; it may return ``(fig, note)`` to attach a
+    caption. High-resolution exports are produced later by export_chart.
+    """
+    images = figure_cache.get(key)
+    if images is None:
+        fig, note = _render(build, key)
+        images = ChartImages(figure_to_bytes(fig, dpi=SCREEN_DPI), note)
+        figure_cache.put(key, images, images.nbytes)
+        _keep_figure(key, fig)
+    return images
+
+
+def export_chart(key, build, fmt="PNG", dpi=EXPORT_DPI):
+    """Return the chart encoded as ``fmt`` at ``dpi``, encoding it on first request.
+
+    Meant to be passed (wrapped in a lambda) as a deferred ``st.download_button``
+    payload, so the encoding runs only when the user downloads.
+    """
+    savefig_format = EXPORT_FORMATS[fmt][0]
+    images = cached_chart(key, build)
+    export_key = (savefig_format, dpi)
+    data = images.exports.get(export_key)
+    if data is None:
+        live = _live_figure(key)
+        if live is None:
+            fig, _ = _render(build, key)
+            live = _keep_figure(key, fig)
+        # Only exports of this same figure wait; other charts keep rendering
+        fig, lock = live
+        with lock:
+            data = figure_to_bytes(fig, fmt=savefig_format, dpi=dpi)
+        # The exports map is shared by every session showing this chart
+        with _live_lock:
+            images.exports[export_key] = data
+            # re-insert so the LRU accounts for the new export bytes
+            figure_cache.put(key, images, images.nbytes)
+    return data
+
+
+# -------------------- QUICK INSIGHTS CHARTS --------------------
+def distribution_png(df, col, dataset_key):
+    def draw(ax):
+        sns.histplot(df[col].dropna(), kde=True, ax=ax, color="#ff6b6b")
+        ax.set_xlabel(col, fontsize=12)
+        ax.set_ylabel('Frequency', fontsize=12)
+        ax.tick_params(labelsize=10)
+    return cached_png(("distribution", dataset_key, col), draw, figsize=(6, 4))
+
+
+def correlation_png(df, numeric_cols, dataset_key):
+    # Wide tables draw only the columns in the strongest pairs; the matrix
+    # itself comes from the shared correlation cache
+    def draw(ax):
+        columns = heatmap_columns(df, numeric_cols, dataset_key)
+        sns.heatmap(correlation(df, columns, dataset_key), annot=True, cmap="coolwarm", center=0,
+                    linewidths=1, ax=ax, annot_kws={'size':10}, fmt='.2f')
+        ax.tick_params(labelsize=10)
+        ax.figure.tight_layout()
+    return cached_png(("correlation", dataset_key, tuple(numeric_cols)), draw, figsize=(7, 6))
@@ -0,0 +1,183 @@
+# utils/ingest.py
+# Chunked CSV ingestion. Rows are parsed in batches so a preview and running
+# statistics are available early, and a memory ceiling switches the loader to
+# sampling instead of exhausting the server.
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from utils.categorical import ColumnSketch
+from utils.loaders import iter_csv_fast
+
+PREVIEW_ROWS = 5
+
+
+# -------------------- RUNNING STATISTICS --------------------
+class RunningStats:
+    """Per-column count, nulls, min, max, sum, mean and std merged chunk by chunk.
+
+    Text columns also get a :class:`~utils.categorical.ColumnSketch` for their
+    distinct count and most frequent values.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = None
+        self.sketches = {}
+
+    def _init(self, columns):
+        self.columns = columns
+        zeros = pd.Series(0.0, index=columns)
+        self.count = zeros.copy()
+        self.nulls = zeros.copy()
+        self.sum = zeros.copy()
+        self.mean = zeros.copy()
+        self.m2 = zeros.copy()
+        self.min = pd.Series(np.nan, index=columns)
+        self.max = pd.Series(np.nan, index=columns)
+        self.numeric = pd.Series(True, index=columns)
+
+    def update(self, chunk):
+        if self.columns is None:
+            self._init(chunk.columns)
+        self.rows += len(chunk)
+        nulls = chunk.isna().sum()
+        self.nulls += nulls
+        self.count += len(chunk) - nulls
+
+        num = chunk.select_dtypes(include=np.number)
+        self.numeric &= pd.Series(chunk.columns.isin(num.columns), index=chunk.columns)
+        # A text column can parse as float in a chunk where it is all missing
+        for col in chunk.columns:
+            if col not in num.columns or nulls[col] == len(chunk):
+                self.sketches.setdefault(col, ColumnSketch()).update(chunk[col])
+        if num.empty:
+            return
+        cols = num.columns
+        self.min[cols] = np.fmin(self.min[cols], num.min())
+        self.max[cols] = np.fmax(self.max[cols], num.max())
+        self.sum[cols] += num.sum()
+
+        # Chan et al. pairwise update keeps mean/variance stable across chunks
+        n_b = num.count()
+        mean_b = num.mean().fillna(0.0)
+        m2_b = (num.var(ddof=0) * n_b).fillna(0.0)
+        n_a = self.count[cols] - n_b
+        n = (n_a + n_b).replace(0, np.nan)
+        delta = mean_b - self.mean[cols]
+        self.mean[cols] = (self.mean[cols] + delta * n_b / n).fillna(0.0)
+        self.m2[cols] = (self.m2[cols] + m2_b + delta ** 2 * n_a * n_b / n).fillna(0.0)
+
+    def to_frame(self):
+        """Return one row per column; numeric-only stats are NaN elsewhere."""
+        if self.columns is None:
+            return pd.DataFrame()
+        numeric = self.numeric
+        std = np.sqrt(self.m2 / (self.count - 1).where(self.count > 1))
+        frame = pd.DataFrame({
+            "count": self.count.astype("int64"),
+            "nulls": self.nulls.astype("int64"),
+            "min": self.min.where(numeric),
+            "max": self.max.where(numeric),
+            "sum": self.sum.where(numeric),
+            "mean": self.mean.where(numeric & (self.count > 0)),
+            "std": std.where(numeric),
+            "unique": pd.Series({col: round(sketch.distinct.estimate())
+                                 for col, sketch in self._complete_sketches()}, dtype="float64").reindex(self.columns),
+        })
+        frame.index.name = "column"
+        return frame
+
+    def _complete_sketches(self):
+        # Columns that were numeric in some chunk have partial sketches
+        return [(col, sketch) for col, sketch in self.sketches.items()
+                if sketch.rows == self.rows and not self.numeric[col]]
+
+    def frequencies(self):
+        """Estimated most frequent values of each text column, as a long table."""
+        parts = []
+        for col, sketch in self._complete_sketches():
+            top = sketch.top()
+            parts.append(pd.DataFrame({"Column": col, "Value": top.index.map(str), "Count": top.to_numpy()}))
+        if not parts:
+            return pd.DataFrame(columns=["Column", "Value", "Count"])
+        return pd.concat(parts, ignore_index=True)
+
+
+# -------------------- STREAMING READER --------------------
+@dataclass
+class IngestProgress:
+    rows: int
+    columns: int
+    fraction: float
+    preview: pd.DataFrame
+    sampled: bool
+
+
+@dataclass
+class IngestResult:
+    df: pd.DataFrame
+    stats: RunningStats
+    total_rows: int
+    sample_rate: float
+    engine: str = "pyarrow (streamed)"
+
+    @property
+    def sampled(self):
+        return self.sample_rate < 1.0
+
+
+def stream_csv(source, chunk_rows, memory_limit, on_chunk=None, seed=0):
+    """Parse a CSV in chunks, keeping at most ``memory_limit`` bytes of rows.
+
+    Statistics always cover every row. Once the kept rows would exceed the
+    ceiling, already-kept chunks are thinned by half and later chunks are
+    Bernoulli-sampled at the same rate, so the result stays a uniform sample.
+    Chunks come from the multithreaded pyarrow reader; files it rejects are
+    parsed again from the start with pandas.
+    """
+    try:
+        return _stream(iter_csv_fast(source, chunk_rows), source, memory_limit, on_chunk, seed)
+    except (pa.ArrowException, ValueError):
+        source.seek(0)
+        result = _stream(pd.read_csv(source, chunksize=chunk_rows), source, memory_limit, on_chunk, seed)
+        result.engine = "pandas (streamed)"
+        return result
+
+
+def _stream(chunks, source, memory_limit, on_chunk, seed):
+    rng = np.random.default_rng(seed)
+    size = getattr(source, "size", None)
+    stats = RunningStats()
+    kept = []
+    kept_rows = 0
+    row_bytes = None
+    keep_rate = 1.0
+    preview = None
+
+    for chunk in chunks:
+        stats.update(chunk)
+        if preview is None:
+            preview = chunk.head(PREVIEW_ROWS)
+        if len(chunk):
+            chunk_row_bytes = chunk.memory_usage(index=True, deep=True).sum() / len(chunk)
+            row_bytes = chunk_row_bytes if row_bytes is None else max(row_bytes, chunk_row_bytes)
+        if keep_rate < 1.0:
+            chunk = chunk[rng.random(len(chunk)) < keep_rate]
+        kept.append(chunk)
+        kept_rows += len(chunk)
+
+        while row_bytes and kept_rows * row_bytes > memory_limit and kept_rows > 1:
+            keep_rate /= 2
+            kept = [c[rng.random(len(c)) < 0.5] for c in kept]
+            kept_rows = sum(len(c) for c in kept)
+
+        if on_chunk is not None:
+            fraction = source.tell() / size if size else 0.0
+            on_chunk(IngestProgress(stats.rows, len(stats.columns), min(fraction, 1.0),
+                                    preview, keep_rate < 1.0))
+
+    df = pd.concat(kept, ignore_index=True) if len(kept) > 1 else kept[0].reset_index(drop=True)
+    return IngestResult(df, stats, stats.rows, keep_rate)
@@ -0,0 +1,235 @@
+# utils/loaders.py
+# Engine selection for file parsing. Faster readers are used when
+# they are installed (the multithreaded pyarrow CSV reader, calamine for
+# Excel); Parquet reads only the requested columns and row groups. Every
+# read reports its engine, duration and the bytes it actually read.
+import importlib.util
+import os
+import re
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from pandas._libs.parsers import STR_NA_VALUES
+
+EXCEL_ENGINE = "calamine" if importlib.util.find_spec("python_calamine") else None
+
+
+@dataclass
+class LoadReport:
+    engine: str
+    seconds: float
+    bytes_read: int
+
+    def as_dict(self):
+        return {"engine": self.engine, "seconds": self.seconds, "bytes_read": self.bytes_read}
+
+
+def _size(source):
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    size = getattr(source, "size", None)
+    if size is None:
+        size = len(source.getbuffer())
+    return size
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def nulls_as_nan(df, table):
+    """Turn the None that Arrow gives for missing text into pandas' NaN."""
+    for name, column in zip(table.column_names, table.columns):
+        if column.null_count and name in df and df[name].dtype == object:
+            values = df[name].to_numpy(copy=True)
+            values[column.is_null().to_numpy(zero_copy_only=False)] = np.nan
+            df[name] = values
+    return df
+
+
+# -------------------- CSV --------------------
+# Blocks handed to the streaming reader; column types are inferred from the first
+STREAM_BLOCK_BYTES = 32 << 20
+
+
+def _convert_options(column_types=None):
+    # Match pandas' C parser: same NA tokens, empty text is missing, and only
+    # True/False spellings are booleans
+    return pa_csv.ConvertOptions(
+        null_values=sorted(STR_NA_VALUES),
+        strings_can_be_null=True,
+        true_values=["True", "TRUE", "true"],
+        false_values=["False", "FALSE", "false"],
+        column_types=column_types,
+    )
+
+
+def _arrow_csv(source, column_types=None):
+    return pa_csv.read_csv(_rewind(source), convert_options=_convert_options(column_types))
+
+
+def _temporal(schema):
+    # pandas leaves date-like text as strings; those columns are re-read as
+    # text so both engines agree on dtypes and values
+    return {f.name: pa.string() for f in schema if pa.types.is_temporal(f.type)}
+
+
+def _to_pandas(table):
+    """The DataFrame pandas' own parser would give for ``table``."""
+    # Columns with no values at all are float NaN in pandas, not None
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type) and table.num_rows:
+            table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+    # pandas names empty headers (e.g. a written index) by their position
+    names = [name or f"Unnamed: {i}" for i, name in enumerate(table.column_names)]
+    if len(set(names)) != len(names):
+        raise ValueError("duplicate column names")
+    table = table.rename_columns(names)
+    return nulls_as_nan(table.to_pandas(), table)
+
+
+def read_csv_fast(source):
+    """Parse a CSV with the multithreaded pyarrow reader, falling back to pandas."""
+    try:
+        table = _arrow_csv(source)
+        temporal = _temporal(table.schema)
+        if temporal:
+            table = _arrow_csv(source, temporal)
+        return _to_pandas(table), "pyarrow"
+    except (pa.ArrowException, ValueError):
+        # Quoting and type edge cases the Arrow reader rejects
+        return pd.read_csv(_rewind(source)), "pandas"
+
+
+def _widened(error, schema):
+    """Wider type for the column a streamed value did not fit, or None."""
+    match = re.search(r"CSV column #(\d+)", str(error))
+    if match is None or int(match.group(1)) >= len(schema):
+        return None
+    field = schema.field(int(match.group(1)))
+    if pa.types.is_null(field.type) or pa.types.is_integer(field.type):
+        return {field.name: pa.float64()}
+    if pa.types.is_string(field.type):
+        return None
+    return {field.name: pa.string()}
+
+
+def _open_csv(source, column_types, skip, block_bytes):
+    read = pa_csv.ReadOptions(block_size=block_bytes, skip_rows_after_names=skip)
+    return pa_csv.open_csv(_rewind(source), read_options=read, convert_options=_convert_options(column_types))
+
+
+def iter_csv_fast(source, chunk_rows, block_bytes=STREAM_BLOCK_BYTES):
+    """Yield DataFrame chunks of about ``chunk_rows`` rows from the multithreaded pyarrow reader.
+
+    Column types are inferred from the first block. When a later value does
+    not fit, the column is widened (integers and empty columns to float,
+    anything else to text) and reading resumes after the rows already
+    yielded, so chunks can differ in dtype as with pandas' chunked reader.
+    Raises ``pa.ArrowException`` or ``ValueError`` for files it cannot read.
+    """
+    column_types = {}
+    done = 0
+    while True:
+        reader = _open_csv(source, column_types, done, block_bytes)
+        temporal = {name: kind for name, kind in _temporal(reader.schema).items() if name not in column_types}
+        if temporal:
+            column_types.update(temporal)
+            reader = _open_csv(source, column_types, done, block_bytes)
+        pending, rows = [], 0
+        try:
+            for batch in reader:
+                pending.append(batch)
+                rows += batch.num_rows
+                if rows >= chunk_rows:
+                    yield _to_pandas(pa.Table.from_batches(pending))
+                    done += rows
+                    pending, rows = [], 0
+            if pending or not done:
+                yield _to_pandas(pa.Table.from_batches(pending, schema=reader.schema))
+            return
+        except pa.ArrowInvalid as error:
+            wider = _widened(error, reader.schema)
+            if wider is None:
+                raise
+            column_types.update(wider)
+
+
+# -------------------- EXCEL --------------------
+def excel_sheets(source):
+    """Sheet names of a workbook, in file order."""
+    with pd.ExcelFile(_rewind(source), engine=EXCEL_ENGINE) as book:
+        return list(book.sheet_names)
+
+
+def read_excel_fast(source, sheet=None):
+    df = pd.read_excel(_rewind(source), sheet_name=sheet or 0, engine=EXCEL_ENGINE)
+    return df, EXCEL_ENGINE or "openpyxl"
+
+
+# -------------------- PARQUET --------------------
+@dataclass
+class ParquetLayout:
+    columns: list
+    row_groups: list  # rows per row group
+    rows: int
+
+
+def parquet_layout(source):
+    """Columns and row-group sizes from the footer, without reading any data."""
+    meta = pq.ParquetFile(_rewind(source)).metadata
+    schema = pq.ParquetFile(_rewind(source)).schema_arrow
+    index_cols = set()
+    if schema.pandas_metadata:
+        index_cols = {c for c in schema.pandas_metadata.get("index_columns", []) if isinstance(c, str)}
+    columns = [name for name in schema.names if name not in index_cols]
+    groups = [meta.row_group(i).num_rows for i in range(meta.num_row_groups)]
+    return ParquetLayout(columns, groups, meta.num_rows)
+
+
+def read_parquet_fast(source, columns=None, max_rows=None):
+    """Read only ``columns`` and the leading row groups covering ``max_rows``."""
+    parquet = pq.ParquetFile(_rewind(source))
+    meta = parquet.metadata
+    groups, rows = [], 0
+    for i in range(meta.num_row_groups):
+        if max_rows and rows >= max_rows:
+            break
+        groups.append(i)
+        rows += meta.row_group(i).num_rows
+    table = parquet.read_row_groups(groups, columns=columns, use_pandas_metadata=True)
+    wanted = set(table.column_names)
+    bytes_read = sum(
+        meta.row_group(i).column(j).total_compressed_size
+        for i in groups
+        for j in range(meta.num_columns)
+        if meta.row_group(i).column(j).path_in_schema.split(".")[0] in wanted
+    )
+    df = table.to_pandas()
+    if max_rows:
+        df = df.iloc[:max_rows]
+    return df, bytes_read
+
+
+# -------------------- DISPATCH --------------------
+def read_table(source, file_type, sheet=None, columns=None, max_rows=None):
+    """Parse ``source`` and return ``(df, LoadReport)``."""
+    started = time.perf_counter()
+    bytes_read = _size(source)
+    if file_type == "csv":
+        df, engine = read_csv_fast(source)
+    elif file_type in ["xlsx", "xls"]:
+        df, engine = read_excel_fast(source, sheet)
+    elif file_type == "parquet":
+        df, bytes_read = read_parquet_fast(source, columns, max_rows)
+        engine = "pyarrow"
+    else:
+        raise ValueError("Unsupported file type")
+    return df, LoadReport(engine, time.perf_counter() - started, bytes_read)
@@ -0,0 +1,70 @@
+# utils/memory.py
+# Opt-in "compact memory" conversion applied to freshly loaded frames.
+import numpy as np
+import pandas as pd
+
+from utils.config import CATEGORY_MAX_RATIO
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def format_bytes(n):
+    if n < 1024:
+        return f"{n} Bytes"
+    if n < 1024 * 1024:
+        return f"{round(n / 1024, 2)} KB"
+    if n < 1024 ** 3:
+        return f"{round(n / (1024 * 1024), 2)} MB"
+    return f"{round(n / 1024 ** 3, 2)} GB"
+
+
+def _arrow_string_dtype():
+    try:
+        return pd.StringDtype("pyarrow")
+    except ImportError:
+        return None
+
+
+def _downcast_float(s):
+    # pd.to_numeric(downcast="float") accepts approximate matches; statistics
+    # must not change, so only keep float32 when every value round-trips.
+    if s.dtype != np.float64:
+        return s
+    narrow = s.astype(np.float32)
+    values = s.to_numpy()
+    back = narrow.to_numpy().astype(np.float64)
+    if np.array_equal(values, back, equal_nan=True):
+        return narrow
+    return s
+
+
+def compact_frame(df, category_max_ratio=CATEGORY_MAX_RATIO, arrow_strings=True):
+    """Return a copy of ``df`` using the smallest dtypes that hold its values.
+
+    Integers are downcast to the narrowest signed type, floats to float32 only
+    when that is lossless, low-cardinality object columns become ``category``
+    and the remaining text columns become Arrow-backed strings.
+    """
+    string_dtype = _arrow_string_dtype() if arrow_strings else None
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_bool_dtype(s.dtype):
+            out[col] = s
+        elif pd.api.types.is_integer_dtype(s.dtype):
+            out[col] = pd.to_numeric(s, downcast="integer")
+        elif pd.api.types.is_float_dtype(s.dtype):
+            out[col] = _downcast_float(s)
+        elif s.dtype == object:
+            non_null = s.count()
+            if non_null and s.nunique(dropna=True) / non_null <= category_max_ratio:
+                out[col] = s.astype("category")
+            elif string_dtype is not None and pd.api.types.infer_dtype(s, skipna=True) == "string":
+                out[col] = s.astype(string_dtype)
+            else:
+                out[col] = s
+        else:
+            out[col] = s
+    return pd.DataFrame(out, index=df.index)
@@ -0,0 +1,291 @@
+# utils/out_of_core.py
+# Out-of-core execution of Clean Data operations for files larger than RAM.
+# The input is streamed in chunks through the recorded steps and each cleaned
+# chunk goes straight to a chunk writer. Steps that need whole-column state
+# are handled with extra streaming passes:
+#   * mean/median/mode fills and power transforms are refitted from a
+#     statistics pass over the rows as they stand before the step (medians
+#     and transforms on a bounded uniform sample of the column);
+#   * duplicate removal keeps a compact set of 64-bit row hashes.
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from utils.cleaning import apply_operation, fill_operation, power_transform_operation
+from utils.config import INGEST_CHUNK_ROWS, OUT_OF_CORE_FIT_ROWS, SAMPLE_SEED
+
+# Fill methods whose value depends on the data; "zero" and "custom" do not
+FITTED_FILLS = {"mean", "median", "mode"}
+
+
+def _needs_fit(op):
+    return (op["op"] == "fillna" and op.get("method") in FITTED_FILLS) or op["op"] == "power_transform"
+
+
+# -------------------- INPUT --------------------
+class ChunkSource:
+    """Re-readable chunked view of a CSV or Parquet file (path or buffer).
+
+    ``columns`` limits Parquet input to those columns, as chosen when loading.
+    """
+
+    def __init__(self, source, file_type, chunk_rows=INGEST_CHUNK_ROWS, columns=None):
+        if file_type not in ("csv", "parquet"):
+            raise ValueError("Out-of-core cleaning supports CSV and Parquet files")
+        self.source = source
+        self.file_type = file_type
+        self.chunk_rows = chunk_rows
+        self.columns = columns
+        self.dtypes = None
+
+    def _size(self):
+        if isinstance(self.source, str):
+            return os.path.getsize(self.source)
+        return getattr(self.source, "size", None)
+
+    def chunks(self, on_progress=None):
+        """Yield DataFrame chunks; ``on_progress`` receives the fraction read."""
+        if self.file_type == "parquet":
+            if hasattr(self.source, "seek"):
+                self.source.seek(0)
+            parquet = pq.ParquetFile(self.source)
+            total = parquet.metadata.num_rows or 1
+            done = 0
+            for batch in parquet.iter_batches(batch_size=self.chunk_rows, columns=self.columns):
+                done += batch.num_rows
+                chunk = batch.to_pandas()
+                if on_progress is not None:
+                    on_progress(done / total)
+                yield chunk
+            return
+
+        size = self._size()
+        fh = open(self.source, "rb") if isinstance(self.source, str) else self.source
+        try:
+            fh.seek(0)
+            for chunk in pd.read_csv(fh, chunksize=self.chunk_rows, dtype=self.dtypes):
+                if on_progress is not None and size:
+                    on_progress(min(fh.tell() / size, 1.0))
+                yield chunk
+        finally:
+            if fh is not self.source:
+                fh.close()
+
+    def resolve_dtypes(self, on_progress=None):
+        """Schema pass for CSV input.
+
+        Chunk-wise parsing infers types per chunk (an integer column with a
+        gap in one chunk reads as float there), which would change hashes and
+        output schemas between chunks. The widest type seen is pinned for the
+        later passes, matching what a single whole-file parse infers.
+        """
+        if self.file_type != "csv" or self.dtypes is not None:
+            return
+        seen = {}
+        for chunk in self.chunks(on_progress):
+            for col, dtype in chunk.dtypes.items():
+                seen.setdefault(col, set()).add(dtype)
+        dtypes = {}
+        for col, kinds in seen.items():
+            if len(kinds) == 1:
+                continue
+            if all(pd.api.types.is_numeric_dtype(k) and not pd.api.types.is_bool_dtype(k) for k in kinds):
+                dtypes[col] = "float64"
+            else:
+                dtypes[col] = "object"
+        self.dtypes = dtypes
+
+
+# -------------------- DEDUPLICATION --------------------
+class RowHashSet:
+    """Set of 64-bit row hashes kept as a few sorted arrays (8 bytes per row).
+
+    New arrays are merged into older ones once they reach a comparable size,
+    so lookups touch O(log n) arrays and inserts cost O(n log n) overall.
+    """
+
+    def __init__(self):
+        self.levels = []
+
+    def __len__(self):
+        return sum(len(level) for level in self.levels)
+
+    def _seen(self, hashes):
+        seen = np.zeros(len(hashes), dtype=bool)
+        for level in self.levels:
+            pos = np.searchsorted(level, hashes)
+            pos[pos == len(level)] = 0
+            seen |= level[pos] == hashes
+        return seen
+
+    def first_seen(self, hashes):
+        """Mask of hashes not seen before (first occurrence within ``hashes`` too), and record them."""
+        fresh = ~pd.Series(hashes).duplicated().to_numpy()
+        if self.levels:
+            fresh &= ~self._seen(hashes)
+        new = np.sort(hashes[fresh])
+        if len(new):
+            self.levels.append(new)
+            while len(self.levels) > 1 and len(self.levels[-2]) <= 2 * len(self.levels[-1]):
+                top = self.levels.pop()
+                self.levels[-1] = np.sort(np.concatenate([self.levels[-1], top]))
+        return fresh
+
+
+def _dedup(chunk, op, seen):
+    subset = op.get("subset")
+    keys = chunk if subset is None else chunk[subset]
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    return chunk[seen.first_seen(hashes)]
+
+
+# -------------------- FITTING --------------------
+class _Accumulator:
+    """Streaming state for one step that must be refitted on the full data.
+
+    Medians and power-transform fits need the values themselves; they keep a
+    uniform bottom-k sample of at most ``fit_rows`` values (all of them on
+    smaller columns), so memory stays bounded on any file size.
+    """
+
+    def __init__(self, op, fit_rows=OUT_OF_CORE_FIT_ROWS, seed=SAMPLE_SEED):
+        self.op = op
+        self.column = op["column"]
+        self.method = op.get("method")
+        self.total = 0.0
+        self.count = 0
+        self.counts = None
+        self.fit_rows = fit_rows
+        self.values = np.empty(0)
+        self.keys = np.empty(0)
+        self.rng = np.random.default_rng(seed)
+
+    def update(self, chunk):
+        series = chunk[self.column]
+        if self.op["op"] == "fillna" and self.method == "mean":
+            self.total += float(series.sum())
+            self.count += int(series.count())
+        elif self.op["op"] == "fillna" and self.method == "mode":
+            counts = series.value_counts(dropna=True)
+            self.counts = counts if self.counts is None else self.counts.add(counts, fill_value=0)
+        else:
+            values = series.dropna().to_numpy()
+            self.values = np.concatenate([self.values, values])
+            self.keys = np.concatenate([self.keys, self.rng.random(len(values))])
+            if len(self.values) > self.fit_rows:
+                keep = np.argpartition(self.keys, self.fit_rows - 1)[:self.fit_rows]
+                self.values, self.keys = self.values[keep], self.keys[keep]
+
+    def fitted(self):
+        if self.op["op"] == "power_transform":
+            column = pd.DataFrame({self.column: self.values})
+            return power_transform_operation(column, self.column, self.method)
+        if self.method == "mean":
+            value = self.total / self.count if self.count else np.nan
+            return {**self.op, "value": value}
+        if self.method == "mode":
+            if self.counts is None or self.counts.empty:
+                raise ValueError(f"Column {self.column} has no values to take the mode of")
+            top = self.counts[self.counts == self.counts.max()]
+            # Series.mode() returns ties sorted, and Clean Data takes the first
+            try:
+                value = top.index.sort_values()[0]
+            except TypeError:
+                value = top.index[0]
+            return {**self.op, "value": value.item() if isinstance(value, np.generic) else value}
+        column = pd.DataFrame({self.column: self.values})
+        return fill_operation(column, self.column, "median")
+
+
+def _plan(operations):
+    """Group the steps that need refitting into statistics passes.
+
+    Consecutive fitted steps on different columns share one pass; any other
+    step after an unfitted one would see stale data, so it starts a new pass.
+    """
+    passes = []
+    i = 0
+    while i < len(operations):
+        if not _needs_fit(operations[i]):
+            i += 1
+            continue
+        group, columns = [], set()
+        while i < len(operations) and _needs_fit(operations[i]) and operations[i]["column"] not in columns:
+            group.append(i)
+            columns.add(operations[i]["column"])
+            i += 1
+        passes.append(group)
+    return passes
+
+
+def _run_chunk(chunk, operations, dedup_sets):
+    for index, op in enumerate(operations):
+        if op["op"] == "drop_duplicates":
+            chunk = _dedup(chunk, op, dedup_sets.setdefault(index, RowHashSet()))
+        else:
+            chunk = apply_operation(chunk, op)
+    return chunk
+
+
+# -------------------- ENGINE --------------------
+@dataclass
+class OutOfCoreResult:
+    rows_in: int = 0
+    rows_out: int = 0
+    passes: int = 0
+    operations: list = field(default_factory=list)
+
+
+def run_out_of_core(source, operations, writer, refit=True, on_progress=None):
+    """Stream ``source`` (a :class:`ChunkSource`) through ``operations`` into ``writer``.
+
+    With ``refit`` the mean/median/mode fills and power transforms are fitted
+    again on every row instead of reusing values fitted on an in-memory
+    (possibly sampled) frame. ``on_progress(stage, fraction)`` reports each
+    pass. Returns the row counts and the steps as actually applied.
+    """
+    operations = [dict(op) for op in operations]
+    plan = _plan(operations) if refit else []
+    total_passes = len(plan) + 1 + (source.file_type == "csv")
+    result = OutOfCoreResult()
+
+    def progress(stage):
+        result.passes += 1
+        label = f"Pass {result.passes}/{total_passes}: {stage}"
+        return (lambda fraction: on_progress(label, fraction)) if on_progress else None
+
+    if source.file_type == "csv":
+        source.resolve_dtypes(progress("checking column types"))
+
+    for group in plan:
+        prefix = operations[:group[0]]
+        accumulators = [_Accumulator(operations[i]) for i in group]
+        dedup_sets = {}
+        for chunk in source.chunks(progress("collecting statistics")):
+            chunk = _run_chunk(chunk, prefix, dedup_sets)
+            for accumulator in accumulators:
+                accumulator.update(chunk)
+        for i, accumulator in zip(group, accumulators):
+            operations[i] = accumulator.fitted()
+
+    dedup_sets = {}
+    empty = None
+    try:
+        for chunk in source.chunks(progress("writing cleaned rows")):
+            result.rows_in += len(chunk)
+            chunk = _run_chunk(chunk, operations, dedup_sets)
+            result.rows_out += len(chunk)
+            if len(chunk):
+                writer.write(chunk)
+            else:
+                empty = chunk
+        if result.rows_out == 0 and empty is not None:
+            # Still produce a valid file with the header/schema
+            writer.write(empty)
+    finally:
+        writer.close()
+    result.operations = operations
+    return result
@@ -0,0 +1,206 @@
+# utils/perf.py
+# Named stage timers for the pages' hot paths. A timer records its wall time
+# and the change in the process's resident memory. Timers running in a
+# page's script thread are collected per rerun for the Performance panel;
+# every timer, including those in background threads (the PDF report), can
+# also be appended to a JSON-lines log for offline analysis.
+#
+# Resident memory is process-wide, so concurrent sessions and garbage
+# collection blur the deltas; they show which stages allocate, not exact
+# per-stage footprints.
+#
+# Streamlit is imported only by the page-facing functions, so the headless
+# batch runner (utils.batch) can import the timed modules without it.
+import importlib.util
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from utils.config import PERF_HISTORY_RUNS, PERF_LOG_PATH
+from utils.memory import format_bytes
+
+if importlib.util.find_spec("psutil"):
+    import psutil
+
+    _process = psutil.Process()
+
+    def _rss():
+        return _process.memory_info().rss
+else:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def _rss():
+        # Linux without psutil; elsewhere memory deltas are left blank
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * _PAGE_SIZE
+        except (OSError, ValueError, IndexError):
+            return None
+
+
+@dataclass
+class Stage:
+    name: str
+    offset: float   # seconds from the start of the rerun
+    seconds: float
+    memory_delta: int
+    depth: int      # nesting level, 0 for top-level stages
+    tags: dict
+
+
+@dataclass
+class Run:
+    page: str
+    started: float
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    stages: list = field(default_factory=list)
+    tags: dict = field(default_factory=dict)
+    seconds: float = None  # set when the rerun finishes
+    interrupted: bool = False
+    depth: int = 0
+
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+
+def _log(record):
+    if PERF_LOG_PATH is None:
+        return
+    line = json.dumps(record, default=str)
+    with _log_lock:
+        with open(PERF_LOG_PATH, "a", encoding="utf-8") as log:
+            log.write(line + "\n")
+
+
+def _current():
+    run = getattr(_local, "run", None)
+    # Fragment reruns reuse the thread after the page finished; their timers
+    # are only logged
+    return run if run is not None and run.seconds is None else None
+
+
+# -------------------- RUNS --------------------
+def _finish(run, interrupted=False):
+    import streamlit as st
+
+    if interrupted:
+        # st.rerun()/st.stop() ended the script before the panel: the run
+        # lasted until its last stage finished
+        run.seconds = max((s.offset + s.seconds for s in run.stages), default=0.0)
+    else:
+        run.seconds = time.perf_counter() - run.started
+    run.interrupted = interrupted
+    history = st.session_state.setdefault("_perf_history", [])
+    history.append(run)
+    del history[:-PERF_HISTORY_RUNS]
+    _log({"time": time.time(), "run": run.id, "page": run.page, "stage": "rerun", "seconds": run.seconds,
+          "interrupted": interrupted, **run.tags})
+
+
+def start_run(page):
+    """Begin collecting timers for this rerun of ``page``; call once at the top of a page."""
+    import streamlit as st
+
+    previous = st.session_state.get("_perf_run")
+    if previous is not None and previous.seconds is None:
+        _finish(previous, interrupted=True)
+    run = Run(page, time.perf_counter())
+    st.session_state._perf_run = run
+    _local.run = run
+    return run
+
+
+def tag(**tags):
+    """Attach context (dataset, file, ...) to the current rerun and its log records."""
+    run = _current()
+    if run is not None:
+        run.tags.update(tags)
+
+
+@contextmanager
+def timer(name, **tags):
+    """Time the enclosed block as stage ``name``; ``tags`` go to the log record."""
+    run = _current()
+    depth = 0
+    if run is not None:
+        depth = run.depth
+        run.depth += 1
+    before = _rss()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        after = _rss()
+        delta = after - before if after is not None and before is not None else None
+        context = {}
+        if run is not None:
+            run.depth -= 1
+            run.stages.append(Stage(name, started - run.started, seconds, delta, depth, tags))
+            context = {"run": run.id, "page": run.page, **run.tags}
+        _log({"time": time.time(), **context, "stage": name, "seconds": seconds,
+              "memory_delta": delta, **tags})
+
+
+# -------------------- PANEL --------------------
+def _stage_table(run):
+    stages = sorted(run.stages, key=lambda s: s.offset)
+    total = max(run.seconds or 0.0, 1e-9)
+    return pd.DataFrame({
+        "Stage": ["· " * s.depth + s.name for s in stages],
+        "Time (ms)": [round(s.seconds * 1000, 1) for s in stages],
+        "Share": [f"{s.seconds / total:.0%}" for s in stages],
+        "Memory Δ": ["" if s.memory_delta is None else ("-" if s.memory_delta < 0 else "+")
+                     + format_bytes(abs(s.memory_delta)) for s in stages],
+    }, columns=["Stage", "Time (ms)", "Share", "Memory Δ"])
+
+
+def _history_table(history):
+    rows = []
+    for run in reversed(history):
+        top = [s for s in run.stages if s.depth == 0]
+        slowest = max(top, key=lambda s: s.seconds, default=None)
+        rows.append({"Page": run.page, "Total (ms)": round(run.seconds * 1000, 1),
+                     "Slowest Stage": f"{slowest.name} ({slowest.seconds * 1000:.1f} ms)" if slowest else "",
+                     "Ended By": "st.rerun / st.stop" if run.interrupted else "page end"})
+    return pd.DataFrame(rows, columns=["Page", "Total (ms)", "Slowest Stage", "Ended By"])
+
+
+def _show_stages(run):
+    import streamlit as st
+
+    table = _stage_table(run)
+    if len(table):
+        st.markdown(table.to_html(index=False, classes="dataframe"), unsafe_allow_html=True)
+    else:
+        st.caption("No timed stages.")
+
+
+def performance_panel():
+    """Render the collapsible Performance panel; call once at the end of a page."""
+    import streamlit as st
+
+    run = _current()
+    if run is None:
+        return
+    _finish(run)
+    history = st.session_state._perf_history
+    with st.expander("Performance"):
+        st.caption(f"This rerun took {run.seconds * 1000:.1f} ms. Memory deltas are changes in the "
+                   f"server's resident memory and include other sessions' activity."
+                   + (f" Stages are logged to {PERF_LOG_PATH}." if PERF_LOG_PATH else ""))
+        _show_stages(run)
+        # Buttons that apply a step end their run with st.rerun(); show it too
+        previous = history[-2] if len(history) > 1 else None
+        if previous is not None and previous.interrupted:
+            st.markdown(f"**Previous rerun** ({previous.seconds * 1000:.1f} ms, ended early by st.rerun):")
+            _show_stages(previous)
+        st.markdown("**Recent Reruns** (newest first):")
+        st.markdown(_history_table(history).to_html(index=False, classes="dataframe"), unsafe_allow_html=True)
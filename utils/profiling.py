@@ -0,0 +1,225 @@
+# utils/profiling.py
+# Batched column profiling. Every per-column statistic used by the Quick
+# Insights tables, the PDF report and Clean Data's summary is derived from a
+# single pass over the numeric block and one hashed count per text column.
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.categorical import sketched_summary, summarize
+
+# Numeric columns are processed in blocks of about this many bytes per
+# full-size float64 copy, so the temporaries stay bounded on wide and tall
+# tables alike: the block and at most one temporary of its size are alive
+# at once.
+BLOCK_BYTES = 64 << 20
+
+
+@dataclass
+class Profile:
+    rows: int
+    numeric_cols: list
+    categorical_cols: list
+    missing: pd.Series
+    numeric: pd.DataFrame
+    categorical: pd.DataFrame
+    # Text-column figures estimated by the streamed sketches over every row
+    categorical_estimated: bool = False
+
+    def numeric_summary(self):
+        """describe()-style table plus median and skew, one row per numeric column."""
+        summary = self.numeric[["count", "mean", "std", "min", "25%", "50%", "75%", "max"]].copy()
+        summary["median"] = self.numeric["50%"]
+        summary["skew"] = self.numeric["skew"].round(3)
+        return summary
+
+    def categorical_summary(self):
+        return self.categorical.reset_index(drop=True)
+
+    def data_issues(self):
+        skew = self.numeric["skew"]
+        return pd.DataFrame({
+            "Column": self.missing.index,
+            "Missing Values": self.missing.values,
+            "Missing %": (self.missing / max(self.rows, 1) * 100).round(2).values,
+            "Skewness": [skew[c] if c in skew.index else "N/A" for c in self.missing.index],
+        })
+
+    def missing_and_skew(self):
+        """Clean Data's table: missing counts and scipy-style (biased) skewness."""
+        skew = self.numeric["skew_biased"]
+        return pd.DataFrame({
+            "Column": self.missing.index,
+            "Missing Values": self.missing.values,
+            "Skewness": [round(skew[c], 3) if c in skew.index else "N/A" for c in self.missing.index],
+        })
+
+    def updated(self, op, before, after):
+        """Profile of ``after``, the result of cleaning step ``op`` on ``before``.
+
+        Only the columns the step changed are profiled again; dropped and
+        renamed columns are relabelled, and the rest are kept as they are.
+        Steps that remove rows change every column and profile from scratch.
+        """
+        kind = op["op"]
+        if kind in ("dropna", "drop_duplicates"):
+            if len(after) == len(before):
+                return self
+            return profile_frame(after)
+        if kind == "drop":
+            changed, renames = [], {}
+        elif kind == "rename":
+            changed, renames = [], op["columns"]
+        elif kind in ("astype", "fillna", "power_transform"):
+            changed, renames = [op["column"]], {}
+        else:
+            return profile_frame(after)
+        if renames and (len(set(after.columns)) != len(after.columns)):
+            return profile_frame(after)
+
+        part = profile_frame(after[changed])
+        numeric = self.numeric.rename(index=renames).drop(index=changed, errors="ignore")
+        categorical = self.categorical.assign(Column=self.categorical["Column"].replace(renames))
+        categorical = categorical[~categorical["Column"].isin(changed)]
+        numeric = pd.concat([numeric, part.numeric]) if len(part.numeric) else numeric
+        categorical = pd.concat([categorical, part.categorical]) if len(part.categorical) else categorical
+
+        missing = self.missing.rename(index=renames)
+        if changed:
+            missing = pd.concat([missing.drop(index=changed, errors="ignore"), part.missing])
+        missing = missing.reindex(after.columns)
+        numeric_cols = [c for c in after.columns if c in numeric.index]
+        categorical_cols = [c for c in after.columns if c in set(categorical["Column"])]
+        order = {c: i for i, c in enumerate(categorical_cols)}
+        categorical = categorical[categorical["Column"].isin(order)]
+        categorical = categorical.iloc[np.argsort(categorical["Column"].map(order).to_numpy(), kind="stable")]
+        return Profile(
+            rows=len(after),
+            numeric_cols=numeric_cols,
+            categorical_cols=categorical_cols,
+            missing=missing,
+            numeric=numeric.loc[numeric_cols],
+            categorical=categorical.reset_index(drop=True),
+            categorical_estimated=self.categorical_estimated,
+        )
+
+
+# -------------------- NUMERIC BLOCK --------------------
+def _sorted_quantile(ordered, count, q):
+    # Linear interpolation, as in Series.quantile, over the non-NaN prefix
+    cols = np.arange(ordered.shape[0])
+    pos = q * (np.maximum(count, 1) - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.ceil(pos).astype(np.intp)
+    if ordered.shape[1] == 0:
+        return np.full(ordered.shape[0], np.nan)
+    low = ordered[cols, lo]
+    result = low + (ordered[cols, hi] - low) * (pos - lo)
+    return np.where(count > 0, result, np.nan)
+
+
+def _numeric_block(values):
+    """Statistics for a (columns, rows) float block; each column is a contiguous row."""
+    missing = np.isnan(values)
+    count = values.shape[1] - np.count_nonzero(missing, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        centred = np.where(missing, 0.0, values)
+        total = centred.sum(axis=1)
+        mean = total / count
+        centred -= mean[:, None]
+        centred[missing] = 0.0
+        del missing
+        # einsum reduces the products directly, without full-size temporaries
+        m2 = np.einsum("ij,ij->i", centred, centred)
+        m3 = np.einsum("ij,ij,ij->i", centred, centred, centred)
+        del centred
+        # One sort per block (NaNs sort last) yields min, max and every
+        # quantile; np.nanquantile would loop over columns in Python.
+        ordered = np.sort(values, axis=1)
+        quantiles = [_sorted_quantile(ordered, count, q) for q in (0.25, 0.5, 0.75)]
+        minimum = _sorted_quantile(ordered, count, 0.0)
+        maximum = _sorted_quantile(ordered, count, 1.0)
+        del ordered
+
+        std = np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan)
+        # Population moments give scipy.stats.skew; the adjusted Fisher-Pearson
+        # coefficient matches pandas Series.skew (NaN below 3 rows, 0 if constant).
+        g1 = (m3 / count) / (m2 / count) ** 1.5
+        adjusted = np.sqrt(count * (count - 1)) / (count - 2) * g1
+        adjusted = np.where(m2 == 0, 0.0, adjusted)
+        adjusted = np.where(count < 3, np.nan, adjusted)
+    return {
+        "count": count.astype(float), "mean": mean, "std": std, "min": minimum,
+        "25%": quantiles[0], "50%": quantiles[1], "75%": quantiles[2], "max": maximum,
+        "skew": adjusted, "skew_biased": g1,
+    }
+
+
+def _numeric_profile(df, numeric_cols):
+    parts = []
+    block = max(1, BLOCK_BYTES // (max(len(df), 1) * 8))
+    for start in range(0, len(numeric_cols), block):
+        cols = numeric_cols[start:start + block]
+        # pandas stores blocks column-major, so the transpose is usually free
+        values = np.ascontiguousarray(df[cols].to_numpy(dtype="float64", na_value=np.nan).T)
+        parts.append(pd.DataFrame(_numeric_block(values), index=cols))
+    if not parts:
+        return pd.DataFrame(columns=["count", "mean", "std", "min", "25%", "50%", "75%",
+                                     "max", "skew", "skew_biased"])
+    return pd.concat(parts)
+
+
+# -------------------- CATEGORICAL COLUMNS --------------------
+def _categorical_profile(df, categorical_cols, known=None):
+    rows = []
+    for col in categorical_cols:
+        summary = (known or {}).get(col)
+        if summary is None:
+            summary = summarize(df[col], top_n=1)
+        rows.append({
+            "Column": col,
+            "Unique Values": summary.distinct,
+            # Series.mode() breaks ties by the smallest value; keep the same answer
+            "Most Frequent": summary.most_frequent,
+            "Frequency": summary.top.iloc[0] if len(summary.top) else None,
+        })
+    return pd.DataFrame(rows, columns=["Column", "Unique Values", "Most Frequent", "Frequency"])
+
+
+# -------------------- PUBLIC API --------------------
+def profile_frame(df, exact_stats=None, total_rows=None, frequencies=None):
+    """Profile every column of ``df`` in one batched pass.
+
+    ``exact_stats`` is the streamed per-column table from utils.ingest; when
+    the frame is a sample, its full-file counts, nulls, min/max, mean and std
+    replace the sampled values, and the sketched distinct counts and
+    ``frequencies`` replace the text columns' figures.
+    """
+    numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+    categorical_cols = df.select_dtypes(include=["object", "category", "string"]).columns.tolist()
+
+    missing = df.isna().sum()
+    numeric = _numeric_profile(df, numeric_cols)
+    if exact_stats is not None:
+        missing = exact_stats["nulls"].reindex(df.columns)
+        if numeric_cols:
+            exact = exact_stats.loc[numeric_cols, ["count", "mean", "std", "min", "max"]]
+            numeric[exact.columns] = exact.astype(float)
+
+    sketched = {}
+    if total_rows is not None and total_rows > len(df):
+        for col in categorical_cols:
+            summary = sketched_summary(col, exact_stats, frequencies)
+            if summary is not None:
+                sketched[col] = summary
+
+    return Profile(
+        rows=total_rows if total_rows is not None else len(df),
+        numeric_cols=numeric_cols,
+        categorical_cols=categorical_cols,
+        missing=missing,
+        numeric=numeric,
+        categorical=_categorical_profile(df, categorical_cols, sketched),
+        categorical_estimated=bool(sketched),
+    )
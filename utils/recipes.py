@@ -0,0 +1,97 @@
+# utils/recipes.py
+# Cleaning recipes: the Clean Data operation log saved as JSON or YAML so the
+# same steps, with the values fitted in the session, can be replayed on new
+# files from the UI or the batch CLI (``python -m utils.batch``).
+import importlib.util
+import json
+import math
+from datetime import datetime, timezone
+
+import numpy as np
+
+from utils.cleaning import apply_operation
+
+RECIPE_VERSION = 1
+RECIPE_FORMATS = {"JSON": ("json", "application/json")}
+# YAML is optional; it is only offered when PyYAML is installed
+if importlib.util.find_spec("yaml"):
+    RECIPE_FORMATS["YAML"] = ("yaml", "application/x-yaml")
+OPERATIONS = {"drop", "rename", "astype", "fillna", "dropna", "drop_duplicates", "power_transform"}
+
+
+def _yaml():
+    try:
+        import yaml
+    except ImportError:
+        raise ValueError("YAML recipes need PyYAML (pip install pyyaml)") from None
+    return yaml
+
+
+def _plain(value):
+    # Fitted values can be numpy scalars or timestamps; NaN has no JSON form
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+# -------------------- BUILD / VALIDATE --------------------
+def make_recipe(operations, source=None):
+    """Wrap recorded operations into a versioned recipe dict."""
+    return {
+        "version": RECIPE_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "source": source,
+        "steps": [_plain(op) for op in operations],
+    }
+
+
+def validate_recipe(recipe):
+    if not isinstance(recipe, dict) or not isinstance(recipe.get("steps"), list):
+        raise ValueError("Recipe must be a mapping with a 'steps' list")
+    if recipe.get("version", RECIPE_VERSION) > RECIPE_VERSION:
+        raise ValueError(f"Recipe version {recipe['version']} is newer than supported ({RECIPE_VERSION})")
+    for number, step in enumerate(recipe["steps"], start=1):
+        if not isinstance(step, dict) or step.get("op") not in OPERATIONS:
+            raise ValueError(f"Step {number}: unknown operation {step.get('op') if isinstance(step, dict) else step!r}")
+    return recipe
+
+
+# -------------------- SERIALIZATION --------------------
+def dump_recipe(recipe, fmt="JSON"):
+    if fmt == "YAML":
+        return _yaml().safe_dump(recipe, sort_keys=False, allow_unicode=True)
+    return json.dumps(recipe, indent=2, ensure_ascii=False)
+
+
+def parse_recipe(text, fmt=None):
+    """Parse recipe text; ``fmt`` is "JSON", "YAML" or ``None`` to detect it."""
+    if fmt is None:
+        fmt = "JSON" if text.lstrip().startswith("{") else "YAML"
+    recipe = _yaml().safe_load(text) if fmt == "YAML" else json.loads(text)
+    return validate_recipe(recipe)
+
+
+def load_recipe(path):
+    with open(path, encoding="utf-8") as fh:
+        text = fh.read()
+    fmt = "YAML" if str(path).lower().endswith((".yaml", ".yml")) else None
+    return parse_recipe(text, fmt)
+
+
+# -------------------- APPLY --------------------
+def apply_recipe(df, recipe):
+    """Replay every step of ``recipe`` on ``df`` and return the result."""
+    for number, step in enumerate(validate_recipe(recipe)["steps"], start=1):
+        try:
+            df = apply_operation(df, step)
+        except KeyError as e:
+            raise ValueError(f"Step {number} ({step['op']}): column {e} not found") from None
+    return df
@@ -0,0 +1,237 @@
+# utils/report.py
+# Quick Insights PDF report. Reports are built on request in a worker thread
+# and the finished bytes are cached per dataset key.
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+
+from utils.config import REPORT_CACHE_MAX_BYTES, REPORT_WORKERS
+from utils.figures import correlation_png, distribution_png
+from utils.lru import ByteLRU
+from utils.perf import timer
+
+MAX_DISTRIBUTIONS = 6
+
+
+# -------------------- PROGRESS --------------------
+class ReportJob:
+    """Progress of one report build, updated by the worker and read by the UI."""
+
+    def __init__(self, total_steps):
+        self.total_steps = total_steps
+        self.done_steps = 0
+        self.stage = "Queued"
+        self.future = None
+
+    def advance(self, stage):
+        self.done_steps += 1
+        self.stage = stage
+
+    @property
+    def fraction(self):
+        return min(self.done_steps / max(self.total_steps, 1), 1.0)
+
+    @property
+    def running(self):
+        return self.future is None or not self.future.done()
+
+    @property
+    def error(self):
+        if self.future is None or not self.future.done():
+            return None
+        return self.future.exception()
+
+
+@dataclass
+class ReportResult:
+    pdf: bytes
+    images: int
+    image_bytes: int
+    temp_files: int = 0
+
+
+# -------------------- REPORT BUILD --------------------
+def df_to_table(df):
+    # Convert DataFrame to list of lists
+    data = [df.columns.tolist()] + df.values.tolist()
+    table = Table(data)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    return table
+
+
+def report_steps(numeric_cols):
+    # tables + one step per chart + the final ReportLab build
+    charts = min(len(numeric_cols), MAX_DISTRIBUTIONS) + (1 if len(numeric_cols) > 1 else 0)
+    return 2 + charts
+
+
+def build_report(df, sections, dataset_key, job=None):
+    """Render the Quick Insights PDF and return a ReportResult.
+
+    ``sections`` carries the tables already shown on the page (file_info,
+    col_info, num_summary, cat_summary, data_issues, total_duplicates,
+    numeric_cols, categorical_cols, and top_pairs for wide tables). Charts come from utils.figures, so the
+    PNGs already rendered for the page are reused and nothing touches disk.
+    """
+    def advance(stage):
+        if job is not None:
+            job.advance(stage)
+
+    images = []
+
+    def image(png, width, height):
+        images.append(len(png))
+        return Image(BytesIO(png), width=width, height=height)
+
+    numeric_cols = sections["numeric_cols"]
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Title
+    title_style = ParagraphStyle('title', parent=styles['Heading1'], alignment=TA_CENTER, fontSize=22, textColor=colors.HexColor('#ff6b6b'))
+    story.append(Paragraph("Quick Insights Report", title_style))
+    story.append(Spacer(1,20))
+
+    # 1. File Overview
+    story.append(Paragraph("1. File Overview", styles['Heading2']))
+    story.append(Spacer(1,8))
+    story.append(df_to_table(sections["file_info"]))
+    story.append(Spacer(1,15))
+
+    # 2. Columns Overview
+    story.append(Paragraph("2. Columns Overview", styles['Heading2']))
+    story.append(Spacer(1,8))
+    story.append(df_to_table(sections["col_info"]))
+    story.append(Spacer(1,15))
+
+    # 3. Dataset Sample
+    story.append(Paragraph("3. Dataset Sample", styles['Heading2']))
+    story.append(Spacer(1,8))
+    story.append(Paragraph("First 3 Rows:", styles['Heading4']))
+    story.append(df_to_table(df.head(3).reset_index(drop=True)))
+    story.append(Spacer(1,8))
+    story.append(Paragraph("Last 3 Rows:", styles['Heading4']))
+    story.append(df_to_table(df.tail(3).reset_index(drop=True)))
+    story.append(Spacer(1,15))
+
+    # 4. Summary Statistics
+    story.append(Paragraph("4. Summary Statistics", styles['Heading2']))
+    story.append(Spacer(1,8))
+
+    if numeric_cols:
+        story.append(Paragraph("Numeric Columns:", styles['Heading4']))
+        num_summary_reset = sections["num_summary"].reset_index()
+        num_summary_reset.columns = ['Statistic'] + list(num_summary_reset.columns[1:])
+        story.append(df_to_table(num_summary_reset))
+        story.append(Spacer(1,8))
+
+    if sections["categorical_cols"]:
+        story.append(Paragraph("Categorical Columns:", styles['Heading4']))
+        story.append(df_to_table(sections["cat_summary"]))
+        story.append(Spacer(1,15))
+
+    # 5. Data Issues Overview
+    story.append(Paragraph("5. Data Issues Overview", styles['Heading2']))
+    story.append(Spacer(1,8))
+    story.append(df_to_table(sections["data_issues"]))
+    story.append(Spacer(1,8))
+
+    # 6. Duplicates
+    story.append(Paragraph(f"6. Total Duplicate Rows: {sections['total_duplicates']}", styles['Heading2']))
+    story.append(Spacer(1,15))
+    advance("Tables ready")
+
+    # 7. Numeric Column Distributions - LARGER IMAGES IN PDF
+    if numeric_cols:
+        story.append(Paragraph("7. Numeric Column Distributions", styles['Heading2']))
+        story.append(Spacer(1,8))
+        for col in numeric_cols[:MAX_DISTRIBUTIONS]:
+            png = distribution_png(df, col, dataset_key)
+            story.append(Paragraph(f"{col} Distribution", styles['Heading4']))
+            story.append(image(png, width=400, height=300))  # Much larger image in PDF
+            story.append(Spacer(1,15))
+            advance(f"Rendered {col} distribution")
+        story.append(Spacer(1,8))
+
+    # 8. Correlation Analysis - LARGER IMAGE IN PDF
+    if len(numeric_cols) > 1:
+        story.append(Paragraph("8. Correlation Analysis", styles['Heading2']))
+        story.append(Spacer(1,8))
+        png = correlation_png(df, numeric_cols, dataset_key)
+        story.append(image(png, width=450, height=400))  # Much larger image in PDF
+        if sections.get("top_pairs") is not None:
+            story.append(Spacer(1,8))
+            story.append(Paragraph("Strongest Correlations:", styles['Heading4']))
+            story.append(df_to_table(sections["top_pairs"]))
+        advance("Rendered correlation heatmap")
+
+    # Build PDF
+    with timer("report build", dataset=dataset_key, images=len(images)):
+        doc.build(story)
+    advance("Report ready")
+    return ReportResult(buffer.getvalue(), images=len(images), image_bytes=sum(images))
+
+
+# -------------------- BACKGROUND JOBS --------------------
+report_cache = ByteLRU(REPORT_CACHE_MAX_BYTES)
+_executor = ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix="pdf-report")
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def cached_report(key):
+    """Return the finished ReportResult for ``key``, or None."""
+    return report_cache.get(key)
+
+
+def report_job(key):
+    with _jobs_lock:
+        return _jobs.get(key)
+
+
+def start_report(key, df, sections):
+    """Queue a report build for ``key`` unless one is already running; return its job."""
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is not None and job.error is None:
+            return job
+        job = ReportJob(report_steps(sections["numeric_cols"]))
+        _jobs[key] = job
+
+    def run():
+        result = build_report(df, sections, key, job)
+        report_cache.put(key, result, len(result.pdf))
+        return result
+
+    def finished(future):
+        # Successful jobs are served from report_cache; failed ones stay
+        # registered so the page can show the error until it is dismissed.
+        if future.exception() is None:
+            discard_job(key)
+
+    job.future = _executor.submit(run)
+    job.future.add_done_callback(finished)
+    return job
+
+
+def discard_job(key):
+    with _jobs_lock:
+        _jobs.pop(key, None)
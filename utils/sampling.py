@@ -0,0 +1,86 @@
+# utils/sampling.py
+# Deterministic row sampling for expensive plot types. Every row gets a
+# seeded random key and the rows with the smallest keys are kept
+# ("bottom-k" reservoir sampling). This is a uniform sample without
+# replacement, it can be merged across chunks, and it extends to strata by
+# ranking keys within each group.
+import numpy as np
+import pandas as pd
+
+from utils.config import PLOT_SAMPLE_ROWS, SAMPLE_SEED
+
+
+def _keys(n, seed):
+    return np.random.default_rng(seed).random(n)
+
+
+def reservoir_sample(frames, k, seed=SAMPLE_SEED):
+    """Uniform sample of ``k`` rows from a DataFrame or an iterable of chunks."""
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    rng = np.random.default_rng(seed)
+    kept = None
+    kept_keys = np.empty(0)
+    for chunk in frames:
+        keys = np.concatenate([kept_keys, rng.random(len(chunk))])
+        pool = chunk if kept is None else pd.concat([kept, chunk])
+        if len(pool) > k:
+            best = np.argpartition(keys, k - 1)[:k]
+            pool, keys = pool.iloc[best], keys[best]
+        kept, kept_keys = pool, keys
+    return kept.sort_index() if kept is not None else None
+
+
+def stratified_sample(df, by, k, seed=SAMPLE_SEED, min_per_group=10):
+    """Sample at most ``k`` rows keeping each ``by`` group's share of the data.
+
+    Every group keeps at least ``min_per_group`` rows (or all of its rows) so
+    rare categories stay visible next to dominant ones. With more groups than
+    ``k`` allows, the floor shrinks so the quotas still add up to ``k``, and
+    the smallest groups may get no rows at all.
+    """
+    codes, _ = pd.factorize(df[by], use_na_sentinel=False)
+    sizes = np.bincount(codes)
+    k = min(k, len(df))
+    floor = np.minimum(sizes, min(min_per_group, k // max(len(sizes), 1)))
+    # The rest of the budget is shared in proportion to each group's
+    # remaining rows; rounding leftovers go to the largest remainders
+    share = (sizes - floor) * ((k - floor.sum()) / max(len(df) - floor.sum(), 1))
+    quota = floor + np.floor(share)
+    leftover = int(k - quota.sum())
+    if leftover > 0:
+        quota[np.argsort(-(share - np.floor(share)), kind="stable")[:leftover]] += 1
+    keys = _keys(len(df), seed)
+    # Pre-filter with a per-group key threshold a little above the quota
+    # rate so only ~k rows are sorted; fall back to all rows if a group
+    # ends up short of candidates
+    threshold = np.minimum(1.0, (quota * 1.2 + 10) / np.maximum(sizes, 1))
+    candidates = np.flatnonzero(keys < threshold[codes])
+    if np.any(np.bincount(codes[candidates], minlength=len(sizes)) < quota):
+        candidates = np.arange(len(df))
+    # Sort candidates by (group, key); the first ``quota`` of each group win
+    cand_codes = codes[candidates]
+    order = candidates[np.lexsort((keys[candidates], cand_codes))]
+    order_codes = codes[order]
+    group_start = np.searchsorted(order_codes, np.arange(len(sizes)))
+    rank = np.arange(len(order)) - group_start[order_codes]
+    chosen = np.sort(order[rank < quota[order_codes]])
+    return df.iloc[chosen]
+
+
+def sample_for_plot(df, cap=PLOT_SAMPLE_ROWS, by=None, seed=SAMPLE_SEED):
+    """Return ``(rows, note)``: ``df`` itself when small, else a sample and a caption."""
+    total = len(df)
+    if total <= cap:
+        return df, None
+    missing = ""
+    if by is not None:
+        sample = stratified_sample(df, by, cap, seed)
+        how = f"stratified by {by}"
+        groups, shown = df[by].nunique(dropna=False), sample[by].nunique(dropna=False)
+        if shown < groups:
+            missing = f" {groups - shown:,} of {groups:,} {by} groups are too small to get any rows."
+    else:
+        sample = reservoir_sample(df, cap, seed)
+        how = "uniform random sample"
+    return sample, f"Showing {len(sample):,} of {total:,} rows ({how}, seed {seed}).{missing}"
@@ -0,0 +1,326 @@
+# utils/sessions.py
+# Per-session memory accounting for a shared server. Each browser session
+# registers what it keeps alive (its upload, its active dataset and Clean
+# Data's pipeline) and the quotas are checked whenever a page loads its
+# dataset: one session may not pin more than its share, and past the
+# server-wide quota the least recently active idle sessions are released.
+# A released session spills its dataset, and its pipeline's checkpoints, to
+# local disk and drops its frames and its upload from memory. When the
+# session returns, its pages are handed a SpilledUpload in place of the
+# upload: the dataset is reopened from the spill file and the pipeline
+# resumes at the same step.
+#
+# Releases run on another session's thread (the one over quota, or the
+# Admin page). Sessions still active may be mid-run, so they are only marked
+# and release themselves when their next run starts.
+#
+# Frames shared between sessions, or with the dataset cache, are counted
+# once per holder set; the dataset cache itself has its own byte budget.
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from dataclasses import dataclass
+
+import pandas as pd
+import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.cleaning import load_spilled, spill_frame
+from utils.config import CHECKPOINT_DIR, SESSION_IDLE_SECONDS, SESSION_MEMORY_BYTES, SESSIONS_MEMORY_BYTES
+from utils.memory import format_bytes, frame_nbytes
+
+
+class QuotaExceeded(RuntimeError):
+    """A dataset does not fit in the session's or the server's memory quota."""
+
+
+# Deep memory usage scans every string, so it is measured once per frame
+_sizes = {}  # id(frame) -> (weakref to frame, nbytes)
+
+
+def _nbytes(frame):
+    entry = _sizes.get(id(frame))
+    if entry is not None and entry[0]() is frame:
+        return entry[1]
+    nbytes = frame_nbytes(frame)
+    key = id(frame)
+    _sizes[key] = (weakref.ref(frame, lambda _: _sizes.pop(key, None)), nbytes)
+    return nbytes
+
+
+def _distinct(objects):
+    return list({id(obj): obj for obj in objects}.values())
+
+
+def _forget_upload(client, upload):
+    """Drop Streamlit's own copy of ``upload``, kept for the session's file uploader."""
+    file_id = getattr(upload, "file_id", None)
+    if client is not None and file_id is not None and runtime.exists():
+        runtime.get_instance().uploaded_file_mgr.remove_file(client, file_id)
+
+
+@dataclass
+class SpilledUpload:
+    """Stand-in for an upload whose session was released; its dataset is on local disk.
+
+    Carries what the pages read from an upload (``name``, ``size``) and what
+    :func:`utils.data_loader.load_dataset` needs to reopen the dataset without
+    the original bytes.
+    """
+    name: str
+    size: int
+    file_id: str
+    key: str          # dataset key the frame was loaded under
+    meta: dict        # ingestion metadata of the dataset
+    path: str         # Parquet (or pickle) file holding the frame
+    sentinels: dict   # missing-value sentinels for Parquet; None for pickle
+
+    def read(self):
+        if self.sentinels is None:
+            return pd.read_pickle(self.path)
+        return load_spilled(self.path, self.sentinels)
+
+
+class SessionData:
+    """What one browser session keeps in memory."""
+
+    def __init__(self, client=None):
+        self.id = uuid.uuid4().hex[:8]
+        self.client = client  # Streamlit session id, owner of the uploaded files
+        self.started = self.last_seen = time.time()
+        self.dataset = None   # (key, df) of the active dataset
+        self.meta = None      # ingestion metadata of the active dataset
+        self.upload = None    # the uploaded file the dataset was read from, or its SpilledUpload
+        self.label = None     # file name of the active dataset
+        self.pipeline = None  # Clean Data's CleaningPipeline, if any
+        self.released = False
+        # Set when another session released this one while it was active
+        self.release_requested = False
+        # Held while the data is dropped and while a run of the session starts
+        self.lock = threading.Lock()
+        self._spill_dir = None
+
+    def hold(self, key, df, upload, meta):
+        with self.lock:
+            self.dataset = key, df
+            self.meta = meta
+            self.upload = upload
+            self.label = upload.name
+
+    def clear(self):
+        """Forget the active dataset and its upload."""
+        with self.lock:
+            self.dataset = None
+            self.meta = None
+            self.upload = None
+
+    def frame(self, key):
+        """The held dataset frame for ``key``, or None."""
+        dataset = self.dataset
+        if dataset is not None and dataset[0] == key:
+            return dataset[1]
+        return None
+
+    def frames(self):
+        frames = [] if self.dataset is None else [self.dataset[1]]
+        if self.pipeline is not None:
+            frames += self.pipeline.frames()
+        return _distinct(frames)
+
+    def uploads(self):
+        """Uploads held in memory; a SpilledUpload holds none."""
+        return [] if self.upload is None or isinstance(self.upload, SpilledUpload) else [self.upload]
+
+    def nbytes(self):
+        return sum(_nbytes(frame) for frame in self.frames()) + sum(upload.size for upload in self.uploads())
+
+    def _scratch_dir(self):
+        # Removed when the session's state is collected
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix="analytix-session-", dir=CHECKPOINT_DIR)
+            weakref.finalize(self, shutil.rmtree, self._spill_dir, True)
+        return self._spill_dir
+
+    def _spill(self):
+        """Write the active dataset to local disk and return the upload's stand-in."""
+        key, frame = self.dataset
+        upload = self.upload
+        if isinstance(upload, SpilledUpload) and upload.key == key and os.path.exists(upload.path):
+            # The base frame is never mutated; the earlier spill still holds it
+            return upload
+        directory = self._scratch_dir()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        path = os.path.join(directory, "dataset.parquet")
+        try:
+            sentinels = spill_frame(frame, path)
+        except Exception:
+            # Frames Parquet cannot hold (mixed object columns, non-string
+            # labels) are pickled instead
+            if os.path.exists(path):
+                os.remove(path)
+            path = os.path.join(directory, "dataset.pickle")
+            frame.to_pickle(path)
+            sentinels = None
+        return SpilledUpload(name=upload.name, size=upload.size, file_id=getattr(upload, "file_id", None),
+                             key=key, meta=self.meta, path=path, sentinels=sentinels)
+
+    def release(self):
+        """Spill the dataset and pipeline checkpoints to disk, then drop every frame and the upload.
+
+        The caller holds :attr:`lock`. Returns the key of the dropped dataset, or None.
+        """
+        key = None
+        if self.dataset is not None and self.upload is not None:
+            try:
+                spilled = self._spill()
+            except Exception:
+                # Without its spill the session could not reopen its data; keep it
+                return None
+            key = self.dataset[0]
+            if spilled is not self.upload:
+                _forget_upload(self.client, self.upload)
+            self.upload = spilled
+        if self.pipeline is not None:
+            self.pipeline.suspend()
+        self.dataset = None
+        self.released = True
+        self.release_requested = False
+        return key
+
+
+class SessionManager:
+    """Registry of live sessions enforcing per-session and server-wide quotas."""
+
+    def __init__(self, session_quota, global_quota, idle_seconds):
+        self.session_quota = session_quota
+        self.global_quota = global_quota
+        self.idle_seconds = idle_seconds
+        # Records live in each session's state; they disappear with the session
+        self._sessions = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        # Called with the key of a released dataset no other session holds;
+        # utils.data_loader drops it from the shared dataset cache
+        self.evict = None
+
+    def current(self):
+        """This browser session's record, created on first use."""
+        data = st.session_state.get("_session_data")
+        if data is None:
+            ctx = get_script_run_ctx()
+            data = SessionData(client=ctx.session_id if ctx is not None else None)
+            st.session_state._session_data = data
+            with self._lock:
+                self._sessions[data.id] = data
+        with data.lock:
+            if data.release_requested:
+                self._release(data)
+            data.last_seen = time.time()
+        return data
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def nbytes(self):
+        """Bytes of the distinct frames and uploads held by all sessions."""
+        sessions = self.sessions()
+        frames = [frame for data in sessions for frame in data.frames()]
+        uploads = [upload for data in sessions for upload in data.uploads()]
+        return (sum(_nbytes(frame) for frame in _distinct(frames))
+                + sum(upload.size for upload in _distinct(uploads)))
+
+    def _release(self, data):
+        """Release ``data``, whose lock the caller holds, and evict its dataset if now unused."""
+        key = data.release()
+        if key is None or self.evict is None:
+            return
+        if not any(other.frame(key) is not None for other in self.sessions() if other is not data):
+            self.evict(key)
+
+    def _release_idle(self, data):
+        """Release ``data`` if it is idle, so no run of its own can be using its frames."""
+        with data.lock:
+            if time.time() - data.last_seen < self.idle_seconds:
+                return False
+            self._release(data)
+            return True
+
+    def release(self, session_id):
+        """Release a session by hand; an active one releases itself when its next run starts."""
+        data = self._sessions.get(session_id)
+        if data is None:
+            return
+        own = data is st.session_state.get("_session_data")
+        with data.lock:
+            if own or time.time() - data.last_seen >= self.idle_seconds:
+                self._release(data)
+            else:
+                data.release_requested = True
+
+    def enforce(self, current, loading=False):
+        """Apply the quotas after ``current`` changed what it holds.
+
+        Over its own quota, the session's pipeline checkpoints are spilled.
+        Over the server quota, idle sessions are released, least recently
+        active first. If ``loading`` a dataset still leaves a quota exceeded,
+        :class:`QuotaExceeded` is raised.
+        """
+        used = current.nbytes()
+        if used > self.session_quota and current.pipeline is not None:
+            current.pipeline.spill_checkpoints()
+            used = current.nbytes()
+        if used > self.session_quota and loading:
+            raise QuotaExceeded(
+                f"This dataset takes {format_bytes(used)} in memory, more than the "
+                f"{format_bytes(self.session_quota)} one session may use. Turn on compact "
+                f"memory mode or load fewer columns.")
+
+        total = self.nbytes()
+        if total <= self.global_quota:
+            return
+        now = time.time()
+        for data in sorted(self.sessions(), key=lambda d: d.last_seen):
+            if total <= self.global_quota or now - data.last_seen < self.idle_seconds:
+                break
+            if data is not current and (data.frames() or data.uploads()) and self._release_idle(data):
+                total = self.nbytes()
+        if total > self.global_quota and loading:
+            raise QuotaExceeded(
+                f"The server is at its memory limit ({format_bytes(self.global_quota)} across "
+                f"all sessions). Try again shortly, or turn on compact memory mode.")
+
+    def summary(self):
+        """One row per session for the admin page, largest first."""
+        now = time.time()
+        rows = []
+        for data in self.sessions():
+            if data.released and not data.frames():
+                status = "Released"
+            elif data.release_requested:
+                status = "Releasing"
+            elif now - data.last_seen >= self.idle_seconds:
+                status = "Idle"
+            else:
+                status = "Active"
+            pipeline = data.pipeline
+            rows.append({"Session": data.id, "Dataset": data.label, "Status": status,
+                         "Frames": len(data.frames()), "Memory": data.nbytes(),
+                         "Cleaning Steps": pipeline.position if pipeline is not None else 0,
+                         "Last Active": pd.Timestamp(data.last_seen, unit="s")})
+        frame = pd.DataFrame(rows, columns=["Session", "Dataset", "Status", "Frames", "Memory",
+                                            "Cleaning Steps", "Last Active"])
+        return frame.sort_values("Memory", ascending=False, ignore_index=True)
+
+
+# -------------------- SHARED MANAGER --------------------
+session_manager = SessionManager(SESSION_MEMORY_BYTES, SESSIONS_MEMORY_BYTES, SESSION_IDLE_SECONDS)
+
+
+def current_session():
+    return session_manager.current()
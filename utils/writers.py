@@ -0,0 +1,119 @@
+# utils/writers.py
+# Chunk-at-a-time table writers. Each keeps only the current chunk in memory,
+# so cleaned output can be written straight to disk (or a buffer) while the
+# input is still being streamed.
+import math
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Excel's hard sheet limit, header row included
+EXCEL_MAX_ROWS = 1_048_576
+
+# name -> (file extension, mime type, writer, compression codec)
+WRITE_FORMATS = {
+    "CSV": ("csv", "text/csv", "csv", None),
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "excel", None),
+    "Parquet": ("parquet", "application/octet-stream", "parquet", "snappy"),
+    "CSV (gzip)": ("csv.gz", "application/gzip", "csv", "gzip"),
+    "CSV (zstd)": ("csv.zst", "application/zstd", "csv", "zstd"),
+    "Parquet (zstd)": ("parquet", "application/octet-stream", "parquet", "zstd"),
+}
+BASE_FORMATS = ["CSV", "Excel", "Parquet"]
+# Offered in addition to the base formats for large outputs
+COMPRESSED_FORMATS = ["CSV (gzip)", "CSV (zstd)", "Parquet (zstd)"]
+
+
+class CsvChunkWriter:
+    def __init__(self, target, compression=None):
+        if compression is not None:
+            # The compressed stream closes ``target`` with it; pyarrow
+            # BufferOutputStreams still return their bytes afterwards
+            self.owned = True
+            self.fh = pa.CompressedOutputStream(target, compression)
+        else:
+            self.owned = isinstance(target, str)
+            self.fh = open(target, "wb") if self.owned else target
+        self.header = True
+
+    def write(self, chunk):
+        self.fh.write(chunk.to_csv(index=False, header=self.header).encode("utf-8"))
+        self.header = False
+
+    def close(self):
+        if self.owned:
+            self.fh.close()
+
+
+class ParquetChunkWriter:
+    """Writes each chunk as one row group under the first chunk's schema."""
+
+    def __init__(self, target, compression="snappy"):
+        self.target = target
+        self.compression = compression
+        self.writer = None
+        self.schema = None
+
+    def write(self, chunk):
+        if self.writer is None:
+            schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+            # Columns that are empty in the first chunk are text elsewhere
+            for i, field in enumerate(schema):
+                if pa.types.is_null(field.type):
+                    schema = schema.set(i, field.with_type(pa.string()))
+            self.schema = schema
+            self.writer = pq.ParquetWriter(self.target, schema, compression=self.compression)
+        self.writer.write_table(pa.Table.from_pandas(chunk, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        if self.writer is None:
+            raise ValueError("No rows to write")
+        self.writer.close()
+
+
+class ExcelChunkWriter:
+    """openpyxl write-only workbook: rows are streamed out as they arrive."""
+
+    def __init__(self, target, sheet_name="Cleaned_Data"):
+        from openpyxl import Workbook
+
+        self.target = target
+        self.book = Workbook(write_only=True)
+        self.sheet = self.book.create_sheet(sheet_name)
+        self.rows = 0
+
+    def write(self, chunk):
+        if self.rows == 0:
+            self.sheet.append([str(c) for c in chunk.columns])
+            self.rows = 1
+        if self.rows + len(chunk) > EXCEL_MAX_ROWS:
+            raise ValueError(f"Excel sheets hold at most {EXCEL_MAX_ROWS - 1:,} rows; use CSV or Parquet")
+        for row in chunk.itertuples(index=False, name=None):
+            self.sheet.append([_excel_cell(v) for v in row])
+        self.rows += len(chunk)
+
+    def close(self):
+        self.book.save(self.target)
+
+
+def _excel_cell(value):
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def open_writer(target, fmt):
+    """Return a chunk writer for ``fmt``, one of :data:`WRITE_FORMATS`."""
+    if fmt not in WRITE_FORMATS:
+        raise ValueError(f"Unsupported output format: {fmt}")
+    _, _, kind, compression = WRITE_FORMATS[fmt]
+    if kind == "csv":
+        return CsvChunkWriter(target, compression)
+    if kind == "excel":
+        return ExcelChunkWriter(target)
+    return ParquetChunkWriter(target, compression)